@@ -0,0 +1,79 @@
+"""同期Session と AsyncSession のスループット比較
+
+DBに接続できる環境(appコンテナ)で実行する
+    uv run python -m benchmarks.bench_async_db
+
+どちらも async def のハンドラから同じクエリを発行し、
+同時接続数 1 / 10 / 100 での requests/sec を出力する。
+同期側は以前の実装と同じく psycopg2 の呼び出しがイベントループを塞ぐ。
+"""
+
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+from infrastructure.database import AsyncSessionLocal, SessionLocal
+from models import Todos
+from sqlalchemy import select
+
+CONCURRENCY_LEVELS = [1, 10, 100]
+REQUESTS_PER_LEVEL = 1000
+OWNER_ID = 1
+
+app = FastAPI()
+
+
+@app.get("/sync/todos")
+async def sync_todos():
+    db = SessionLocal()
+    try:
+        todos = db.scalars(
+            select(Todos).filter(Todos.owner_id == OWNER_ID).order_by(Todos.id)
+        ).all()
+        return {"count": len(todos)}
+    finally:
+        db.close()
+
+
+@app.get("/async/todos")
+async def async_todos():
+    async with AsyncSessionLocal() as db:
+        todos = await db.scalars(
+            select(Todos).filter(Todos.owner_id == OWNER_ID).order_by(Todos.id)
+        )
+        return {"count": len(todos.all())}
+
+
+async def run(client: httpx.AsyncClient, path: str, concurrency: int) -> float:
+    remaining = REQUESTS_PER_LEVEL
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            response = await client.get(path)
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return REQUESTS_PER_LEVEL / (time.perf_counter() - started)
+
+
+async def main():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        # 接続プールを温めてから計測する
+        await client.get("/sync/todos")
+        await client.get("/async/todos")
+        print(f"{'concurrency':>12} {'sync req/s':>12} {'async req/s':>12}")
+        for concurrency in CONCURRENCY_LEVELS:
+            sync_rps = await run(client, "/sync/todos", concurrency)
+            async_rps = await run(client, "/async/todos", concurrency)
+            print(f"{concurrency:>12} {sync_rps:>12.1f} {async_rps:>12.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
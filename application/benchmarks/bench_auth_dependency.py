@@ -0,0 +1,39 @@
+"""認証依存関数(get_current_user_from_cookie)のリクエストあたりのオーバーヘッド
+
+    uv run python -m benchmarks.bench_auth_dependency
+
+同じアクセストークンを繰り返し検証した場合の1回あたりの処理時間を
+検証済みJWTキャッシュの有効/無効で比較する。
+"""
+
+import asyncio
+import time
+from datetime import timedelta
+
+from config.dependency import get_current_user_from_cookie
+from config.jwt import create_jwt_token
+from config.token_cache import token_cache
+
+ITERATIONS = 20000
+
+
+async def measure(enabled: bool) -> float:
+    token_cache.clear()
+    token_cache.enabled = enabled
+    token = create_jwt_token("bench_user", 1, timedelta(minutes=30))
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        await get_current_user_from_cookie(token)
+    return (time.perf_counter() - started) / ITERATIONS
+
+
+async def main():
+    uncached = await measure(enabled=False)
+    cached = await measure(enabled=True)
+    print(f"without cache: {uncached * 1e6:8.2f} us/request")
+    print(f"with cache:    {cached * 1e6:8.2f} us/request")
+    print(f"cache stats:   {token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
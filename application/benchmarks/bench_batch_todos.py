@@ -0,0 +1,69 @@
+"""Todo 1,000件の作成: 単体APIを1,000回呼ぶ場合と一括APIを1回呼ぶ場合の比較
+
+DBに接続できる環境(appコンテナ)で実行する
+    uv run python -m benchmarks.bench_batch_todos
+"""
+
+import asyncio
+import time
+
+import httpx
+from config.dependency import get_current_user_from_cookie
+from infrastructure.database import AsyncSessionLocal
+from main import app
+from models import Todos, Users
+from schemas.requests.auth_request_schema import CurrentUserRequest
+from sqlalchemy import delete, insert, select
+
+TODO_COUNT = 1000
+BENCH_USERNAME = "bench_batch_user"
+
+
+async def prepare_user() -> CurrentUserRequest:
+    async with AsyncSessionLocal() as db:
+        user = await db.scalar(select(Users).where(Users.username == BENCH_USERNAME))
+        if not user:
+            user = await db.scalar(
+                insert(Users)
+                .values(username=BENCH_USERNAME, email=f"{BENCH_USERNAME}@example.com")
+                .returning(Users)
+            )
+            await db.commit()
+        return CurrentUserRequest(username=user.username, id=user.id)
+
+
+async def cleanup(user: CurrentUserRequest):
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Todos).where(Todos.owner_id == user.id))
+        await db.commit()
+
+
+async def main():
+    user = await prepare_user()
+    app.dependency_overrides[get_current_user_from_cookie] = lambda: user
+    payload = [
+        {"title": f"todo {i:04}", "description": "benchmark todo"}
+        for i in range(TODO_COUNT)
+    ]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        await cleanup(user)
+        started = time.perf_counter()
+        for todo in payload:
+            (await client.post("/api/todos", json=todo)).raise_for_status()
+        single = time.perf_counter() - started
+
+        await cleanup(user)
+        started = time.perf_counter()
+        (await client.post("/api/todos/batch", json=payload)).raise_for_status()
+        batch = time.perf_counter() - started
+        await cleanup(user)
+
+    print(f"{TODO_COUNT} single calls: {single:8.3f} s")
+    print(f"1 batch call:       {batch:8.3f} s ({single / batch:.1f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
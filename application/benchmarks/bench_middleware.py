@@ -0,0 +1,77 @@
+"""/api/health に対するミドルウェアのオーバーヘッド比較
+
+    uv run python -m benchmarks.bench_middleware
+
+ミドルウェアなし / 旧実装(@app.middleware("http") = BaseHTTPMiddleware) /
+RequestTimingMiddleware(素のASGI) の3つで1リクエストあたりの処理時間を比較する。
+"""
+
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+from infrastructure.middleware import RequestTimingMiddleware
+
+ITERATIONS = 5000
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/health")
+    def health_check():
+        return {"msg": "pass"}
+
+    return app
+
+
+def build_base_http_middleware_app() -> FastAPI:
+    app = build_app()
+
+    # 置き換え前の logging_middleware と同じ構成
+    @app.middleware("http")
+    async def logging_middleware(request: Request, call_next):
+        client_ip = request.client.host if request.client else "unknown"  # noqa: F841
+        method = request.method  # noqa: F841
+        url = request.url.path  # noqa: F841
+        return await call_next(request)
+
+    return app
+
+
+def build_asgi_middleware_app() -> FastAPI:
+    app = build_app()
+    app.add_middleware(RequestTimingMiddleware)
+    return app
+
+
+async def measure(app: FastAPI) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        await client.get("/api/health")
+        started = time.perf_counter()
+        for _ in range(ITERATIONS):
+            await client.get("/api/health")
+        return (time.perf_counter() - started) / ITERATIONS
+
+
+async def main():
+    baseline = await measure(build_app())
+    base_http = await measure(build_base_http_middleware_app())
+    asgi = await measure(build_asgi_middleware_app())
+    print(f"no middleware:      {baseline * 1e6:8.1f} us/request")
+    print(
+        f"BaseHTTPMiddleware: {base_http * 1e6:8.1f} us/request "
+        f"(+{(base_http - baseline) * 1e6:.1f} us)"
+    )
+    print(
+        f"pure ASGI timing:   {asgi * 1e6:8.1f} us/request "
+        f"(+{(asgi - baseline) * 1e6:.1f} us)"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,138 @@
+"""読み取り95%・書き込み5%の負荷でTodoキャッシュが削減するDBクエリ数
+
+DBに接続できる環境(appコンテナ)で実行する
+    uv run python -m benchmarks.bench_todo_cache
+
+キャッシュなし / プロセス内LRU(memory) を比較する。
+TODO_CACHE_BACKEND=redis を設定した場合はRedisバックエンドも計測する。
+"""
+
+import asyncio
+import random
+import time
+
+import httpx
+from config.dependency import get_current_user_from_cookie, get_todo_cache
+from config.env import app_settings
+from infrastructure.database import AsyncSessionLocal, async_engine
+from infrastructure.todo_cache import (
+    MemoryCacheBackend,
+    TodoCache,
+    create_todo_cache,
+)
+from main import app
+from models import Todos, Users
+from schemas.requests.auth_request_schema import CurrentUserRequest
+from sqlalchemy import delete, event, insert, select
+
+TODO_COUNT = 200
+OPERATIONS = 5000
+WRITE_RATIO = 0.05
+BENCH_USERNAME = "bench_cache_user"
+
+
+async def prepare_user() -> CurrentUserRequest:
+    async with AsyncSessionLocal() as db:
+        user = await db.scalar(select(Users).where(Users.username == BENCH_USERNAME))
+        if not user:
+            user = await db.scalar(
+                insert(Users)
+                .values(username=BENCH_USERNAME, email=f"{BENCH_USERNAME}@example.com")
+                .returning(Users)
+            )
+            await db.commit()
+        return CurrentUserRequest(username=user.username, id=user.id)
+
+
+async def prepare_todos(user: CurrentUserRequest) -> list[int]:
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Todos).where(Todos.owner_id == user.id))
+        todo_ids = await db.scalars(
+            insert(Todos).returning(Todos.id),
+            [
+                {
+                    "title": f"todo {i:04}",
+                    "description": "benchmark todo",
+                    "owner_id": user.id,
+                }
+                for i in range(TODO_COUNT)
+            ],
+        )
+        todo_ids = todo_ids.all()
+        await db.commit()
+        return todo_ids
+
+
+async def measure(cache: TodoCache | None, todo_ids: list[int]) -> tuple[int, float]:
+    app.dependency_overrides[get_todo_cache] = lambda: cache
+    statements = 0
+
+    def count_statement(*args):
+        nonlocal statements
+        statements += 1
+
+    # 同じ操作列で比較するため乱数のシードを固定する
+    rng = random.Random(0)
+    transport = httpx.ASGITransport(app=app)
+    event.listen(async_engine.sync_engine, "after_cursor_execute", count_statement)
+    try:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            started = time.perf_counter()
+            for _ in range(OPERATIONS):
+                todo_id = rng.choice(todo_ids)
+                if rng.random() < WRITE_RATIO:
+                    response = await client.put(
+                        f"/api/todos/{todo_id}",
+                        json={
+                            "title": f"todo {todo_id}",
+                            "description": "benchmark todo",
+                            "is_starred": rng.random() < 0.5,
+                            "is_completed": False,
+                        },
+                    )
+                elif rng.random() < 0.5:
+                    response = await client.get("/api/todos")
+                else:
+                    response = await client.get(f"/api/todos/{todo_id}")
+                response.raise_for_status()
+            elapsed = time.perf_counter() - started
+    finally:
+        event.remove(async_engine.sync_engine, "after_cursor_execute", count_statement)
+    return statements, elapsed
+
+
+async def main():
+    user = await prepare_user()
+    app.dependency_overrides[get_current_user_from_cookie] = lambda: user
+    todo_ids = await prepare_todos(user)
+
+    caches = {
+        "none": None,
+        "memory": TodoCache(
+            MemoryCacheBackend(app_settings.TODO_CACHE_MAX_BYTES),
+            app_settings.TODO_CACHE_TTL,
+        ),
+    }
+    if app_settings.TODO_CACHE_BACKEND == "redis":
+        caches["redis"] = create_todo_cache()
+
+    baseline = None
+    for name, cache in caches.items():
+        statements, elapsed = await measure(cache, todo_ids)
+        baseline = baseline or statements
+        saved = 1 - statements / baseline
+        print(
+            f"{name:6}: {statements:6} queries ({saved:6.1%} saved) "
+            f"{elapsed:7.3f} s"
+            + (f"  hit rate {cache.stats()['hit_rate']:.1%}" if cache else "")
+        )
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Todos).where(Todos.owner_id == user.id))
+        await db.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+"""Todo 10,000件のレスポンス生成コストの比較
+
+    uv run python -m benchmarks.bench_todo_json
+
+DBは使わずメモリ上の行で、シリアライズ部分だけを比較する。
+- response_model: ORMオブジェクトを List[TodoResponse] で再検証 + jsonable_encoder + json
+- FastJSONResponse: 列のdictを pydantic-core の to_json で直接エンコード
+"""
+
+import asyncio
+import time
+from typing import List
+
+import httpx
+from config.responses import FastJSONResponse
+from fastapi import FastAPI
+from models import Todos
+from schemas.responses.todo_response_schema import TodoResponse
+
+ROW_COUNT = 10000
+ITERATIONS = 20
+
+rows = [
+    {
+        "id": i,
+        "title": f"todo {i:05}",
+        "description": f"description of todo {i:05}",
+        "is_starred": i % 7 == 0,
+        "is_completed": i % 3 == 0,
+        "owner_id": 1,
+    }
+    for i in range(1, ROW_COUNT + 1)
+]
+orm_rows = [Todos(**row) for row in rows]
+
+app = FastAPI()
+
+
+@app.get("/response-model", response_model=List[TodoResponse])
+async def response_model_path():
+    return orm_rows
+
+
+@app.get("/fast-json", response_model=List[TodoResponse])
+async def fast_json_path():
+    return FastJSONResponse(rows)
+
+
+async def measure(client: httpx.AsyncClient, path: str) -> float:
+    (await client.get(path)).raise_for_status()
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        await client.get(path)
+    return (time.perf_counter() - started) / ITERATIONS
+
+
+async def main():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        slow = await measure(client, "/response-model")
+        fast = await measure(client, "/fast-json")
+    print(f"{'response_model + json':<26} {slow * 1000:8.1f} ms / {ROW_COUNT} rows")
+    print(f"{'FastJSONResponse(to_json)':<26} {fast * 1000:8.1f} ms / {ROW_COUNT} rows")
+    print(f"speedup: {slow / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,173 @@
+"""1000万件のTodoでパーティションあり/なしのテーブルを比較する
+
+DBに接続できる環境(appコンテナ)で実行する
+    uv run python -m benchmarks.bench_todo_partitioning
+
+todosと同じ列・一覧用インデックスを持つ比較用のテーブルを2つ作る
+(パーティションなし / owner_idのハッシュで16分割)。
+1万ユーザ x 1000件を入れ、それぞれについて次の時間を出力する。
+    - 一覧の1ページ目(owner_idで絞り込みidで並べる)
+    - 1ユーザ分の削除(bulk_deleteと同じくchunkごとのDELETE)
+    - 削除後のVACUUM(パーティションありは削除したユーザのパーティションだけ)
+    - (owner_id, id) インデックスのREINDEX(同上)
+比較用のテーブルは最後に削除する。
+"""
+
+import asyncio
+import random
+import time
+
+import asyncpg
+from config.env import app_settings
+from infrastructure.todo_events import to_asyncpg_dsn
+
+USER_COUNT = 10000
+TODOS_PER_USER = 1000
+PARTITION_COUNT = 16
+PAGE_SIZE = 50
+LIST_QUERIES = 200
+DELETE_USERS = 5
+CHUNK_SIZE = 1000
+LAYOUTS = ("bench_todos_unpartitioned", "bench_todos_partitioned")
+
+
+async def create_table(connection: asyncpg.Connection, table: str):
+    partitioned = table == "bench_todos_partitioned"
+    await connection.execute(f"DROP TABLE IF EXISTS {table}")
+    await connection.execute(
+        f"CREATE TABLE {table} ("
+        "  id bigint GENERATED BY DEFAULT AS IDENTITY,"
+        "  title varchar, description varchar,"
+        "  is_starred boolean, is_completed boolean,"
+        "  owner_id integer NOT NULL, deleted_at timestamptz,"
+        f"  PRIMARY KEY ({'id, owner_id' if partitioned else 'id'})"
+        f") {'PARTITION BY HASH (owner_id)' if partitioned else ''}"
+    )
+    if partitioned:
+        for remainder in range(PARTITION_COUNT):
+            await connection.execute(
+                f"CREATE TABLE {table}_p{remainder:02d} PARTITION OF {table} "
+                f"FOR VALUES WITH (MODULUS {PARTITION_COUNT}, REMAINDER {remainder})"
+            )
+    # 実際のtodosと同じくidの順に書き込まれる(ユーザの行は散らばる)
+    await connection.execute(
+        f"INSERT INTO {table} (title, description, is_starred, is_completed, owner_id) "
+        "SELECT 'todo ' || i, md5(i::text), i % 7 = 0, i % 3 = 0, "
+        f"  1 + i % {USER_COUNT} "
+        f"FROM generate_series(1, {USER_COUNT * TODOS_PER_USER}) AS i"
+    )
+    await connection.execute(
+        f"CREATE INDEX {table}_owner_id_id ON {table} (owner_id, id)"
+    )
+    await connection.execute(
+        f"CREATE INDEX {table}_owner_id_is_completed_id "
+        f"ON {table} (owner_id, is_completed, id)"
+    )
+    await connection.execute(f"VACUUM ANALYZE {table}")
+
+
+async def timed(coroutine) -> float:
+    started = time.perf_counter()
+    await coroutine
+    return time.perf_counter() - started
+
+
+async def list_pages(connection: asyncpg.Connection, table: str, owner_ids: list):
+    query = (
+        f"SELECT id, title, description, is_starred, is_completed, owner_id "
+        f"FROM {table} WHERE owner_id = $1 AND deleted_at IS NULL "
+        f"ORDER BY id LIMIT {PAGE_SIZE}"
+    )
+    for owner_id in owner_ids:
+        await connection.fetch(query, owner_id)
+
+
+async def delete_user(connection: asyncpg.Connection, table: str, owner_id: int):
+    while True:
+        status = await connection.execute(
+            f"DELETE FROM {table} WHERE owner_id = $1 AND id IN ("
+            f"  SELECT id FROM {table} WHERE owner_id = $1 ORDER BY id LIMIT $2"
+            ")",
+            owner_id,
+            CHUNK_SIZE,
+        )
+        if int(status.split()[-1]) < CHUNK_SIZE:
+            return
+
+
+async def users_to_delete(connection: asyncpg.Connection, table: str):
+    # パーティションありの場合は全員を同じパーティションから選び、
+    # VACUUM・REINDEXの対象を1つのパーティションにする
+    if table != "bench_todos_partitioned":
+        return table, random.sample(range(1, USER_COUNT + 1), DELETE_USERS)
+    partition = await connection.fetchval(
+        f"SELECT tableoid::regclass::text FROM {table} WHERE owner_id = $1 LIMIT 1",
+        random.randint(1, USER_COUNT),
+    )
+    owner_ids = await connection.fetch(
+        f"SELECT DISTINCT owner_id FROM {partition} "
+        f"ORDER BY owner_id LIMIT {DELETE_USERS}"
+    )
+    return partition, [row["owner_id"] for row in owner_ids]
+
+
+async def relation_size(connection: asyncpg.Connection, table: str) -> str:
+    return await connection.fetchval(
+        # パーティションのないテーブルはpg_partition_treeが行を返さない
+        "SELECT pg_size_pretty(coalesce(sum(pg_total_relation_size(relid)), "
+        "  pg_total_relation_size(CAST($1 AS regclass)))) "
+        "FROM pg_partition_tree($1)",
+        table,
+    )
+
+
+async def bench(connection: asyncpg.Connection, table: str):
+    print(f"\n=== {table}")
+    elapsed = await timed(create_table(connection, table))
+    print(
+        f"load + index: {elapsed:.1f}s, size: {await relation_size(connection, table)}"
+    )
+
+    random.seed(0)
+    owner_ids = [random.randint(1, USER_COUNT) for _ in range(LIST_QUERIES)]
+    elapsed = await timed(list_pages(connection, table, owner_ids))
+    print(f"list page: {elapsed / LIST_QUERIES * 1000:.2f}ms/query")
+
+    partition, delete_owner_ids = await users_to_delete(connection, table)
+    elapsed = 0.0
+    for owner_id in delete_owner_ids:
+        elapsed += await timed(delete_user(connection, table, owner_id))
+    print(f"delete user: {elapsed / DELETE_USERS * 1000:.1f}ms/user")
+
+    elapsed = await timed(connection.execute(f"VACUUM {partition}"))
+    print(f"vacuum {partition}: {elapsed * 1000:.0f}ms")
+    index = (
+        f"{table}_owner_id_id"
+        if partition == table
+        else await connection.fetchval(
+            "SELECT indexrelid::regclass::text FROM pg_index "
+            "WHERE indrelid = CAST($1 AS regclass) "
+            "AND pg_get_indexdef(indexrelid) LIKE '%(owner_id, id)'",
+            partition,
+        )
+    )
+    elapsed = await timed(connection.execute(f"REINDEX INDEX {index}"))
+    print(f"reindex {index}: {elapsed * 1000:.0f}ms")
+
+
+async def main():
+    connection = await asyncpg.connect(
+        to_asyncpg_dsn(app_settings.SQLALCHEMY_DATABASE_URL)
+    )
+    try:
+        print(f"todos: {USER_COUNT * TODOS_PER_USER} ({TODOS_PER_USER} per user)")
+        for table in LAYOUTS:
+            await bench(connection, table)
+    finally:
+        for table in LAYOUTS:
+            await connection.execute(f"DROP TABLE IF EXISTS {table}")
+        await connection.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
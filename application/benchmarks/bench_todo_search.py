@@ -0,0 +1,141 @@
+"""100万件のTodoに対する検索クエリの実行計画
+
+DBに接続できる環境(appコンテナ)で実行する
+    uv run python -m benchmarks.bench_todo_search
+
+100ユーザ x 1万件のTodoを作成し、単語・前方一致・綴りの誤りの3種類の検索について
+EXPLAIN (ANALYZE, BUFFERS) の結果と、使われたインデックス・実行時間を出力する。
+単語は約2000語の語彙からランダムに選ぶため、1語に一致するのはユーザのTodoの一部になる。
+"""
+
+import asyncio
+import json
+
+from infrastructure.database import AsyncSessionLocal, async_engine
+from repositories.todo_repository import search_todos_query
+from sqlalchemy import text
+
+USER_COUNT = 100
+TODOS_PER_USER = 10000
+# WORDSに加えてランダムな文字列の単語をこの数だけ語彙に加える
+RANDOM_WORD_COUNT = 2000
+BENCH_USERNAME_PREFIX = "bench_search_user_"
+WORDS = [
+    "buy",
+    "call",
+    "write",
+    "review",
+    "plan",
+    "clean",
+    "fix",
+    "book",
+    "send",
+    "read",
+    "report",
+    "meeting",
+    "invoice",
+    "kitchen",
+    "garden",
+    "budget",
+    "travel",
+    "doctor",
+    "birthday",
+    "groceries",
+]
+QUERIES = [("word", "groceries"), ("prefix", "groc"), ("fuzzy", "grocerys")]
+PAGE_SIZE = 50
+
+
+def random_words(count: int) -> str:
+    word = "w[1 + floor(random() * cardinality(w))::int]"
+    return " || ' ' || ".join([word] * count)
+
+
+async def prepare() -> int:
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            text(
+                "DELETE FROM todos WHERE owner_id IN "
+                "(SELECT id FROM users WHERE username LIKE :prefix)"
+            ),
+            {"prefix": f"{BENCH_USERNAME_PREFIX}%"},
+        )
+        await db.execute(
+            text("DELETE FROM users WHERE username LIKE :prefix"),
+            {"prefix": f"{BENCH_USERNAME_PREFIX}%"},
+        )
+        owner_ids = await db.scalars(
+            text(
+                "INSERT INTO users (username, email) "
+                "SELECT :prefix || i, :prefix || i || '@example.com' "
+                "FROM generate_series(1, :count) AS i RETURNING id"
+            ),
+            {"prefix": BENCH_USERNAME_PREFIX, "count": USER_COUNT},
+        )
+        owner_ids = owner_ids.all()
+        # タイトルは3語、説明は5語をランダムに組み合わせる
+        await db.execute(
+            text(
+                f"INSERT INTO todos (title, description, owner_id) "
+                f"SELECT {random_words(3)}, {random_words(5)}, owner_id "
+                f"FROM unnest(CAST(:owner_ids AS integer[])) AS owner_id, "
+                f"  generate_series(1, :per_user), "
+                f"  (SELECT CAST(:words AS text[]) || ARRAY("
+                f"    SELECT substr(md5(i::text), 1, 8) "
+                f"    FROM generate_series(1, :random_words) AS i"
+                f"  ) AS w) AS words"
+            ),
+            {
+                "owner_ids": owner_ids,
+                "per_user": TODOS_PER_USER,
+                "words": WORDS,
+                "random_words": RANDOM_WORD_COUNT,
+            },
+        )
+        await db.commit()
+        await db.execute(text("ANALYZE todos"))
+        return owner_ids[len(owner_ids) // 2]
+
+
+def index_names(plan: dict) -> set[str]:
+    names = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        names |= index_names(child)
+    return names
+
+
+async def explain(owner_id: int, q: str) -> tuple[str, dict]:
+    # アプリと同じくバインドパラメータのままEXPLAINする
+    compiled = search_todos_query(owner_id, q, PAGE_SIZE + 1).compile(
+        dialect=async_engine.dialect
+    )
+    params = [compiled.params[name] for name in compiled.positiontup]
+    async with async_engine.connect() as connection:
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+        plan_text = await driver_connection.fetch(
+            f"EXPLAIN (ANALYZE, BUFFERS) {compiled.string}", *params
+        )
+        plan_json = await driver_connection.fetchval(
+            f"EXPLAIN (ANALYZE, FORMAT JSON) {compiled.string}", *params
+        )
+    if isinstance(plan_json, str):
+        plan_json = json.loads(plan_json)
+    return "\n".join(row[0] for row in plan_text), plan_json[0]
+
+
+async def main():
+    owner_id = await prepare()
+    print(f"todos: {USER_COUNT * TODOS_PER_USER} ({TODOS_PER_USER} per user)")
+    for kind, q in QUERIES:
+        plan_text, plan_json = await explain(owner_id, q)
+        print(f"\n=== {kind}: q={q!r}")
+        print(plan_text)
+        print(
+            f"indexes: {sorted(index_names(plan_json['Plan']))} "
+            f"execution: {plan_json['Execution Time']:.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
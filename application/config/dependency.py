@@ -1,16 +1,21 @@
+from contextlib import asynccontextmanager
 from typing import Annotated, Optional
 
 from config.jwt import decode_jwt_token
+from config.token_cache import token_cache
 from fastapi import Depends, Request, status
 from fastapi.exceptions import HTTPException
 from fastapi.openapi.models import OAuthFlows as OAuthFlowsModel
 from fastapi.security import OAuth2
 from fastapi.security.utils import get_authorization_scheme_param
-from infrastructure.database import get_db
+from infrastructure.database import get_db, get_read_router, get_session_factory
+from infrastructure.read_replica import ReadReplicaRouter, is_replica, wrote_recently
+from infrastructure.todo_cache import TodoCache, todo_cache
+from infrastructure.todo_events import TodoEventBroker, todo_event_broker
 from repositories.todo_repository import TodoRepository
 from repositories.user_repository import UserRepository
 from schemas.requests.auth_request_schema import CurrentUserRequest
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from usecases.todo_usecase import TodoUsecase
 from usecases.user_usecase import UserUsecase
 
@@ -48,30 +53,78 @@ class OAuth2PasswordBearerWithCookie(OAuth2):
 oauth2_scheme = OAuth2PasswordBearerWithCookie(tokenUrl="/api/auth/login")
 
 
-def get_todo_usecase(db: Session = Depends(get_db)) -> TodoUsecase:
+async def get_read_db(
+    request: Request, router: ReadReplicaRouter = Depends(get_read_router)
+):
+    # 読み取りだけのエンドポイント用(レプリカがあればレプリカから読む)
+    # 直前に書き込んだクライアントは書き込んだ内容が見えるようプライマリから読む
+    async with router.session(use_primary=wrote_recently(request.cookies)) as db:
+        yield db
+
+
+def get_todo_cache() -> TodoCache | None:
+    return todo_cache
+
+
+def get_todo_event_broker() -> TodoEventBroker | None:
+    return todo_event_broker
+
+
+def get_todo_usecase(
+    db: AsyncSession = Depends(get_db),
+    cache: TodoCache | None = Depends(get_todo_cache),
+) -> TodoUsecase:
     todo_repository = TodoRepository(db)
-    return TodoUsecase(todo_repository)
+    return TodoUsecase(todo_repository, cache)
+
 
+def get_read_todo_usecase(
+    db: AsyncSession = Depends(get_read_db),
+    cache: TodoCache | None = Depends(get_todo_cache),
+) -> TodoUsecase:
+    return TodoUsecase(TodoRepository(db), cache, cache_writable=not is_replica(db))
 
-def get_user_usecase(db: Session = Depends(get_db)) -> UserUsecase:
+
+def get_todo_usecase_scope(
+    session_factory: async_sessionmaker = Depends(get_session_factory),
+):
+    # ストリーミング中も有効なセッションでTodoUsecaseを使うためのスコープ
+    @asynccontextmanager
+    async def todo_usecase_scope():
+        async with session_factory() as db:
+            yield TodoUsecase(TodoRepository(db))
+
+    return todo_usecase_scope
+
+
+def get_user_usecase(db: AsyncSession = Depends(get_db)) -> UserUsecase:
     user_repository = UserRepository(db)
     return UserUsecase(user_repository)
 
 
+def get_read_user_usecase(db: AsyncSession = Depends(get_read_db)) -> UserUsecase:
+    return UserUsecase(UserRepository(db))
+
+
 async def get_current_user_from_cookie(
     token: str = Depends(oauth2_scheme),
 ) -> CurrentUserRequest:
+    current_user = token_cache.get(token)
+    if current_user:
+        return current_user
     try:
         decoded_token = decode_jwt_token(token)
         username: str = decoded_token.get("sub")
         user_id: int = decoded_token.get("iss")
         if not username or not user_id:
             return None
-        return CurrentUserRequest(username=username, id=user_id)
+        current_user = CurrentUserRequest(username=username, id=user_id)
+        token_cache.set(token, current_user, decoded_token.get("exp", 0))
+        return current_user
     except Exception:
         return None
 
 
 user_dependency = Annotated[dict, Depends(get_current_user_from_cookie)]
 
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
@@ -11,10 +11,97 @@ class AppSettings(BaseSettings):
         os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES", 30)
     )
     REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.environ.get("REFRESH_TOKEN_EXPIRE_DAYS", 1))
+    JWT_CACHE_ENABLED: bool = os.environ.get("JWT_CACHE_ENABLED", "True") == "True"
+    JWT_CACHE_SIZE: int = int(os.environ.get("JWT_CACHE_SIZE", 10000))
     SQLALCHEMY_DATABASE_URL: str = os.environ.get("SQLALCHEMY_DATABASE_URL")
+    QUERY_STATS_ENABLED: bool = os.environ.get("QUERY_STATS_ENABLED") == "True"
+    SLOW_QUERY_THRESHOLD_MS: float = float(
+        os.environ.get("SLOW_QUERY_THRESHOLD_MS", 200)
+    )
+    N_PLUS_ONE_THRESHOLD: int = int(os.environ.get("N_PLUS_ONE_THRESHOLD", 5))
+    DB_POOL_SIZE: int = int(os.environ.get("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW: int = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+    DB_POOL_RECYCLE: int = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING: bool = os.environ.get("DB_POOL_PRE_PING", "True") == "True"
+    DB_POOL_TIMEOUT: int = int(os.environ.get("DB_POOL_TIMEOUT", 30))
+    DB_POOL_WARMUP: int = int(os.environ.get("DB_POOL_WARMUP", 5))
+    # 読み取り専用のリクエストに使うレプリカ(カンマ区切りのURL)
+    # 設定しない場合は読み取りもプライマリで行う
+    SQLALCHEMY_REPLICA_URLS: str = os.environ.get("SQLALCHEMY_REPLICA_URLS", "")
+    # round_robin: 順番に使う / least_connections: 使用中の接続が最も少ないものを使う
+    DB_REPLICA_STRATEGY: str = os.environ.get("DB_REPLICA_STRATEGY", "round_robin")
+    DB_REPLICA_CONNECT_TIMEOUT: float = float(
+        os.environ.get("DB_REPLICA_CONNECT_TIMEOUT", 2.0)
+    )
+    # 接続できなかったレプリカはこの秒数の間使わない
+    DB_REPLICA_RETRY_INTERVAL: float = float(
+        os.environ.get("DB_REPLICA_RETRY_INTERVAL", 30.0)
+    )
+    # 書き込んだクライアントはこの秒数の間プライマリから読む(レプリカの遅延対策)
+    DB_REPLICA_STICKY_SECONDS: float = float(
+        os.environ.get("DB_REPLICA_STICKY_SECONDS", 5.0)
+    )
+    BCRYPT_ROUNDS: int = int(os.environ.get("BCRYPT_ROUNDS", 12))
+    PASSWORD_HASH_WORKERS: int = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_QUEUE_SIZE: int = int(os.environ.get("PASSWORD_HASH_QUEUE_SIZE", 32))
     SLACK_WEBHOOK_URL: str = os.environ.get("SLACK_WEBHOOK_URL", "")
     DEBUG: bool = os.environ.get("DEBUG") == "True"
     SENDGRID_API_KEY: str = os.environ.get("SENDGRID_API_KEY")
+    EMAIL_OUTBOX_WORKER_ENABLED: bool = (
+        os.environ.get("EMAIL_OUTBOX_WORKER_ENABLED", "True") == "True"
+    )
+    EMAIL_OUTBOX_BATCH_SIZE: int = int(os.environ.get("EMAIL_OUTBOX_BATCH_SIZE", 20))
+    EMAIL_OUTBOX_CONCURRENCY: int = int(os.environ.get("EMAIL_OUTBOX_CONCURRENCY", 5))
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = int(os.environ.get("EMAIL_OUTBOX_MAX_ATTEMPTS", 5))
+    EMAIL_OUTBOX_POLL_INTERVAL: float = float(
+        os.environ.get("EMAIL_OUTBOX_POLL_INTERVAL", 2.0)
+    )
+    # 1通の送信を待つ上限(秒)
+    EMAIL_OUTBOX_SEND_TIMEOUT: float = float(
+        os.environ.get("EMAIL_OUTBOX_SEND_TIMEOUT", 30.0)
+    )
+    # 取り出したメールの結果が記録されないまま、この秒数が過ぎたら再取得する
+    EMAIL_OUTBOX_LEASE_SECONDS: float = float(
+        os.environ.get("EMAIL_OUTBOX_LEASE_SECONDS", 300.0)
+    )
+    # インポートの1行(CSVでは引用符内の改行を含む1レコード)の上限バイト数
+    IMPORT_MAX_LINE_BYTES: int = int(
+        os.environ.get("IMPORT_MAX_LINE_BYTES", 1024 * 1024)
+    )
+    TODO_DELETE_CHUNK_SIZE: int = int(os.environ.get("TODO_DELETE_CHUNK_SIZE", 1000))
+    TODO_DELETE_WORKER_ENABLED: bool = (
+        os.environ.get("TODO_DELETE_WORKER_ENABLED", "True") == "True"
+    )
+    TODO_DELETE_POLL_INTERVAL: float = float(
+        os.environ.get("TODO_DELETE_POLL_INTERVAL", 2.0)
+    )
+    TODO_DELETE_STALE_SECONDS: int = int(
+        os.environ.get("TODO_DELETE_STALE_SECONDS", 300)
+    )
+    # none: 無効 / memory: プロセス内LRU(単一プロセス向け) / redis: 複数ワーカーで共有
+    TODO_CACHE_BACKEND: str = os.environ.get("TODO_CACHE_BACKEND", "none")
+    TODO_CACHE_TTL: float = float(os.environ.get("TODO_CACHE_TTL", 60))
+    TODO_CACHE_MAX_BYTES: int = int(
+        os.environ.get("TODO_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+    )
+    # /api/todos/stream 用のLISTEN接続(ワーカーごとに1本)
+    TODO_EVENTS_ENABLED: bool = os.environ.get("TODO_EVENTS_ENABLED", "True") == "True"
+    TODO_EVENTS_QUEUE_SIZE: int = int(os.environ.get("TODO_EVENTS_QUEUE_SIZE", 100))
+    TODO_EVENTS_HEARTBEAT: float = float(os.environ.get("TODO_EVENTS_HEARTBEAT", 15.0))
+    # 完了してからTODO_ARCHIVE_AFTER_DAYS日更新のないTodoをtodos_archiveに移す
+    # バッチごとにTODO_ARCHIVE_BATCH_INTERVAL秒空け、リクエストの処理を妨げない
+    TODO_ARCHIVE_WORKER_ENABLED: bool = (
+        os.environ.get("TODO_ARCHIVE_WORKER_ENABLED") == "True"
+    )
+    TODO_ARCHIVE_AFTER_DAYS: int = int(os.environ.get("TODO_ARCHIVE_AFTER_DAYS", 30))
+    TODO_ARCHIVE_BATCH_SIZE: int = int(os.environ.get("TODO_ARCHIVE_BATCH_SIZE", 500))
+    TODO_ARCHIVE_BATCH_INTERVAL: float = float(
+        os.environ.get("TODO_ARCHIVE_BATCH_INTERVAL", 1.0)
+    )
+    TODO_ARCHIVE_POLL_INTERVAL: float = float(
+        os.environ.get("TODO_ARCHIVE_POLL_INTERVAL", 3600)
+    )
+    REDIS_URL: str = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
     COOKIE_SECURE: bool = os.environ.get("COOKIE_SECURE") == "True"
     COOKIE_HTTP_ONLY: bool = os.environ.get("COOKIE_HTTP_ONLY") == "True"
     COOKIE_SAME_SITE: str = os.environ.get("COOKIE_SAME_SITE")
@@ -0,0 +1,33 @@
+def make_etag(*parts) -> str:
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+
+def _split(header: str) -> list[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    # If-None-Matchは弱い比較(W/の有無を無視する)
+    if header is None:
+        return False
+    tags = _split(header)
+    return "*" in tags or etag in (tag.removeprefix("W/") for tag in tags)
+
+
+def if_match_versions(header: str | None, todo_id: int) -> list[int] | None:
+    # If-Matchの "{todo_id}-{version}" からバージョンを取り出す
+    # ヘッダーがない場合と "*" の場合はNone(バージョンを問わない)
+    if header is None:
+        return None
+    tags = _split(header)
+    if "*" in tags:
+        return None
+    versions = []
+    for tag in tags:
+        # If-Matchは強い比較のため弱いETagは一致しない
+        if tag.startswith("W/") or len(tag) < 2 or tag[0] != '"' or tag[-1] != '"':
+            continue
+        tag_id, _, version = tag[1:-1].partition("-")
+        if tag_id == str(todo_id) and version.isdigit():
+            versions.append(int(version))
+    return versions
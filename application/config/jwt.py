@@ -1,32 +1,98 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 
 import bcrypt
 from config.env import app_settings
+from infrastructure.metrics import JWT_DURATION_SECONDS, PASSWORD_HASH_DURATION_SECONDS
 from jose import jwt
 
 
+class PasswordHasherBusyError(Exception):
+    pass
+
+
 def create_jwt_token(username: str, user_id: int, expires_delta: timedelta) -> str:
     encode = {"sub": username, "iss": user_id}
     expires = datetime.now(timezone.utc) + expires_delta
     encode.update({"exp": expires})
-    return jwt.encode(encode, app_settings.SECRET_KEY, algorithm=app_settings.ALGORITHM)
+    with JWT_DURATION_SECONDS.labels("encode").time():
+        return jwt.encode(
+            encode, app_settings.SECRET_KEY, algorithm=app_settings.ALGORITHM
+        )
 
 
 def decode_jwt_token(token: str):
-    decoded_token = jwt.decode(
-        token,
-        app_settings.SECRET_KEY,
-        algorithms=[app_settings.ALGORITHM],
-    )
+    with JWT_DURATION_SECONDS.labels("decode").time():
+        decoded_token = jwt.decode(
+            token,
+            app_settings.SECRET_KEY,
+            algorithms=[app_settings.ALGORITHM],
+        )
     return decoded_token
 
 
 def check_password(raw_password, hashed_password) -> bool:
-    return bcrypt.checkpw(raw_password.encode("utf-8"), hashed_password.encode("utf-8"))
+    with PASSWORD_HASH_DURATION_SECONDS.labels("check").time():
+        return bcrypt.checkpw(
+            raw_password.encode("utf-8"), hashed_password.encode("utf-8")
+        )
 
 
 def hash_password(password: str):
-    hashed_password = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode(
-        "utf-8"
-    )
+    with PASSWORD_HASH_DURATION_SECONDS.labels("hash").time():
+        hashed_password = bcrypt.hashpw(
+            password.encode("utf-8"), bcrypt.gensalt(rounds=app_settings.BCRYPT_ROUNDS)
+        ).decode("utf-8")
     return hashed_password
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    # $2b$12$... のコスト部分が設定値と異なる場合は再ハッシュする
+    try:
+        rounds = int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return True
+    return rounds != app_settings.BCRYPT_ROUNDS
+
+
+# bcryptはGILを解放するのでスレッドプールでイベントループから切り離す
+_password_executor = ThreadPoolExecutor(
+    max_workers=app_settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt"
+)
+_password_pending = 0
+# 数を減らすのはワーカースレッドのため、イベントループ側の判定とロックで揃える
+_password_pending_lock = threading.Lock()
+
+
+def _password_task_done(future):
+    global _password_pending
+    with _password_pending_lock:
+        _password_pending -= 1
+
+
+async def _run_password_task(func, *args):
+    global _password_pending
+    limit = app_settings.PASSWORD_HASH_WORKERS + app_settings.PASSWORD_HASH_QUEUE_SIZE
+    with _password_pending_lock:
+        if _password_pending >= limit:
+            raise PasswordHasherBusyError()
+        _password_pending += 1
+    # 待っている側がキャンセルされてもスレッドのbcryptは止まらないため、
+    # 実行が終わった(または開始前に取り消された)ときに数を戻す
+    try:
+        future = _password_executor.submit(func, *args)
+    except BaseException:
+        _password_task_done(None)
+        raise
+    future.add_done_callback(_password_task_done)
+    return await asyncio.wrap_future(future)
+
+
+async def check_password_async(raw_password, hashed_password) -> bool:
+    return await _run_password_task(check_password, raw_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_password_task(hash_password, password)
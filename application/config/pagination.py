@@ -0,0 +1,52 @@
+import base64
+import binascii
+
+
+# クライアントには不透明な文字列として扱わせる
+def encode_cursor_text(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip("=")
+
+
+def decode_cursor_text(cursor: str) -> str:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return base64.urlsafe_b64decode(padded.encode()).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def encode_cursor(last_id: int) -> str:
+    return encode_cursor_text(str(last_id))
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(decode_cursor_text(cursor))
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+# 差分同期のカーソルは (change_seq, id) の組
+def encode_change_cursor(change_seq: int, last_id: int) -> str:
+    return encode_cursor_text(f"{change_seq}:{last_id}")
+
+
+def decode_change_cursor(cursor: str) -> tuple[int, int]:
+    try:
+        change_seq, last_id = decode_cursor_text(cursor).split(":")
+        return int(change_seq), int(last_id)
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+# 検索結果のカーソルは (score, id) の組(scoreはfloatをそのまま往復させる)
+def encode_search_cursor(score: float, last_id: int) -> str:
+    return encode_cursor_text(f"{score!r}:{last_id}")
+
+
+def decode_search_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        score, last_id = decode_cursor_text(cursor).split(":")
+        return float(score), int(last_id)
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
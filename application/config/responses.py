@@ -0,0 +1,36 @@
+import zlib
+from typing import AsyncIterator
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+
+class FastJSONResponse(JSONResponse):
+    # DBから取得した信頼できる値をresponse_modelで再検証せずにそのまま出力する
+    # jsonable_encoder + 標準のjsonを経由せず pydantic-core で直接エンコードする
+    def render(self, content) -> bytes:
+        return to_json(content)
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    # チャンクごとに圧縮して流す(全体をメモリに溜めない)
+    compressor = zlib.compressobj(wbits=31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def accepts_gzip(request: Request) -> bool:
+    return "gzip" in request.headers.get("accept-encoding", "")
+
+
+def sse_event(event: str, data, event_id: str | None = None) -> bytes:
+    # text/event-stream の1イベント(dataは1行のJSON)
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {to_json(data).decode()}")
+    return ("\n".join(lines) + "\n\n").encode()
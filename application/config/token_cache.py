@@ -0,0 +1,67 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+from config.env import app_settings
+
+
+class VerifiedTokenCache:
+    # 検証済みJWTの内容をトークンの有効期限(exp)まで保持するLRUキャッシュ
+    def __init__(self, max_size: int, enabled: bool = True):
+        self.max_size = max_size
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        # トークン本体をメモリに残さないようダイジェストをキーにする
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str):
+        if not self.enabled:
+            return None
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, token: str, value, expires_at: float):
+        if not self.enabled or expires_at <= time.time():
+            return
+        key = self._key(token)
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, token: str):
+        self._entries.pop(self._key(token), None)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+token_cache = VerifiedTokenCache(
+    max_size=app_settings.JWT_CACHE_SIZE, enabled=app_settings.JWT_CACHE_ENABLED
+)
@@ -0,0 +1,11 @@
+# gunicorn -c gunicorn.conf.py main:app
+# Prometheusのマルチプロセスモード用に PROMETHEUS_MULTIPROC_DIR を設定して起動する
+from prometheus_client import multiprocess
+
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = "0.0.0.0:8000"
+
+
+def child_exit(server, worker):
+    # 終了したワーカーのlivesumゲージを集計対象から外す
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,22 +1,139 @@
-import os
+import asyncio
 
+from config.env import app_settings
+from infrastructure.metrics import instrument_engine
+from infrastructure.query_stats import track_engine_queries
+from infrastructure.pool import InstrumentedAsyncQueuePool, get_pool_status
+from infrastructure.read_replica import ReadReplicaRouter
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
-SQLALCHEMY_DATABASE_URL = os.environ.get("SQLALCHEMY_DATABASE_URL")
+SQLALCHEMY_DATABASE_URL = app_settings.SQLALCHEMY_DATABASE_URL
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+
+def to_async_url(url: str) -> str:
+    # postgresql://... を asyncpg ドライバのURLに変換
+    return (
+        make_url(url)
+        .set(drivername="postgresql+asyncpg")
+        .render_as_string(hide_password=False)
+    )
+
+
+pool_options = {
+    "pool_size": app_settings.DB_POOL_SIZE,
+    "max_overflow": app_settings.DB_MAX_OVERFLOW,
+    "pool_recycle": app_settings.DB_POOL_RECYCLE,
+    "pool_pre_ping": app_settings.DB_POOL_PRE_PING,
+    "pool_timeout": app_settings.DB_POOL_TIMEOUT,
+}
+
+# マイグレーション・バッチ処理用の同期エンジン
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **pool_options)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# APIリクエスト用の非同期エンジン
+async_engine = create_async_engine(
+    to_async_url(SQLALCHEMY_DATABASE_URL),
+    poolclass=InstrumentedAsyncQueuePool,
+    **pool_options,
+)
+
+# SQLの実行回数・時間とプールの状態をメトリクスに記録する
+instrument_engine(async_engine.sync_engine)
+# リクエストごとのクエリ数・スロークエリの記録(オプトイン)
+if app_settings.QUERY_STATS_ENABLED:
+    track_engine_queries(async_engine.sync_engine)
+
+# commit後に属性を再読み込みしない(非同期では遅延ロードできないため)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+# 読み取り専用のレプリカ。トランザクションはREAD ONLYで始め、
+# 落ちているレプリカで待ち続けないよう接続にタイムアウトを設ける
+replica_engines = [
+    create_async_engine(
+        to_async_url(url.strip()),
+        poolclass=InstrumentedAsyncQueuePool,
+        connect_args={"timeout": app_settings.DB_REPLICA_CONNECT_TIMEOUT},
+        execution_options={"postgresql_readonly": True},
+        **pool_options,
+    )
+    for url in app_settings.SQLALCHEMY_REPLICA_URLS.split(",")
+    if url.strip()
+]
+
+# レプリカのSQLもプライマリと同じく記録する(プールの状態はget_db_pool_statusで見る)
+for replica in replica_engines:
+    instrument_engine(replica.sync_engine, pool_gauges=False)
+    if app_settings.QUERY_STATS_ENABLED:
+        track_engine_queries(replica.sync_engine)
+
+read_router = ReadReplicaRouter(
+    AsyncSessionLocal,
+    replica_engines,
+    app_settings.DB_REPLICA_STRATEGY,
+    app_settings.DB_REPLICA_RETRY_INTERVAL,
+)
+
 
 class Base(DeclarativeBase):
     pass
 
 
-def get_db():
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_read_router() -> ReadReplicaRouter:
+    return read_router
+
+
+# StreamingResponseのようにレスポンス送信中もDBを使う処理向けに
+# リクエストのスコープ外でセッションを開くためのファクトリを返す
+def get_session_factory() -> async_sessionmaker:
+    return AsyncSessionLocal
+
+
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def warm_up_pool(size: int = app_settings.DB_POOL_WARMUP):
+    # デプロイ直後のリクエストが接続確立を待たないよう事前に接続しておく
+    # pool_sizeを超えた分はcheckin時に破棄されるため上限をそろえる
+    size = min(size, app_settings.DB_POOL_SIZE)
+    if size <= 0:
+        return
+    # 一部の接続に失敗しても、確立できた接続はプールに返してから例外を送出する
+    results = await asyncio.gather(
+        *(async_engine.connect() for _ in range(size)), return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, AsyncConnection):
+            await result.close()
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+
+def get_db_pool_status() -> dict:
+    status = get_pool_status(async_engine.pool)
+    if replica_engines:
+        status["replicas"] = [
+            get_pool_status(replica.pool) for replica in replica_engines
+        ]
+    return status
@@ -1,10 +1,20 @@
+import asyncio
+import json
+from email.message import EmailMessage
 from pathlib import Path
 
+import aiosmtplib
 from config.env import app_settings
 from fastapi_mail import ConnectionConfig, FastMail, MessageSchema, MessageType
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from jinja2 import (
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    Template,
+    select_autoescape,
+)
 from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+from sendgrid.helpers.mail import Mail, To
 
 if app_settings.DEBUG:
     conf = ConnectionConfig(
@@ -27,15 +37,45 @@ else:
 # テンプレート設定
 BASE_DIR = Path(__file__).resolve().parent.parent
 templates_dir = BASE_DIR / "emails/templates"
+# 本番ではテンプレートファイルの更新チェック(stat)をしない
 jinja_env = Environment(
     loader=FileSystemLoader(str(templates_dir)),
     autoescape=select_autoescape(["html", "xml"]),
+    auto_reload=app_settings.DEBUG,
+    bytecode_cache=FileSystemBytecodeCache(),
 )
 
+FROM_EMAIL = "from_email@example.com"
+# SendGridの1リクエストあたりの宛先数の上限
+SENDGRID_MAX_RECIPIENTS = 1000
+
+_templates: dict[str, Template] = {}
+
+
+def precompile_templates():
+    # 起動時に全テンプレートをコンパイルしておく
+    for template_name in jinja_env.list_templates():
+        _templates[template_name] = jinja_env.get_template(template_name)
+
+
+def get_template(template_name: str) -> Template:
+    template = _templates.get(template_name)
+    if template is None or app_settings.DEBUG:
+        template = _templates[template_name] = jinja_env.get_template(template_name)
+    return template
+
+
+def render_template(template_name: str, context: dict) -> str:
+    return get_template(template_name).render(context)
+
+
+async def render_template_async(template_name: str, context: dict) -> str:
+    # 大きなテンプレートでイベントループを塞がないようスレッドでレンダリングする
+    return await asyncio.to_thread(render_template, template_name, context)
+
 
 async def send_email(email: str, template_name: str, subject: str, context: dict):
-    template = jinja_env.get_template(template_name)
-    html = template.render(context)
+    html = render_template(template_name, context)
     if app_settings.DEBUG:
         message = MessageSchema(
             subject=subject,
@@ -50,8 +90,71 @@ async def send_email(email: str, template_name: str, subject: str, context: dict
         # https://github.com/sendgrid/sendgrid-python
         message = Mail(
             subject=subject,
-            to_emails=email.model_dump().get("email"),
-            from_email="from_email@example.com",
+            to_emails=email,
+            from_email=FROM_EMAIL,
             html_content=html,
         )
-        await sg.send(message)
+        # SendGridのクライアントは同期処理なのでスレッドで実行する
+        await asyncio.to_thread(sg.send, message)
+
+
+def _render_groups(
+    template_name: str, recipients: list[tuple[str, dict]]
+) -> list[tuple[str, list[str]]]:
+    # 同じcontextの宛先はまとめて1回だけレンダリングする
+    groups: dict[str, tuple[dict, list[str]]] = {}
+    for email, context in recipients:
+        key = json.dumps(context, sort_keys=True, default=str)
+        groups.setdefault(key, (context, []))[1].append(email)
+    return [
+        (render_template(template_name, context), emails)
+        for context, emails in groups.values()
+    ]
+
+
+async def send_emails(
+    template_name: str, subject: str, recipients: list[tuple[str, dict]]
+):
+    # 一斉送信用: recipientsは (メールアドレス, context) のリスト
+    groups = await asyncio.to_thread(_render_groups, template_name, recipients)
+    if app_settings.DEBUG:
+        await _send_smtp_bulk(subject, groups)
+    else:
+        await asyncio.to_thread(_send_sendgrid_bulk, subject, groups)
+
+
+async def _send_smtp_bulk(subject: str, groups: list[tuple[str, list[str]]]):
+    # 1つのSMTP接続を使い回して順に送信する
+    smtp = aiosmtplib.SMTP(
+        hostname=conf.MAIL_SERVER,
+        port=conf.MAIL_PORT,
+        use_tls=conf.MAIL_SSL_TLS,
+        start_tls=conf.MAIL_STARTTLS,
+        validate_certs=conf.VALIDATE_CERTS,
+    )
+    async with smtp:
+        for html, emails in groups:
+            for email in emails:
+                message = EmailMessage()
+                message["From"] = conf.MAIL_FROM
+                message["To"] = email
+                message["Subject"] = subject
+                message.set_content(html, subtype="html")
+                await smtp.send_message(message)
+
+
+def _send_sendgrid_bulk(subject: str, groups: list[tuple[str, list[str]]]):
+    # 宛先ごとにpersonalizationを分けて1リクエストでまとめて送る
+    for html, emails in groups:
+        for start in range(0, len(emails), SENDGRID_MAX_RECIPIENTS):
+            message = Mail(
+                subject=subject,
+                to_emails=[
+                    To(email)
+                    for email in emails[start : start + SENDGRID_MAX_RECIPIENTS]
+                ],
+                from_email=FROM_EMAIL,
+                html_content=html,
+                is_multiple=True,
+            )
+            sg.send(message)
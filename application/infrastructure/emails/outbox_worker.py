@@ -0,0 +1,171 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from config.env import app_settings
+from infrastructure.database import AsyncSessionLocal
+from infrastructure.emails.email import send_email
+from models import EmailOutbox
+from models.email_outbox import CLAIMABLE_STATUSES
+from sqlalchemy import func, select, update
+
+logger = logging.getLogger("uvicorn")
+
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+
+
+def backoff_delay(attempts: int) -> timedelta:
+    # 30秒, 60秒, 120秒... と指数的に間隔を空ける(上限1時間)
+    seconds = BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(seconds, BACKOFF_MAX_SECONDS))
+
+
+class EmailOutboxWorker:
+    # email_outboxテーブルの送信待ちメールをバッチで取り出して送信する
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        send=send_email,
+        batch_size: int = app_settings.EMAIL_OUTBOX_BATCH_SIZE,
+        concurrency: int = app_settings.EMAIL_OUTBOX_CONCURRENCY,
+        max_attempts: int = app_settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+        poll_interval: float = app_settings.EMAIL_OUTBOX_POLL_INTERVAL,
+        send_timeout: float = app_settings.EMAIL_OUTBOX_SEND_TIMEOUT,
+        lease_seconds: float = app_settings.EMAIL_OUTBOX_LEASE_SECONDS,
+    ):
+        self.session_factory = session_factory
+        self.send = send
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.send_timeout = send_timeout
+        self.lease_seconds = lease_seconds
+        self._task: asyncio.Task | None = None
+
+    async def process_batch(self) -> int:
+        # 取り出し・送信・結果の記録を分け、送信(ネットワーク待ち)の間は
+        # 行ロックもDB接続も持たない
+        messages = await self._claim()
+        if not messages:
+            return 0
+        semaphore = asyncio.Semaphore(self.concurrency)
+        errors = await asyncio.gather(
+            *(self._deliver(message, semaphore) for message in messages)
+        )
+        await self._record(messages, errors)
+        return len(messages)
+
+    async def _claim(self) -> list[EmailOutbox]:
+        # SKIP LOCKEDで複数ワーカーが同じメールを取り合わないようにし、
+        # sendingにしてすぐコミットする。結果が記録されないままリースが切れた
+        # メール(送信中にワーカーが落ちた場合)は別のワーカーが取り直す
+        async with self.session_factory() as db:
+            claimable = (
+                select(EmailOutbox.id)
+                .where(
+                    EmailOutbox.status.in_(CLAIMABLE_STATUSES),
+                    EmailOutbox.next_attempt_at <= func.now(),
+                )
+                .order_by(EmailOutbox.next_attempt_at)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            messages = await db.scalars(
+                update(EmailOutbox)
+                .where(EmailOutbox.id.in_(claimable.scalar_subquery()))
+                .values(
+                    status="sending",
+                    attempts=EmailOutbox.attempts + 1,
+                    next_attempt_at=func.now() + timedelta(seconds=self.lease_seconds),
+                )
+                .returning(EmailOutbox)
+                .execution_options(synchronize_session=False)
+            )
+            messages = messages.all()
+            await db.commit()
+            return messages
+
+    async def _deliver(
+        self, message: EmailOutbox, semaphore: asyncio.Semaphore
+    ) -> str | None:
+        # 失敗した場合はエラーの内容を返す
+        async with semaphore:
+            try:
+                await asyncio.wait_for(
+                    self.send(
+                        message.recipient,
+                        message.template_name,
+                        subject=message.subject,
+                        context=message.context,
+                    ),
+                    self.send_timeout,
+                )
+            except TimeoutError:
+                error = f"timed out after {self.send_timeout}s"
+            except Exception as e:
+                error = str(e)
+            else:
+                return None
+            logger.warning(f"メール送信エラー(outbox id={message.id}): {error}")
+            return error
+
+    async def _record(self, messages: list[EmailOutbox], errors: list[str | None]):
+        async with self.session_factory() as db:
+            for message, error in zip(messages, errors):
+                if error is None:
+                    values = {"status": "sent", "sent_at": func.now()}
+                elif message.attempts >= self.max_attempts:
+                    values = {"status": "failed", "last_error": error}
+                else:
+                    values = {
+                        "status": "pending",
+                        "last_error": error,
+                        "next_attempt_at": datetime.now(timezone.utc)
+                        + backoff_delay(message.attempts),
+                    }
+                # リースが切れて別のワーカーが取り直したメールは上書きしない
+                await db.execute(
+                    update(EmailOutbox)
+                    .where(
+                        EmailOutbox.id == message.id,
+                        EmailOutbox.status == "sending",
+                        EmailOutbox.attempts == message.attempts,
+                    )
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+            await db.commit()
+
+    async def run(self):
+        while True:
+            try:
+                processed = await self.process_batch()
+            except Exception as e:
+                logger.error(f"メール送信ワーカーエラー: {e}")
+                processed = 0
+            # バッチが埋まっている間は待たずに続けて処理する
+            if processed < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+email_outbox_worker = EmailOutboxWorker()
+
+
+# APIとは別プロセスで動かす場合
+# uv run python -m infrastructure.emails.outbox_worker
+if __name__ == "__main__":
+    asyncio.run(email_outbox_worker.run())
@@ -0,0 +1,160 @@
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# gunicornで複数ワーカーを動かす場合は PROMETHEUS_MULTIPROC_DIR を設定し、
+# 各ワーカーのメトリクスを共有ディレクトリ経由で集計する
+# https://prometheus.github.io/client_python/multiprocess/
+
+HTTP_REQUESTS_TOTAL = Counter(
+    "http_requests_total",
+    "HTTP requests",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_DURATION_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency",
+    ["method", "route"],
+)
+DB_STATEMENTS_TOTAL = Counter(
+    "db_statements_total",
+    "SQL statements executed",
+    ["operation"],
+)
+DB_STATEMENT_DURATION_SECONDS = Histogram(
+    "db_statement_duration_seconds",
+    "SQL statement latency",
+    ["operation"],
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out of the pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Overflow connections currently open",
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAIT_SECONDS = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a pooled connection",
+)
+DB_READ_SESSIONS_TOTAL = Counter(
+    "db_read_sessions_total",
+    "Read-only request sessions by the database they were routed to",
+    ["target"],
+)
+DB_REPLICA_FAILURES_TOTAL = Counter(
+    "db_replica_failures_total",
+    "Failed connections to read replicas",
+)
+PASSWORD_HASH_DURATION_SECONDS = Histogram(
+    "password_hash_duration_seconds",
+    "bcrypt hash/check latency",
+    ["operation"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+JWT_DURATION_SECONDS = Histogram(
+    "jwt_duration_seconds",
+    "JWT encode/decode latency",
+    ["operation"],
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01),
+)
+
+TODO_CACHE_REQUESTS_TOTAL = Counter(
+    "todo_cache_requests_total",
+    "Todo cache lookups",
+    ["result"],
+)
+TODO_EVENT_SUBSCRIPTIONS = Gauge(
+    "todo_event_subscriptions",
+    "Open todo change streams",
+    multiprocess_mode="livesum",
+)
+TODO_EVENTS_DROPPED_TOTAL = Counter(
+    "todo_events_dropped_total",
+    "Todo change streams disconnected as slow consumers",
+)
+TODOS_ARCHIVED_TOTAL = Counter(
+    "todos_archived_total",
+    "Completed todos moved to todos_archive",
+)
+
+
+def observe_request(method: str, route: str, status_code: int, duration: float):
+    HTTP_REQUESTS_TOTAL.labels(method, route, str(status_code)).inc()
+    HTTP_REQUEST_DURATION_SECONDS.labels(method, route).observe(duration)
+
+
+def _statement_operation(statement: str) -> str:
+    # ラベルの種類が増えすぎないよう先頭のキーワードだけを使う
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement else ""
+    if operation in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "COPY"):
+        return operation
+    return "OTHER"
+
+
+def discard_started_at(exception_context, key: str):
+    # 失敗した文の開始時刻はafter_cursor_executeで取り除かれないため、
+    # 残すと同じ接続の以降の文が別の文の開始時刻で計測される
+    # (文の実行前に失敗した場合は積まれていないので、文が一致するときだけ取り除く)
+    connection = exception_context.connection
+    if connection is None:
+        return
+    started_at = connection.info.get(key)
+    if started_at and started_at[-1][0] is exception_context.execution_context:
+        started_at.pop()
+
+
+def instrument_engine(engine: Engine, pool_gauges: bool = True):
+    # pool_gaugesがFalseの場合はSQLだけを記録する
+    # (プールのゲージはラベルを持たず、レプリカの値で上書きされるため)
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        conn.info.setdefault("query_started_at", []).append(
+            (context, time.perf_counter())
+        )
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        _, started_at = conn.info["query_started_at"].pop()
+        duration = time.perf_counter() - started_at
+        operation = _statement_operation(statement)
+        DB_STATEMENTS_TOTAL.labels(operation).inc()
+        DB_STATEMENT_DURATION_SECONDS.labels(operation).observe(duration)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        discard_started_at(exception_context, "query_started_at")
+
+    def update_pool_gauges(*args):
+        DB_POOL_CHECKED_OUT.set(engine.pool.checkedout())
+        DB_POOL_OVERFLOW.set(max(engine.pool.overflow(), 0))
+
+    if pool_gauges:
+        event.listen(engine, "checkout", update_pool_gauges)
+        event.listen(engine, "checkin", update_pool_gauges)
+
+
+def metrics_response() -> tuple[bytes, str]:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
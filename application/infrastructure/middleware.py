@@ -0,0 +1,206 @@
+import bisect
+import json
+import logging
+import math
+import time
+import traceback
+from contextlib import nullcontext
+
+from config.env import app_settings
+
+from infrastructure.metrics import observe_request
+from infrastructure.read_replica import STICKY_COOKIE_NAME
+from infrastructure.query_stats import track_queries
+from infrastructure.slack import send_slack_notification
+
+logger = logging.getLogger("uvicorn")
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# レイテンシのバケット上限(秒)
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class LatencyHistogram:
+    # 固定バケットのヒストグラム(メモリ使用量はリクエスト数に依存しない)
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, q: float) -> float:
+        # 該当バケット内を線形補間して推定する
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = (
+                    self.buckets[index]
+                    if index < len(self.buckets)
+                    else self.buckets[-1]
+                )
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+        }
+
+
+# (method, ルートのパステンプレート, ステータス) ごとのヒストグラム
+latency_histograms: dict[tuple[str, str, int], LatencyHistogram] = {}
+
+
+def get_latency_summary() -> list[dict]:
+    return [
+        {"method": method, "route": route, "status": status, **histogram.summary()}
+        for (method, route, status), histogram in sorted(latency_histograms.items())
+    ]
+
+
+class ReadYourWritesMiddleware:
+    # 書き込みに成功したレスポンスにクッキーを付け、その後しばらくの間は
+    # 同じクライアントの読み取りをプライマリに送る(レプリカの遅延で
+    # 書き込んだ内容が見えなくなるのを防ぐ)
+    # 書き込まないPOST(/api/auth/refreshなど)でも付くが、期限が短いため問題ない
+    def __init__(
+        self, app, sticky_seconds: float = app_settings.DB_REPLICA_STICKY_SECONDS
+    ):
+        self.app = app
+        self.sticky_seconds = sticky_seconds
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] in SAFE_METHODS
+            or self.sticky_seconds <= 0
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                headers = list(message.get("headers", []))
+                headers.append((b"set-cookie", self._sticky_cookie().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _sticky_cookie(self) -> str:
+        until = time.time() + self.sticky_seconds
+        cookie = (
+            f"{STICKY_COOKIE_NAME}={until:.3f}; "
+            f"Max-Age={math.ceil(self.sticky_seconds)}; Path=/; HttpOnly"
+        )
+        if app_settings.COOKIE_SAME_SITE:
+            cookie += f"; SameSite={app_settings.COOKIE_SAME_SITE}"
+        if app_settings.COOKIE_SECURE:
+            cookie += "; Secure"
+        return cookie
+
+
+class RequestTimingMiddleware:
+    # BaseHTTPMiddlewareを使わない素のASGIミドルウェア
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.monotonic()
+        status_code = 500
+        response_started = False
+        query_stats = None
+
+        async def send_wrapper(message):
+            nonlocal status_code, response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                status_code = message["status"]
+                duration_ms = (time.monotonic() - started) * 1000
+                server_timing = f"app;dur={duration_ms:.1f}"
+                if query_stats is not None:
+                    server_timing += (
+                        f", db;dur={query_stats.duration * 1000:.1f};"
+                        f'desc="{query_stats.count} queries"'
+                    )
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        tracking = (
+            track_queries(scope) if app_settings.QUERY_STATS_ENABLED else nullcontext()
+        )
+        try:
+            with tracking as query_stats:
+                await self.app(scope, receive, send_wrapper)
+        except Exception:
+            status_code = 500
+            client_ip = scope["client"][0] if scope.get("client") else "unknown"
+            logger.error(
+                f"Request: {scope['method']} {scope['path']} {status_code} ip: {client_ip}"
+            )
+            send_slack_notification(traceback.format_exc())
+            if not response_started:
+                await self._send_error(send)
+        finally:
+            self._observe(scope, status_code, time.monotonic() - started)
+
+    @staticmethod
+    async def _send_error(send):
+        body = json.dumps({"detail": "Exception Occurred"}).encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 500,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("latin-1")),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    def _observe(scope, status_code: int, duration: float):
+        # 生のパスではなくルートのテンプレートで集計する(/api/todos/{todo_id})
+        route = getattr(scope.get("route"), "path", None) or "unmatched"
+        key = (scope["method"], route, status_code)
+        histogram = latency_histograms.get(key)
+        if histogram is None:
+            histogram = latency_histograms[key] = LatencyHistogram()
+        histogram.observe(duration)
+        observe_request(scope["method"], route, status_code, duration)
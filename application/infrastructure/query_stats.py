@@ -0,0 +1,103 @@
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from config.env import app_settings
+from infrastructure.metrics import discard_started_at
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("uvicorn")
+
+
+class QueryStats:
+    # 1リクエスト内で発行されたSQLの件数と合計時間
+    def __init__(self, scope: dict | None = None):
+        self.scope = scope or {}
+        self.count = 0
+        self.duration = 0.0
+        self.statements: Counter[str] = Counter()
+
+    @property
+    def route(self) -> str:
+        route = getattr(self.scope.get("route"), "path", None)
+        return f"{self.scope.get('method', '-')} {route or self.scope.get('path', '-')}"
+
+    def record(self, statement: str, parameters, duration: float):
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+
+    def repeated_statements(self, threshold: int) -> list[tuple[str, int]]:
+        # 同じSQLテンプレートが繰り返し発行されていればN+1の疑いがある
+        return [
+            (statement, count)
+            for statement, count in self.statements.items()
+            if count >= threshold
+        ]
+
+
+_current_stats: ContextVar[QueryStats | None] = ContextVar(
+    "current_query_stats", default=None
+)
+
+
+@contextmanager
+def track_queries(scope: dict | None = None):
+    stats = QueryStats(scope)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+        for statement, count in stats.repeated_statements(
+            app_settings.N_PLUS_ONE_THRESHOLD
+        ):
+            logger.warning(
+                f"N+1の可能性: {stats.route} で同じSQLが{count}回実行されました: {statement}"
+            )
+
+
+def parameters_shape(parameters) -> str:
+    # 値そのものはログに出さず、キーと型だけを残す
+    if isinstance(parameters, dict):
+        return (
+            "{"
+            + ", ".join(f"{k}: {type(v).__name__}" for k, v in parameters.items())
+            + "}"
+        )
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return f"{len(parameters)} x {parameters_shape(parameters[0])}"
+        return "(" + ", ".join(type(v).__name__ for v in parameters) + ")"
+    return type(parameters).__name__
+
+
+def track_engine_queries(engine: Engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        conn.info.setdefault("query_stats_started_at", []).append(
+            (context, time.perf_counter())
+        )
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        _, started_at = conn.info["query_stats_started_at"].pop()
+        duration = time.perf_counter() - started_at
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.record(statement, parameters, duration)
+        if duration * 1000 >= app_settings.SLOW_QUERY_THRESHOLD_MS:
+            route = stats.route if stats is not None else "-"
+            logger.warning(
+                f"Slow query ({duration * 1000:.1f}ms) {route}: {statement} "
+                f"params={parameters_shape(parameters)}"
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        discard_started_at(exception_context, "query_stats_started_at")
@@ -0,0 +1,96 @@
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from infrastructure.metrics import DB_READ_SESSIONS_TOTAL, DB_REPLICA_FAILURES_TOTAL
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+logger = logging.getLogger("uvicorn")
+
+STRATEGIES = ("round_robin", "least_connections")
+# 書き込んだクライアントがプライマリから読む期限(UNIX時間)を入れるクッキー
+STICKY_COOKIE_NAME = "db_primary_until"
+
+
+def is_replica(db: AsyncSession) -> bool:
+    # ReadReplicaRouter.sessionがレプリカに振り分けたセッションか
+    return db.info.get("replica", False)
+
+
+def wrote_recently(cookies: dict) -> bool:
+    try:
+        return float(cookies.get(STICKY_COOKIE_NAME, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReadReplicaRouter:
+    # 読み取りだけのリクエストのセッションをレプリカに振り分ける
+    # 接続できないレプリカはretry_interval秒の間使わず、
+    # 使えるレプリカがなければプライマリから読む
+    def __init__(
+        self,
+        primary: async_sessionmaker,
+        replicas: list[AsyncEngine],
+        strategy: str = "round_robin",
+        retry_interval: float = 30.0,
+    ):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"unknown replica strategy: {strategy}")
+        self.primary = primary
+        self.replicas = replicas
+        self.strategy = strategy
+        self.retry_interval = retry_interval
+        self._session_factories = [
+            async_sessionmaker(bind=replica, autoflush=False, expire_on_commit=False)
+            for replica in replicas
+        ]
+        self._down_until = [0.0] * len(replicas)
+        self._next = 0
+
+    def candidates(self) -> list[int]:
+        # 試す順に並べた、使えるレプリカの番号
+        now = time.monotonic()
+        healthy = [
+            index
+            for index, down_until in enumerate(self._down_until)
+            if down_until <= now
+        ]
+        if self.strategy == "least_connections":
+            return sorted(
+                healthy, key=lambda index: self.replicas[index].pool.checkedout()
+            )
+        start = self._next
+        self._next = (self._next + 1) % max(len(self.replicas), 1)
+        return sorted(healthy, key=lambda index: (index - start) % len(self.replicas))
+
+    @asynccontextmanager
+    async def session(self, use_primary: bool = False):
+        db = None if use_primary or not self.replicas else await self._connect_replica()
+        DB_READ_SESSIONS_TOTAL.labels("primary" if db is None else "replica").inc()
+        if db is None:
+            db = self.primary()
+        else:
+            db.info["replica"] = True
+        async with db:
+            yield db
+
+    async def _connect_replica(self) -> AsyncSession | None:
+        # 接続の失敗はクエリの途中ではなくここで検知して次の候補に切り替える
+        for index in self.candidates():
+            db = self._session_factories[index]()
+            try:
+                await db.connection()
+            except (DBAPIError, OSError, TimeoutError):
+                await db.close()
+                self._down_until[index] = time.monotonic() + self.retry_interval
+                DB_REPLICA_FAILURES_TOTAL.inc()
+                logger.warning(
+                    f"Read replica {index} is unavailable, "
+                    f"skipping it for {self.retry_interval}s",
+                    exc_info=True,
+                )
+                continue
+            return db
+        return None
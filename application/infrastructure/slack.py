@@ -1,24 +1,125 @@
+import asyncio
 import logging
-import requests
-import os
-import json
+import time
+from collections import Counter, deque
+
+import httpx
+from config.env import app_settings
 
 
 logger = logging.getLogger("uvicorn")
 
 
-def send_slack_notification(message: str):
-    try:
+class SlackNotifier:
+    # 通知はキューに積むだけにし、バックグラウンドでまとめて送信する
+    def __init__(
+        self,
+        webhook_url: str,
+        queue_size: int = 100,
+        flush_interval: float = 5.0,
+        max_messages_per_window: int = 10,
+        window_seconds: float = 60.0,
+        timeout: float = 5.0,
+        shutdown_timeout: float = 10.0,
+    ):
+        self.webhook_url = webhook_url
+        self.flush_interval = flush_interval
+        self.max_messages_per_window = max_messages_per_window
+        self.window_seconds = window_seconds
+        self.timeout = timeout
+        self.shutdown_timeout = shutdown_timeout
+        self.dropped = 0
+        self.suppressed = 0
+        self._queue: asyncio.Queue[str] = asyncio.Queue(maxsize=queue_size)
+        self._sent_at: deque[float] = deque()
+        self._client: httpx.AsyncClient | None = None
+        self._task: asyncio.Task | None = None
+        self._stopping = asyncio.Event()
+
+    def notify(self, message: str) -> bool:
+        if not self.webhook_url:
+            return False
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            # 障害時にリクエスト処理を止めないよう溢れた分は捨てる
+            self.dropped += 1
+            return False
+
+    async def start(self):
+        self._client = httpx.AsyncClient(timeout=self.timeout)
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # キューから取り出して送信中のメッセージを失わないよう、ループに停止を伝えて
+        # 残りを送り終えるまで待つ。shutdown_timeout秒を過ぎた場合だけキャンセルする
+        if self._task:
+            self._stopping.set()
+            try:
+                await asyncio.wait_for(self._task, self.shutdown_timeout)
+            except TimeoutError:
+                logger.warning("Slack通知の送信が終わらないまま停止しました")
+            self._task = None
+        else:
+            await self.flush()
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+            except TimeoutError:
+                pass
+            await self.flush()
+            if self._stopping.is_set():
+                return
+
+    async def flush(self):
+        messages = []
+        while not self._queue.empty():
+            messages.append(self._queue.get_nowait())
+        suppressed = 0
+        # 同じトレースバックは件数付きの1通にまとめる
+        for message, count in Counter(messages).items():
+            if not self._acquire():
+                suppressed += count
+                continue
+            text = message if count == 1 else f"(x{count}) {message}"
+            await self._post(text)
+        if suppressed:
+            self.suppressed += suppressed
+            logger.warning(f"Slack通知をレート制限で抑制: {suppressed}件")
+
+    def _acquire(self) -> bool:
+        now = time.monotonic()
+        while self._sent_at and now - self._sent_at[0] >= self.window_seconds:
+            self._sent_at.popleft()
+        if len(self._sent_at) >= self.max_messages_per_window:
+            return False
+        self._sent_at.append(now)
+        return True
+
+    async def _post(self, message: str):
         alarm_emoji = ":rotating_light:"
         text = alarm_emoji + message
-        data = json.dumps(
-            {
-                "attachments": [{"color": "#e01d5a", "text": text}],
-            }
-        )
-        headers = {"Content-Type": "application/json"}
-        requests.post(
-            url=os.environ.get("SLACK_WEBHOOK_URL"), data=data, headers=headers
-        )
-    except Exception as e:
-        logger.error(f"Slack送信エラー: {e}")
+        data = {"attachments": [{"color": "#e01d5a", "text": text}]}
+        try:
+            if self._client:
+                response = await self._client.post(self.webhook_url, json=data)
+            else:
+                async with httpx.AsyncClient(timeout=self.timeout) as client:
+                    response = await client.post(self.webhook_url, json=data)
+            response.raise_for_status()
+        except Exception as e:
+            logger.error(f"Slack送信エラー: {e}")
+
+
+slack_notifier = SlackNotifier(app_settings.SLACK_WEBHOOK_URL)
+
+
+def send_slack_notification(message: str):
+    slack_notifier.notify(message)
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from datetime import timedelta
+
+from config.env import app_settings
+from infrastructure.database import AsyncSessionLocal
+from infrastructure.metrics import TODOS_ARCHIVED_TOTAL
+from infrastructure.todo_cache import todo_cache
+from repositories.todo_repository import TodoRepository
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger("uvicorn")
+
+# FOR UPDATE NOWAIT でロックが取れなかった
+LOCK_NOT_AVAILABLE = "55P03"
+
+
+class TodoArchiveWorker:
+    # 完了してからolder_than以上更新のないTodoをtodos_archiveに移す
+    # 1バッチを1トランザクションで移すため、いつ止めても次回は残りの行から続く
+    # バッチの間はbatch_interval秒空け、リクエストと接続やロックを取り合わない
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        older_than: timedelta = timedelta(days=app_settings.TODO_ARCHIVE_AFTER_DAYS),
+        batch_size: int = app_settings.TODO_ARCHIVE_BATCH_SIZE,
+        batch_interval: float = app_settings.TODO_ARCHIVE_BATCH_INTERVAL,
+        poll_interval: float = app_settings.TODO_ARCHIVE_POLL_INTERVAL,
+        cache=todo_cache,
+    ):
+        self.session_factory = session_factory
+        self.older_than = older_than
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.poll_interval = poll_interval
+        self.cache = cache
+        self._task: asyncio.Task | None = None
+
+    async def archive_batch(self) -> int | None:
+        # 移した件数を返す。ユーザの書き込みと競合した場合はNone(後で再実行する)
+        async with self.session_factory() as db:
+            try:
+                counts = await TodoRepository(db).archive(
+                    self.older_than, self.batch_size
+                )
+                await db.commit()
+            except DBAPIError as e:
+                if getattr(e.orig, "sqlstate", None) != LOCK_NOT_AVAILABLE:
+                    raise
+                await db.rollback()
+                return None
+        if self.cache is not None:
+            for owner_id in counts:
+                await self.cache.invalidate(owner_id)
+        archived = sum(counts.values())
+        TODOS_ARCHIVED_TOTAL.inc(archived)
+        return archived
+
+    async def archive_all(self) -> int:
+        # 対象がなくなるまでバッチを繰り返す(CLIから1回だけ実行する場合)
+        total = 0
+        while True:
+            archived = await self.archive_batch()
+            total += archived or 0
+            if archived is not None and archived < self.batch_size:
+                return total
+            await asyncio.sleep(self.batch_interval)
+
+    async def run(self):
+        while True:
+            try:
+                archived = await self.archive_batch()
+            except Exception as e:
+                logger.error(f"Todoアーカイブワーカーエラー: {e}")
+                archived = 0
+            # 残りがあれば間隔を空けて次のバッチへ、なければ次の定期実行まで待つ
+            if archived is None or archived >= self.batch_size:
+                await asyncio.sleep(self.batch_interval)
+            else:
+                await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+todo_archive_worker = TodoArchiveWorker()
+
+
+# APIとは別プロセスで動かす場合(--onceで対象がなくなるまで移して終了する)
+# uv run python -m infrastructure.todo_archive_worker [--once]
+if __name__ == "__main__":
+    import sys
+
+    if "--once" in sys.argv:
+        print(f"archived: {asyncio.run(todo_archive_worker.archive_all())}")
+    else:
+        asyncio.run(todo_archive_worker.run())
@@ -0,0 +1,156 @@
+import logging
+import time
+from collections import OrderedDict
+
+from config.env import app_settings
+from infrastructure.metrics import TODO_CACHE_REQUESTS_TOTAL
+from pydantic_core import from_json, to_json
+
+logger = logging.getLogger("uvicorn")
+
+
+class MemoryCacheBackend:
+    # TTLと合計バイト数の上限を持つプロセス内のLRU
+    # gunicornで複数ワーカーを動かす場合、無効化は同じプロセス内にしか届かない
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+    async def get(self, key: str) -> bytes | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        self._remove(key)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self.size += len(key) + len(value)
+        while self.size > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+
+    async def delete(self, key: str):
+        self._remove(key)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(key) + len(entry[1])
+
+
+class RedisCacheBackend:
+    # redis.asyncio.Redis と同じ get/set/delete を持つクライアントを使う
+    def __init__(self, client):
+        self.client = client
+
+    async def get(self, key: str) -> bytes | None:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self.client.set(key, value, px=int(ttl * 1000))
+
+    async def delete(self, key: str):
+        await self.client.delete(key)
+
+
+class TodoCache:
+    # ユーザごとのバージョンをキーに含め、書き込み時はバージョンを変えるだけで
+    # そのユーザのキャッシュをまとめて無効化する(古いエントリはTTL/LRUで消える)
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @staticmethod
+    def _version_key(user_id: int) -> str:
+        return f"todos:{user_id}:version"
+
+    async def _version(self, user_id: int) -> str:
+        version = await self.backend.get(self._version_key(user_id))
+        if version is None:
+            version = await self._new_version(user_id)
+        return version.decode() if isinstance(version, bytes) else version
+
+    async def _new_version(self, user_id: int) -> bytes:
+        # 過去に使ったバージョンと重複しないよう時刻から作る
+        version = str(time.time_ns()).encode()
+        await self.backend.set(self._version_key(user_id), version, self.ttl)
+        return version
+
+    async def get(self, user_id: int, *key_parts) -> tuple[object, str | None]:
+        # 値と、探したときのバージョンを返す
+        # 読み込んだ値はこのバージョンでsetする(途中で無効化されていれば捨てられる)
+        try:
+            version = await self._version(user_id)
+            value = await self.backend.get(self._key(user_id, version, key_parts))
+        except Exception as e:
+            self._error(e)
+            return None, None
+        if value is None:
+            self.misses += 1
+            TODO_CACHE_REQUESTS_TOTAL.labels("miss").inc()
+            return None, version
+        self.hits += 1
+        TODO_CACHE_REQUESTS_TOTAL.labels("hit").inc()
+        return from_json(value), version
+
+    async def set(self, user_id: int, *key_parts, value, version: str | None):
+        # setの時点のバージョンを読み直すと、読み込み中の書き込みで上がった
+        # 新しいバージョンに書き込み前の値を入れてしまうため、getで見た値を使う
+        if version is None:
+            return
+        try:
+            await self.backend.set(
+                self._key(user_id, version, key_parts), to_json(value), self.ttl
+            )
+        except Exception as e:
+            self._error(e)
+
+    async def invalidate(self, user_id: int):
+        try:
+            await self._new_version(user_id)
+        except Exception as e:
+            self._error(e)
+
+    @staticmethod
+    def _key(user_id: int, version: str, key_parts: tuple) -> str:
+        return f"todos:{user_id}:{version}:" + ":".join(map(str, key_parts))
+
+    def _error(self, e: Exception):
+        # キャッシュの障害ではリクエストを失敗させずDBから読む
+        self.errors += 1
+        TODO_CACHE_REQUESTS_TOTAL.labels("error").inc()
+        logger.warning(f"Todoキャッシュエラー: {e}")
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": self.hits / requests if requests else 0.0,
+        }
+
+
+def create_todo_cache() -> TodoCache | None:
+    if app_settings.TODO_CACHE_BACKEND == "memory":
+        backend = MemoryCacheBackend(app_settings.TODO_CACHE_MAX_BYTES)
+    elif app_settings.TODO_CACHE_BACKEND == "redis":
+        from redis.asyncio import Redis
+
+        backend = RedisCacheBackend(Redis.from_url(app_settings.REDIS_URL))
+    else:
+        return None
+    return TodoCache(backend, app_settings.TODO_CACHE_TTL)
+
+
+todo_cache = create_todo_cache()
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from config.env import app_settings
+from infrastructure.database import AsyncSessionLocal
+from infrastructure.todo_cache import todo_cache
+from models import TodoDeleteJob
+from repositories.todo_repository import TodoRepository
+from sqlalchemy import and_, func, or_, select
+
+logger = logging.getLogger("uvicorn")
+
+
+class TodoDeleteWorker:
+    # todo_delete_jobsテーブルのジョブを取り出し、Todoをチャンクごとに削除する
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        chunk_size: int = app_settings.TODO_DELETE_CHUNK_SIZE,
+        poll_interval: float = app_settings.TODO_DELETE_POLL_INTERVAL,
+        stale_seconds: int = app_settings.TODO_DELETE_STALE_SECONDS,
+        cache=todo_cache,
+    ):
+        self.session_factory = session_factory
+        self.chunk_size = chunk_size
+        self.poll_interval = poll_interval
+        self.stale_seconds = stale_seconds
+        self.cache = cache
+        self._task: asyncio.Task | None = None
+
+    async def process_job(self) -> bool:
+        async with self.session_factory() as db:
+            # 一定時間進捗のないrunningのジョブは、ワーカーが落ちたとみなして再実行する
+            job = await db.scalar(
+                select(TodoDeleteJob)
+                .where(
+                    or_(
+                        TodoDeleteJob.status == "pending",
+                        and_(
+                            TodoDeleteJob.status == "running",
+                            TodoDeleteJob.updated_at
+                            < func.now() - timedelta(seconds=self.stale_seconds),
+                        ),
+                    )
+                )
+                .order_by(TodoDeleteJob.updated_at)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )
+            if job is None:
+                return False
+            job_id = job.id
+            job.status = "running"
+            job.updated_at = datetime.now(timezone.utc)
+            await db.commit()
+
+            todo_repository = TodoRepository(db)
+            try:
+                while True:
+                    # 削除と進捗の更新を同じトランザクションでコミットする
+                    deleted = await todo_repository.delete_chunk(
+                        job.owner_id, self.chunk_size, job.soft_delete
+                    )
+                    job.deleted_count += deleted
+                    job.updated_at = datetime.now(timezone.utc)
+                    if deleted < self.chunk_size:
+                        job.status = "completed"
+                        job.finished_at = job.updated_at
+                    await db.commit()
+                    # アーカイブ済みのTodoの削除ではtodos_versionが上がるため、
+                    # 論理削除でも無効化する
+                    if deleted and self.cache is not None:
+                        await self.cache.invalidate(job.owner_id)
+                    if job.status == "completed":
+                        return True
+            except Exception as e:
+                await db.rollback()
+                job.status = "failed"
+                job.last_error = str(e)
+                job.finished_at = datetime.now(timezone.utc)
+                await db.commit()
+                logger.error(f"Todo一括削除ジョブエラー(job id={job_id}): {e}")
+                return True
+
+    async def run(self):
+        while True:
+            try:
+                processed = await self.process_job()
+            except Exception as e:
+                logger.error(f"Todo一括削除ワーカーエラー: {e}")
+                processed = False
+            if not processed:
+                await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+todo_delete_worker = TodoDeleteWorker()
+
+
+# APIとは別プロセスで動かす場合
+# uv run python -m infrastructure.todo_delete_worker
+if __name__ == "__main__":
+    asyncio.run(todo_delete_worker.run())
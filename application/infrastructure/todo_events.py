@@ -0,0 +1,169 @@
+import asyncio
+import logging
+
+import asyncpg
+from config.env import app_settings
+from infrastructure.metrics import TODO_EVENT_SUBSCRIPTIONS, TODO_EVENTS_DROPPED_TOTAL
+from repositories.todo_repository import TODO_CHANGES_CHANNEL
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger("uvicorn")
+
+
+class TodoSubscription:
+    # 1クライアント分の通知キュー(上限付き)
+    def __init__(self, user_id: int, queue_size: int):
+        self.user_id = user_id
+        self.queue_size = queue_size
+        self.closed = False
+        self._queue: asyncio.Queue[int | None] = asyncio.Queue()
+
+    def push(self, change_seq: int) -> bool:
+        if self._queue.qsize() >= self.queue_size:
+            return False
+        self._queue.put_nowait(change_seq)
+        return True
+
+    def close(self):
+        self.closed = True
+        self._queue.put_nowait(None)
+
+    async def wait(self, heartbeat: float) -> bool:
+        # 通知があればTrue、heartbeat秒通知がなければFalseを返す
+        # 溜まっている通知はまとめて読み捨てる(変更内容は呼び出し側がDBから読む)
+        # closeされた場合はEOFErrorを送出する
+        try:
+            change_seq = await asyncio.wait_for(self._queue.get(), heartbeat)
+        except TimeoutError:
+            return False
+        while change_seq is not None and not self._queue.empty():
+            change_seq = self._queue.get_nowait()
+        if change_seq is None or self.closed:
+            raise EOFError
+        return True
+
+
+class TodoEventBroker:
+    # ワーカーごとに1本のLISTEN接続でtodo_changesの通知を受け取り、
+    # そのユーザを購読しているクライアントに配る
+    # 通知の内容は "user_id:change_seq" のみで、変更内容は受け取った側が
+    # 差分同期と同じクエリで読む(NOTIFYのペイロード上限に依存しない)
+    def __init__(
+        self,
+        dsn: str,
+        channel: str = TODO_CHANGES_CHANNEL,
+        queue_size: int = app_settings.TODO_EVENTS_QUEUE_SIZE,
+        reconnect_interval: float = 1.0,
+    ):
+        self.dsn = dsn
+        self.channel = channel
+        self.queue_size = queue_size
+        self.reconnect_interval = reconnect_interval
+        self._subscriptions: dict[int, set[TodoSubscription]] = {}
+        self._connection: asyncpg.Connection | None = None
+        self._task: asyncio.Task | None = None
+        self._listening = asyncio.Event()
+
+    def subscribe(self, user_id: int) -> TodoSubscription:
+        subscription = TodoSubscription(user_id, self.queue_size)
+        self._subscriptions.setdefault(user_id, set()).add(subscription)
+        TODO_EVENT_SUBSCRIPTIONS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: TodoSubscription):
+        subscriptions = self._subscriptions.get(subscription.user_id)
+        if subscriptions is None or subscription not in subscriptions:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscriptions[subscription.user_id]
+        TODO_EVENT_SUBSCRIPTIONS.dec()
+
+    def subscription_count(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def publish(self, user_id: int, change_seq: int):
+        for subscription in list(self._subscriptions.get(user_id, ())):
+            if not subscription.push(change_seq):
+                # 読み出しが追いつかないクライアントは切断し、メモリを溜めない
+                # 再接続時にLast-Event-IDから差分を読み直せば取りこぼしはない
+                TODO_EVENTS_DROPPED_TOTAL.inc()
+                self.unsubscribe(subscription)
+                subscription.close()
+
+    def _on_notification(self, connection, pid, channel, payload: str):
+        try:
+            user_id, change_seq = map(int, payload.split(":"))
+        except ValueError:
+            logger.warning(f"不正なTodo変更通知: {payload}")
+            return
+        self.publish(user_id, change_seq)
+
+    def _wake_all(self):
+        # 接続が切れていた間の通知は失われるため、全クライアントに読み直させる
+        for user_id in list(self._subscriptions):
+            self.publish(user_id, 0)
+
+    async def _listen(self):
+        terminated = asyncio.Event()
+        self._connection = await asyncpg.connect(self.dsn)
+        self._connection.add_termination_listener(lambda _: terminated.set())
+        await self._connection.add_listener(self.channel, self._on_notification)
+        self._listening.set()
+        self._wake_all()
+        await terminated.wait()
+
+    async def run(self):
+        while True:
+            try:
+                await self._listen()
+            except (OSError, asyncpg.PostgresError) as e:
+                logger.error(f"Todo変更通知のLISTENエラー: {e}")
+            finally:
+                self._listening.clear()
+                await self._close_connection()
+            await asyncio.sleep(self.reconnect_interval)
+
+    async def start(self, connect_timeout: float = 5.0):
+        self._task = asyncio.create_task(self.run())
+        try:
+            await asyncio.wait_for(self._listening.wait(), connect_timeout)
+        except TimeoutError:
+            logger.error("Todo変更通知のLISTEN接続を確立できませんでした")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for subscriptions in list(self._subscriptions.values()):
+            for subscription in list(subscriptions):
+                self.unsubscribe(subscription)
+                subscription.close()
+
+    async def _close_connection(self):
+        if self._connection is not None:
+            try:
+                await self._connection.close(timeout=1)
+            except Exception:
+                self._connection.terminate()
+            self._connection = None
+
+
+def to_asyncpg_dsn(url: str) -> str:
+    # SQLAlchemyのURL(postgresql+asyncpg://...)をasyncpgが受け付ける形にする
+    return (
+        make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+    )
+
+
+def create_todo_event_broker() -> TodoEventBroker | None:
+    if not app_settings.TODO_EVENTS_ENABLED:
+        return None
+    return TodoEventBroker(to_asyncpg_dsn(app_settings.SQLALCHEMY_DATABASE_URL))
+
+
+todo_event_broker = create_todo_event_broker()
@@ -1,11 +1,28 @@
 import logging
-import traceback
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request, Response, status
+from fastapi import FastAPI, Response
 from starlette_csrf import CSRFMiddleware
-from fastapi.exceptions import HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from infrastructure.slack import send_slack_notification
+from infrastructure.database import (
+    async_engine,
+    get_db_pool_status,
+    replica_engines,
+    warm_up_pool,
+)
+from infrastructure.emails.email import precompile_templates
+from infrastructure.emails.outbox_worker import email_outbox_worker
+from infrastructure.metrics import metrics_response
+from infrastructure.middleware import (
+    ReadYourWritesMiddleware,
+    RequestTimingMiddleware,
+    get_latency_summary,
+)
+from infrastructure.slack import slack_notifier
+from infrastructure.todo_archive_worker import todo_archive_worker
+from infrastructure.todo_cache import todo_cache
+from infrastructure.todo_delete_worker import todo_delete_worker
+from infrastructure.todo_events import todo_event_broker
 from routers import auth, todos
 from config.csrf import csrf_settings
 from config.env import app_settings
@@ -13,26 +30,33 @@ from config.env import app_settings
 
 logger = logging.getLogger("uvicorn")
 
-app = FastAPI()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await warm_up_pool()
+    precompile_templates()
+    await slack_notifier.start()
+    if app_settings.EMAIL_OUTBOX_WORKER_ENABLED:
+        email_outbox_worker.start()
+    if app_settings.TODO_DELETE_WORKER_ENABLED:
+        todo_delete_worker.start()
+    if app_settings.TODO_ARCHIVE_WORKER_ENABLED:
+        todo_archive_worker.start()
+    if todo_event_broker is not None:
+        await todo_event_broker.start()
+    yield
+    if todo_event_broker is not None:
+        await todo_event_broker.stop()
+    await todo_archive_worker.stop()
+    await todo_delete_worker.stop()
+    await email_outbox_worker.stop()
+    await slack_notifier.stop()
+    await async_engine.dispose()
+    for replica_engine in replica_engines:
+        await replica_engine.dispose()
 
-@app.middleware("http")
-async def logging_middleware(request: Request, call_next):
-    client_ip = request.client.host if request.client else "unknown"
-    method = request.method
-    url = request.url.path
 
-    try:
-        response = await call_next(request)
-    except Exception:
-        response = Response(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        logger.error(f"Request: {method} {url} {response.status_code} ip: {client_ip}")
-        send_slack_notification(traceback.format_exc())
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Exception Occurred",
-        )
-    return response
+app = FastAPI(lifespan=lifespan)
 
 
 # https://github.com/frankie567/starlette-csrf/tree/main
@@ -46,6 +70,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ReadYourWritesMiddleware)
+# 全ミドルウェアを含めた処理時間を計測するため最後(最も外側)に追加する
+app.add_middleware(RequestTimingMiddleware)
 
 app.include_router(auth.router)
 app.include_router(todos.router)
@@ -54,3 +81,28 @@ app.include_router(todos.router)
 @app.get("/api/health")
 def health_check():
     return {"msg": "pass"}
+
+
+# ワーカーごとのコネクションプールの状態
+@app.get("/api/health/db-pool")
+def db_pool_status():
+    return get_db_pool_status()
+
+
+# ルートごとのレイテンシ(p50/p95/p99)
+@app.get("/api/health/latency")
+def latency_summary():
+    return get_latency_summary()
+
+
+# Todoキャッシュのヒット率
+@app.get("/api/health/todo-cache")
+def todo_cache_status():
+    return todo_cache.stats() if todo_cache is not None else {"backend": None}
+
+
+# Prometheus形式のメトリクス
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    content, content_type = metrics_response()
+    return Response(content=content, media_type=content_type)
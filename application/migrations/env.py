@@ -4,6 +4,7 @@ from logging.config import fileConfig
 import models
 from alembic import context
 from infrastructure.database import SQLALCHEMY_DATABASE_URL, Base
+from models.todo import TODO_PARTITION_COUNT, todo_partition_name
 from sqlalchemy import engine_from_config, pool
 
 # this is the Alembic Config object, which provides
@@ -27,6 +28,17 @@ target_metadata = Base.metadata
 # ... etc.
 config.set_main_option("sqlalchemy.url", SQLALCHEMY_DATABASE_URL)
 
+# todosのパーティションはモデルに定義しないため、autogenerateの比較から除外する
+TODO_PARTITION_NAMES = {
+    todo_partition_name(remainder) for remainder in range(TODO_PARTITION_COUNT)
+}
+
+
+def include_name(name, type_, parent_names) -> bool:
+    if type_ == "table":
+        return name not in TODO_PARTITION_NAMES
+    return True
+
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
@@ -46,6 +58,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -66,7 +79,11 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_name=include_name,
+        )
 
         with context.begin_transaction():
             context.run_migrations()
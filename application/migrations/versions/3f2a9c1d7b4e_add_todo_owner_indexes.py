@@ -0,0 +1,50 @@
+"""add todo owner indexes
+
+Revision ID: 3f2a9c1d7b4e
+Revises: ae0d0935f47f
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3f2a9c1d7b4e"
+down_revision: Union[str, None] = "ae0d0935f47f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ("ix_todos_owner_id_id", ["owner_id", "id"]),
+    ("ix_todos_owner_id_is_starred_id", ["owner_id", "is_starred", "id"]),
+    ("ix_todos_owner_id_is_completed_id", ["owner_id", "is_completed", "id"]),
+]
+
+
+def upgrade() -> None:
+    # 稼働中のテーブルをロックしないようCONCURRENTLYで作成する
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            op.create_index(
+                name,
+                "todos",
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _ in INDEXES:
+            op.drop_index(
+                name,
+                table_name="todos",
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,225 @@
+"""partition todos by owner
+
+Revision ID: a1b8c3d6e9f2
+Revises: f7a0b5c4d2e6
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a1b8c3d6e9f2"
+down_revision: Union[str, None] = "f7a0b5c4d2e6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITION_COUNT = 16
+# バックフィルで1トランザクションにコピーする行数(idの範囲)
+BATCH_SIZE = 10000
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+)
+# コピーする列(search_vectorは生成列のためコピー先で計算される)
+COLUMNS = (
+    "id",
+    "title",
+    "description",
+    "is_starred",
+    "is_completed",
+    "owner_id",
+    "deleted_at",
+    "version",
+    "change_seq",
+)
+INDEXES = (
+    ("ix_todos_owner_id_id", ["owner_id", "id"], {}),
+    ("ix_todos_owner_id_is_starred_id", ["owner_id", "is_starred", "id"], {}),
+    ("ix_todos_owner_id_is_completed_id", ["owner_id", "is_completed", "id"], {}),
+    ("ix_todos_owner_id_change_seq_id", ["owner_id", "change_seq", "id"], {}),
+    (
+        "ix_todos_owner_id_id_deleted",
+        ["owner_id", "id"],
+        {"postgresql_where": sa.text("deleted_at IS NOT NULL")},
+    ),
+    (
+        "ix_todos_owner_id_search_vector",
+        ["owner_id", "search_vector"],
+        {"postgresql_using": "gin"},
+    ),
+    (
+        "ix_todos_owner_id_title_trgm",
+        ["owner_id", "title"],
+        {"postgresql_using": "gin", "postgresql_ops": {"title": "gin_trgm_ops"}},
+    ),
+    (
+        "ix_todos_owner_id_description_trgm",
+        ["owner_id", "description"],
+        {"postgresql_using": "gin", "postgresql_ops": {"description": "gin_trgm_ops"}},
+    ),
+)
+
+
+def create_todos_table(table_name: str, partitioned: bool):
+    # 移行先のテーブルを作り、入れ替え後の名前になるインデックスは
+    # table_nameを付けた仮の名前で作る(rename_to_todosで戻す)
+    op.create_table(
+        table_name,
+        sa.Column(
+            "id",
+            sa.Integer(),
+            server_default=sa.text("nextval('todos_id_seq'::regclass)"),
+            nullable=False,
+        ),
+        sa.Column("title", sa.String(), nullable=True),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("is_starred", sa.Boolean(), nullable=True),
+        sa.Column("is_completed", sa.Boolean(), nullable=True),
+        sa.Column("owner_id", sa.Integer(), nullable=not partitioned),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+        sa.Column("change_seq", sa.Integer(), server_default="0", nullable=False),
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(SEARCH_VECTOR_EXPRESSION, persisted=True),
+            nullable=True,
+        ),
+        sa.ForeignKeyConstraint(
+            ["owner_id"], ["users.id"], name=f"{table_name}_owner_id_fkey"
+        ),
+        # パーティションキーを含まない一意制約は作れないため (id, owner_id) にする
+        sa.PrimaryKeyConstraint(
+            *(("id", "owner_id") if partitioned else ("id",)),
+            name=f"{table_name}_pkey",
+        ),
+        postgresql_partition_by="HASH (owner_id)" if partitioned else None,
+    )
+    if partitioned:
+        for remainder in range(PARTITION_COUNT):
+            op.execute(
+                f"CREATE TABLE todos_p{remainder:02d} PARTITION OF {table_name} "
+                f"FOR VALUES WITH (MODULUS {PARTITION_COUNT}, REMAINDER {remainder})"
+            )
+    else:
+        op.create_index(f"ix_{table_name}_id", table_name, ["id"], unique=False)
+    # 空のうちに作る(親に作ったインデックスは各パーティションにも作られる)
+    for index_name, columns, options in INDEXES:
+        op.create_index(
+            index_name.replace("todos", table_name, 1), table_name, columns, **options
+        )
+
+
+def rename_to_todos(table_name: str, partitioned: bool):
+    op.rename_table(table_name, "todos")
+    op.execute(f"ALTER TABLE todos RENAME CONSTRAINT {table_name}_pkey TO todos_pkey")
+    op.execute(
+        f"ALTER TABLE todos RENAME CONSTRAINT {table_name}_owner_id_fkey "
+        "TO todos_owner_id_fkey"
+    )
+    index_names = [index_name for index_name, _, _ in INDEXES]
+    if not partitioned:
+        index_names.append("ix_todos_id")
+    for index_name in index_names:
+        op.execute(
+            f"ALTER INDEX {index_name.replace('todos', table_name, 1)} "
+            f"RENAME TO {index_name}"
+        )
+
+
+def swap_todos(table_name: str, partitioned: bool):
+    # 古いtodosを削除して入れ替える。シーケンスはtodosに所有されているため、
+    # 先に新しいテーブルへ移してから削除する
+    op.execute(f"ALTER SEQUENCE todos_id_seq OWNED BY {table_name}.id")
+    op.drop_table("todos")
+    rename_to_todos(table_name, partitioned)
+
+
+def upgrade() -> None:
+    # オンラインで移行する(アプリを止めずに実行できる)
+    #   1. 空のパーティションテーブル todos_partitioned を作る
+    #   2. todosへの書き込みをトリガーで todos_partitioned にも反映する
+    #   3. 既存の行をidの範囲ごとに別々のトランザクションでコピーする
+    #   4. 短いロックの間にテーブルを入れ替える
+    # 途中で失敗した場合は、そのまま再実行すると3から再開する
+    bind = op.get_bind()
+    if bind.scalar(sa.text("SELECT EXISTS (SELECT FROM todos WHERE owner_id IS NULL)")):
+        raise RuntimeError(
+            "owner_idがNULLのTodoがあります。パーティションキーはNULLにできないため、"
+            "削除するかowner_idを設定してから実行してください"
+        )
+    columns = ", ".join(COLUMNS)
+    if not sa.inspect(bind).has_table("todos_partitioned"):
+        create_todos_table("todos_partitioned", partitioned=True)
+        # トリガーは書き込んだトランザクション内で実行されるため、コピー先は常に
+        # コミットされたtodosと一致する。バックフィルより新しい内容で上書きする
+        op.execute(
+            f"""
+            CREATE FUNCTION todos_partitioned_sync() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                IF TG_OP <> 'INSERT' THEN
+                    IF TG_OP = 'DELETE' OR (OLD.id, OLD.owner_id)
+                            IS DISTINCT FROM (NEW.id, NEW.owner_id) THEN
+                        DELETE FROM todos_partitioned
+                        WHERE id = OLD.id AND owner_id = OLD.owner_id;
+                    END IF;
+                END IF;
+                IF TG_OP <> 'DELETE' THEN
+                    INSERT INTO todos_partitioned ({columns})
+                    VALUES ({", ".join(f"NEW.{column}" for column in COLUMNS)})
+                    ON CONFLICT (id, owner_id) DO UPDATE SET
+                    {", ".join(f"{column} = EXCLUDED.{column}" for column in COLUMNS[1:])};
+                END IF;
+                RETURN NULL;
+            END
+            $$
+            """
+        )
+        op.execute(
+            "CREATE TRIGGER todos_partitioned_sync "
+            "AFTER INSERT OR UPDATE OR DELETE ON todos "
+            "FOR EACH ROW EXECUTE FUNCTION todos_partitioned_sync()"
+        )
+
+    # トリガーの作成をコミットしてから、バッチごとにコミットしてコピーする
+    # FOR SHAREで行をロックするため、コピー中に更新・削除された行は
+    # その書き込み(とトリガー)のコミットを待ってから最新の内容でコピーされる
+    with op.get_context().autocommit_block():
+        min_id, max_id = bind.execute(
+            sa.text("SELECT min(id), max(id) FROM todos")
+        ).one()
+        for start in range((min_id or 1) - 1, max_id or 0, BATCH_SIZE):
+            op.execute(
+                sa.text(
+                    f"INSERT INTO todos_partitioned ({columns}) "
+                    f"SELECT {columns} FROM todos "
+                    "WHERE id > :start AND id <= :stop FOR SHARE "
+                    "ON CONFLICT DO NOTHING"
+                ).bindparams(start=start, stop=start + BATCH_SIZE)
+            )
+
+    # 入れ替えはACCESS EXCLUSIVEロックを取る。長いトランザクションの後ろで
+    # 待ち続けて他のクエリを止めないよう、取れなければ失敗させて再実行する
+    op.execute("SET LOCAL lock_timeout = '5s'")
+    op.execute("LOCK TABLE todos IN ACCESS EXCLUSIVE MODE")
+    op.execute("DROP TRIGGER todos_partitioned_sync ON todos")
+    op.execute("DROP FUNCTION todos_partitioned_sync()")
+    swap_todos("todos_partitioned", partitioned=True)
+
+
+def downgrade() -> None:
+    # 書き込みを止めて(EXCLUSIVEロック)パーティションのないテーブルにコピーする
+    op.execute("LOCK TABLE todos IN EXCLUSIVE MODE")
+    create_todos_table("todos_unpartitioned", partitioned=False)
+    columns = ", ".join(COLUMNS)
+    op.execute(
+        f"INSERT INTO todos_unpartitioned ({columns}) SELECT {columns} FROM todos"
+    )
+    swap_todos("todos_unpartitioned", partitioned=False)
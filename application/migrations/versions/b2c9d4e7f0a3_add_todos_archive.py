@@ -0,0 +1,107 @@
+"""add todos archive
+
+Revision ID: b2c9d4e7f0a3
+Revises: a1b8c3d6e9f2
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b2c9d4e7f0a3"
+down_revision: Union[str, None] = "a1b8c3d6e9f2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ARCHIVABLE = "is_completed IS true AND deleted_at IS NULL"
+ARCHIVE_COLUMNS = (
+    "id, title, description, is_starred, is_completed, owner_id, "
+    "version, change_seq, updated_at"
+)
+
+
+def upgrade() -> None:
+    # now()は追加時に1回だけ評価されるため、テーブルは書き換えられない
+    # 既存の行は追加した時点で更新されたものとして扱う
+    op.add_column(
+        "todos",
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+    )
+    op.create_table(
+        "todos_archive",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(), nullable=True),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("is_starred", sa.Boolean(), nullable=True),
+        sa.Column("is_completed", sa.Boolean(), nullable=True),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("change_seq", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column(
+            "archived_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["owner_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_todos_archive_owner_id_id",
+        "todos_archive",
+        ["owner_id", "id"],
+        unique=False,
+    )
+
+    # パーティションテーブルにはCONCURRENTLYでインデックスを作れないため、
+    # 親には無効なインデックスだけを作り、パーティションごとにCONCURRENTLYで
+    # 作ってからアタッチする(全パーティションをアタッチすると有効になる)
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_todos_updated_at_archivable "
+        f"ON ONLY todos (updated_at) WHERE {ARCHIVABLE}"
+    )
+    partitions = (
+        op.get_bind()
+        .scalars(
+            sa.text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = CAST('todos' AS regclass) ORDER BY c.relname"
+            )
+        )
+        .all()
+    )
+    with op.get_context().autocommit_block():
+        for partition in partitions:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS "
+                f"{partition}_updated_at_archivable "
+                f"ON {partition} (updated_at) WHERE {ARCHIVABLE}"
+            )
+            op.execute(
+                "ALTER INDEX ix_todos_updated_at_archivable "
+                f"ATTACH PARTITION {partition}_updated_at_archivable"
+            )
+
+
+def downgrade() -> None:
+    # アーカイブ済みのTodoはtodosに戻してから削除する
+    op.execute(
+        f"INSERT INTO todos ({ARCHIVE_COLUMNS}) "
+        f"SELECT {ARCHIVE_COLUMNS} FROM todos_archive"
+    )
+    op.drop_index("ix_todos_archive_owner_id_id", table_name="todos_archive")
+    op.drop_table("todos_archive")
+    op.drop_index("ix_todos_updated_at_archivable", table_name="todos")
+    op.drop_column("todos", "updated_at")
@@ -0,0 +1,51 @@
+"""add todo delete job watermark
+
+Revision ID: c3d0e5f8a1b4
+Revises: b2c9d4e7f0a3
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c3d0e5f8a1b4"
+down_revision: Union[str, None] = "b2c9d4e7f0a3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE = "status IN ('pending', 'running')"
+
+
+def upgrade() -> None:
+    op.add_column(
+        "todo_delete_jobs", sa.Column("delete_through_id", sa.Integer(), nullable=True)
+    )
+    op.add_column(
+        "todo_delete_jobs", sa.Column("change_seq", sa.Integer(), nullable=True)
+    )
+    # 同時に受け付けられて重複した未完了のジョブは、最初のジョブだけを残す
+    op.execute(
+        "UPDATE todo_delete_jobs SET status = 'failed', "
+        "last_error = 'duplicate of an active job', finished_at = now() "
+        f"WHERE {ACTIVE} AND id NOT IN ("
+        f"  SELECT min(id) FROM todo_delete_jobs WHERE {ACTIVE} GROUP BY owner_id"
+        ")"
+    )
+    op.create_index(
+        "ux_todo_delete_jobs_owner_id_active",
+        "todo_delete_jobs",
+        ["owner_id"],
+        unique=True,
+        postgresql_where=sa.text(ACTIVE),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ux_todo_delete_jobs_owner_id_active", table_name="todo_delete_jobs")
+    op.drop_column("todo_delete_jobs", "change_seq")
+    op.drop_column("todo_delete_jobs", "delete_through_id")
@@ -0,0 +1,82 @@
+"""add todo soft delete and delete jobs
+
+Revision ID: c4d7e2f1a9b3
+Revises: 8b1e4d2c6a90
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c4d7e2f1a9b3"
+down_revision: Union[str, None] = "8b1e4d2c6a90"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # NULL許容・デフォルトなしの列追加はテーブルの書き換えを伴わない
+    op.add_column(
+        "todos", sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=True)
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_todos_owner_id_id_deleted",
+            "todos",
+            ["owner_id", "id"],
+            unique=False,
+            postgresql_where=sa.text("deleted_at IS NOT NULL"),
+            postgresql_concurrently=True,
+        )
+    op.create_table(
+        "todo_delete_jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("soft_delete", sa.Boolean(), nullable=False),
+        sa.Column("deleted_count", sa.Integer(), nullable=False),
+        sa.Column("last_error", sa.String(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["owner_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_todo_delete_jobs_id"), "todo_delete_jobs", ["id"], unique=False
+    )
+    op.create_index(
+        "ix_todo_delete_jobs_active",
+        "todo_delete_jobs",
+        ["updated_at"],
+        unique=False,
+        postgresql_where=sa.text("status IN ('pending', 'running')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_todo_delete_jobs_active", table_name="todo_delete_jobs")
+    op.drop_index(op.f("ix_todo_delete_jobs_id"), table_name="todo_delete_jobs")
+    op.drop_table("todo_delete_jobs")
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_todos_owner_id_id_deleted",
+            table_name="todos",
+            postgresql_concurrently=True,
+        )
+    op.drop_column("todos", "deleted_at")
@@ -0,0 +1,36 @@
+"""add todo versions
+
+Revision ID: d5e8f3a2b0c4
+Revises: c4d7e2f1a9b3
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d5e8f3a2b0c4"
+down_revision: Union[str, None] = "c4d7e2f1a9b3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 定数のデフォルト値を持つ列の追加はテーブルの書き換えを伴わない(PostgreSQL 11以降)
+    op.add_column(
+        "todos",
+        sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+    )
+    op.add_column(
+        "users",
+        sa.Column("todos_version", sa.Integer(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("users", "todos_version")
+    op.drop_column("todos", "version")
@@ -0,0 +1,43 @@
+"""add email outbox sending status
+
+Revision ID: d6a1f4c8e2b7
+Revises: c3d0e5f8a1b4
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d6a1f4c8e2b7"
+down_revision: Union[str, None] = "c3d0e5f8a1b4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # リースが切れたsendingのメールも部分インデックスで取り出せるようにする
+    op.drop_index("ix_email_outbox_pending", table_name="email_outbox")
+    op.create_index(
+        "ix_email_outbox_pending",
+        "email_outbox",
+        ["next_attempt_at"],
+        unique=False,
+        postgresql_where=sa.text("status IN ('pending', 'sending')"),
+    )
+
+
+def downgrade() -> None:
+    op.execute("UPDATE email_outbox SET status = 'pending' WHERE status = 'sending'")
+    op.drop_index("ix_email_outbox_pending", table_name="email_outbox")
+    op.create_index(
+        "ix_email_outbox_pending",
+        "email_outbox",
+        ["next_attempt_at"],
+        unique=False,
+        postgresql_where=sa.text("status = 'pending'"),
+    )
@@ -0,0 +1,71 @@
+"""add todo change_seq and tombstones
+
+Revision ID: e6f9a4b3c1d5
+Revises: d5e8f3a2b0c4
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e6f9a4b3c1d5"
+down_revision: Union[str, None] = "d5e8f3a2b0c4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 既存の行は0になり、sinceを指定しない初回の同期で返される
+    op.add_column(
+        "todos",
+        sa.Column("change_seq", sa.Integer(), server_default="0", nullable=False),
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_todos_owner_id_change_seq_id",
+            "todos",
+            ["owner_id", "change_seq", "id"],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+    op.create_table(
+        "todo_tombstones",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("todo_id", sa.Integer(), nullable=False),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("change_seq", sa.Integer(), nullable=False),
+        sa.Column(
+            "deleted_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_todo_tombstones_owner_id_change_seq",
+        "todo_tombstones",
+        ["owner_id", "change_seq", "todo_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_todo_tombstones_owner_id_change_seq", table_name="todo_tombstones"
+    )
+    op.drop_table("todo_tombstones")
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_todos_owner_id_change_seq_id",
+            table_name="todos",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column("todos", "change_seq")
@@ -0,0 +1,75 @@
+"""add todo search
+
+Revision ID: f7a0b5c4d2e6
+Revises: e6f9a4b3c1d5
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f7a0b5c4d2e6"
+down_revision: Union[str, None] = "e6f9a4b3c1d5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+)
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # GINインデックスにowner_id(整数)を含めるために必要
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+    # 生成列の追加はテーブルの書き換えを伴う(ACCESS EXCLUSIVEロック)ため、
+    # 行数の多い環境ではメンテナンス時間に実行する
+    op.add_column(
+        "todos",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(SEARCH_VECTOR_EXPRESSION, persisted=True),
+            nullable=True,
+        ),
+    )
+    with op.get_context().autocommit_block():
+        for index_name, column, ops in (
+            ("ix_todos_owner_id_search_vector", "search_vector", None),
+            ("ix_todos_owner_id_title_trgm", "title", "gin_trgm_ops"),
+            ("ix_todos_owner_id_description_trgm", "description", "gin_trgm_ops"),
+        ):
+            op.create_index(
+                index_name,
+                "todos",
+                ["owner_id", column],
+                unique=False,
+                postgresql_using="gin",
+                postgresql_ops={column: ops} if ops else {},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for index_name in (
+            "ix_todos_owner_id_description_trgm",
+            "ix_todos_owner_id_title_trgm",
+            "ix_todos_owner_id_search_vector",
+        ):
+            op.drop_index(
+                index_name,
+                table_name="todos",
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
+    op.drop_column("todos", "search_vector")
+    # 拡張は他で使われている可能性があるため削除しない
@@ -1,2 +1,6 @@
 from .todo import Todos
 from .user import Users
+from .email_outbox import EmailOutbox
+from .todo_delete_job import TodoDeleteJob
+from .todo_tombstone import TodoTombstone
+from .todo_archive import TodoArchive
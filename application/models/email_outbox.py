@@ -0,0 +1,36 @@
+from infrastructure.database import Base
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, String, func
+
+# ワーカーが取り出す対象(sendingはリースが切れたもの)
+CLAIMABLE_STATUSES = ("pending", "sending")
+
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    recipient = Column(String, nullable=False)
+    template_name = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    context = Column(JSON, nullable=False, default=dict)
+    # pending: 送信待ち / sending: ワーカーが送信中(next_attempt_atまでリース) /
+    # sent: 送信済み / failed: リトライ上限到達
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+    last_error = Column(String)
+    created_at = Column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+    sent_at = Column(DateTime(timezone=True))
+
+    # 送信待ち・送信中のメールだけを対象にした部分インデックス
+    __table_args__ = (
+        Index(
+            "ix_email_outbox_pending",
+            "next_attempt_at",
+            postgresql_where=status.in_(CLAIMABLE_STATUSES),
+        ),
+    )
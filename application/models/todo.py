@@ -1,13 +1,129 @@
 from infrastructure.database import Base
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String
+from sqlalchemy import (
+    DDL,
+    Boolean,
+    Column,
+    Computed,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    and_,
+    event,
+    func,
+    text,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred
+
+# 言語に依存しないよう語幹処理をしない simple 設定を使う(タイトルを重く評価する)
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+)
+
+# todosはowner_idのハッシュでこの数のパーティション(todos_p00 ...)に分割する
+# ユーザごとの読み書きは1つのパーティションだけに触れ、VACUUMやインデックスの
+# メンテナンスもパーティション単位で進む
+TODO_PARTITION_COUNT = 16
+
+
+def todo_partition_name(remainder: int) -> str:
+    return f"todos_p{remainder:02d}"
 
 
 class Todos(Base):
     __tablename__ = "todos"
 
-    id = Column(Integer, primary_key=True, index=True)
+    # パーティションキーを含まない一意制約は作れないため、主キーは (id, owner_id)
+    # idは今まで通りシーケンスで全体で一意に採番する
+    id = Column(Integer, primary_key=True, autoincrement=True)
     title = Column(String)
     description = Column(String)
     is_starred = Column(Boolean, default=False)
     is_completed = Column(Boolean, default=False)
-    owner_id = Column(Integer, ForeignKey("users.id"))
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    # 論理削除された日時(NULLでなければ一覧などから除外し、後で物理削除する)
+    deleted_at = Column(DateTime(timezone=True))
+    # 更新のたびに1増える(ETag / If-Matchによる楽観的排他制御に使う)
+    version = Column(Integer, nullable=False, server_default="1")
+    # 最後に変更されたときのユーザのtodos_version(差分同期のカーソル)
+    change_seq = Column(Integer, nullable=False, server_default="0")
+    # 最後に作成・更新された日時(完了したTodoのアーカイブの判定に使う)
+    updated_at = Column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+    # 全文検索用(title / descriptionから自動で生成され、RETURNINGなどでは読まない)
+    search_vector = deferred(
+        Column(TSVECTOR, Computed(SEARCH_VECTOR_EXPRESSION, persisted=True))
+    )
+
+    # 一覧取得(owner_idで絞り込みidで並べる)のキーセットページネーション用
+    __table_args__ = (
+        Index("ix_todos_owner_id_id", "owner_id", "id"),
+        Index("ix_todos_owner_id_is_starred_id", "owner_id", "is_starred", "id"),
+        Index("ix_todos_owner_id_is_completed_id", "owner_id", "is_completed", "id"),
+        # 差分同期(change_seqより後に変更されたTodo)用
+        Index("ix_todos_owner_id_change_seq_id", "owner_id", "change_seq", "id"),
+        # 論理削除済みの行の物理削除用
+        Index(
+            "ix_todos_owner_id_id_deleted",
+            "owner_id",
+            "id",
+            postgresql_where=deleted_at.isnot(None),
+        ),
+        # アーカイブの対象(完了済み)だけの部分インデックス。古い順に取り出す
+        Index(
+            "ix_todos_updated_at_archivable",
+            "updated_at",
+            postgresql_where=and_(is_completed.is_(True), deleted_at.is_(None)),
+        ),
+        # 検索用: 単語・前方一致は全文検索、綴りの揺れはpg_trgmのトライグラムで引く
+        # btree_ginでowner_idも同じGINインデックスに含め、ユーザの行だけを引く
+        Index(
+            "ix_todos_owner_id_search_vector",
+            "owner_id",
+            "search_vector",
+            postgresql_using="gin",
+        ),
+        Index(
+            "ix_todos_owner_id_title_trgm",
+            "owner_id",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_todos_owner_id_description_trgm",
+            "owner_id",
+            "description",
+            postgresql_using="gin",
+            postgresql_ops={"description": "gin_trgm_ops"},
+        ),
+        # 親テーブルに作ったインデックスは各パーティションにも作られる
+        {"postgresql_partition_by": "HASH (owner_id)"},
+    )
+
+
+# create_all(テスト)でも検索用のインデックスを作れるようにする
+event.listen(
+    Todos.__table__,
+    "before_create",
+    DDL(
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm; CREATE EXTENSION IF NOT EXISTS btree_gin"
+    ),
+)
+
+
+# create_all(テスト)でもパーティションを作る(本番はマイグレーションで作る)
+@event.listens_for(Todos.__table__, "after_create")
+def create_todo_partitions(target, connection, **kw):
+    for remainder in range(TODO_PARTITION_COUNT):
+        connection.execute(
+            text(
+                f"CREATE TABLE {todo_partition_name(remainder)} PARTITION OF todos "
+                f"FOR VALUES WITH (MODULUS {TODO_PARTITION_COUNT}, "
+                f"REMAINDER {remainder})"
+            )
+        )
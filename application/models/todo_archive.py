@@ -0,0 +1,32 @@
+from infrastructure.database import Base
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    func,
+)
+
+
+class TodoArchive(Base):
+    # 完了してから一定期間更新のないTodoの移動先(infrastructure.todo_archive_worker)
+    # todosのインデックスを小さく保つため、読み取りは ?include_archived=true の場合だけ
+    __tablename__ = "todos_archive"
+
+    id = Column(Integer, primary_key=True)
+    title = Column(String)
+    description = Column(String)
+    is_starred = Column(Boolean)
+    is_completed = Column(Boolean)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    version = Column(Integer, nullable=False)
+    change_seq = Column(Integer, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+    archived_at = Column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+
+    __table_args__ = (Index("ix_todos_archive_owner_id_id", "owner_id", "id"),)
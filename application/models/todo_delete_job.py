@@ -0,0 +1,56 @@
+from infrastructure.database import Base
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    func,
+)
+
+# 未完了のジョブ(ユーザごとに1つまで)
+ACTIVE_STATUSES = ("pending", "running")
+
+
+class TodoDeleteJob(Base):
+    __tablename__ = "todo_delete_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # pending: 実行待ち / running: 実行中 / completed: 完了 / failed: 失敗
+    status = Column(String, nullable=False, default="pending")
+    # Trueの場合は論理削除済みの行だけを物理削除する
+    soft_delete = Column(Boolean, nullable=False, default=False)
+    # 論理削除のジョブを受け付けた時点のユーザのTodoの最大id
+    # 完了するまでこのid以下のTodoは削除済みとして扱う(行を書き換えずに即座に隠す)
+    delete_through_id = Column(Integer)
+    # 論理削除を受け付けたときのtodos_version(隠したTodoの差分同期上の変更順)
+    change_seq = Column(Integer)
+    deleted_count = Column(Integer, nullable=False, default=0)
+    last_error = Column(String)
+    created_at = Column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+    updated_at = Column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+    finished_at = Column(DateTime(timezone=True))
+
+    # 未完了のジョブだけを対象にした部分インデックス
+    __table_args__ = (
+        Index(
+            "ix_todo_delete_jobs_active",
+            "updated_at",
+            postgresql_where=status.in_(ACTIVE_STATUSES),
+        ),
+        # 同時に受け付けても未完了のジョブはユーザごとに1つ(INSERT ... ON CONFLICT)
+        # 論理削除のTodoを隠すときの検索にも使う
+        Index(
+            "ux_todo_delete_jobs_owner_id_active",
+            "owner_id",
+            unique=True,
+            postgresql_where=status.in_(ACTIVE_STATUSES),
+        ),
+    )
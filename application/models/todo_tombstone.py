@@ -0,0 +1,24 @@
+from infrastructure.database import Base
+from sqlalchemy import Column, DateTime, Index, Integer, func
+
+
+class TodoTombstone(Base):
+    # 削除されたTodoの記録(差分同期でクライアントに削除を伝える)
+    __tablename__ = "todo_tombstones"
+
+    id = Column(Integer, primary_key=True)
+    todo_id = Column(Integer, nullable=False)
+    owner_id = Column(Integer, nullable=False)
+    change_seq = Column(Integer, nullable=False)
+    deleted_at = Column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+
+    __table_args__ = (
+        Index(
+            "ix_todo_tombstones_owner_id_change_seq",
+            "owner_id",
+            "change_seq",
+            "todo_id",
+        ),
+    )
@@ -13,3 +13,5 @@ class Users(Base):
     password = Column(String)
     is_admin = Column(Boolean, default=False)
     phone_number = Column(String)
+    # ユーザのTodoが変更されるたびに1増える(一覧のETagと差分同期に使う)
+    todos_version = Column(Integer, nullable=False, server_default="0")
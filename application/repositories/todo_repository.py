@@ -1,51 +1,702 @@
+import re
+from datetime import timedelta
+from typing import AsyncIterator
+
 from models.todo import Todos
+from models.todo_archive import TodoArchive
+from models.todo_delete_job import ACTIVE_STATUSES, TodoDeleteJob
+from models.todo_tombstone import TodoTombstone
 from models.user import Users
-from sqlalchemy import select, update, delete
-from sqlalchemy.orm import Session
+from sqlalchemy import (
+    Boolean,
+    Integer,
+    Select,
+    String,
+    column,
+    delete,
+    exists,
+    func,
+    or_,
+    insert,
+    literal,
+    null,
+    select,
+    true,
+    tuple_,
+    union_all,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from schemas.requests.todo_request_schema import (
+    BatchUpdateTodoRequest,
     CreateTodoRequest,
     UpdateTodoRequest,
 )
 
 
+# 読み取り系はORMオブジェクトを作らず必要な列だけをdictで返す
+TODO_COLUMNS = (
+    Todos.id,
+    Todos.title,
+    Todos.description,
+    Todos.is_starred,
+    Todos.is_completed,
+    Todos.owner_id,
+)
+
+COPY_COLUMNS = (
+    "title",
+    "description",
+    "is_starred",
+    "is_completed",
+    "owner_id",
+    "change_seq",
+)
+
+
+# Todoの変更を通知するチャネル(infrastructure.todo_eventsがLISTENする)
+TODO_CHANGES_CHANNEL = "todo_changes"
+
+
+def bump_todos_version(owner_id: int | Select, *guard):
+    # ユーザのtodos_versionを上げ、上げた後の値(とユーザのid)を返す
+    # 同じトランザクションでNOTIFYし、コミットされた変更だけが通知される
+    # owner_idにユーザのidを返すSELECTを渡すと、複数のユーザをまとめて上げる
+    # guardを指定した場合は、その条件に合う行がある場合だけ上げる
+    # (404や412になる書き込みでバージョン・行ロック・通知を発生させない)
+    if isinstance(owner_id, Select):
+        query = update(Users).where(Users.id.in_(owner_id.scalar_subquery()))
+    else:
+        query = update(Users).where(Users.id == owner_id)
+    if guard:
+        query = query.where(exists().where(*guard))
+    return query.values(todos_version=Users.todos_version + 1).returning(
+        Users.todos_version,
+        Users.id,
+        func.pg_notify(
+            TODO_CHANGES_CHANNEL,
+            func.format("%s:%s", Users.id, Users.todos_version),
+        ),
+    )
+
+
+def next_change_seq(owner_id: int, *guard):
+    # 書き込みと同じステートメントのCTEでユーザのtodos_versionを上げ、
+    # 上げた後の値を変更したTodoのchange_seqにする
+    # usersの行ロックで同じユーザの書き込みが直列化されるため、
+    # change_seqはコミット順に増える(差分同期で取りこぼしが起きない)
+    # CTEは書き込む行の有無に関係なく実行されるため、guardには書き込みと同じ条件を渡す
+    bump = bump_todos_version(owner_id, *guard).cte("bump_todos_version")
+    return select(bump.c.todos_version).scalar_subquery()
+
+
+def soft_delete_job(column, owner_id):
+    # 未完了の論理削除ジョブの列(なければNULL)
+    # owner_idにTodos.owner_idを渡すと行ごとのユーザで引く
+    return (
+        select(column)
+        .where(
+            TodoDeleteJob.owner_id == owner_id,
+            TodoDeleteJob.status.in_(ACTIVE_STATUSES),
+            TodoDeleteJob.soft_delete.is_(True),
+        )
+        .scalar_subquery()
+    )
+
+
+def hidden_by_delete_job(model, owner_id):
+    # 論理削除のジョブを受け付けた時点にあったTodo(物理削除されるまで隠す)
+    return model.id <= func.coalesce(
+        soft_delete_job(TodoDeleteJob.delete_through_id, owner_id), 0
+    )
+
+
+def is_deleted(owner_id):
+    # 論理削除されたTodo。否定(~is_deleted)が一覧・取得・更新の対象になる
+    return or_(Todos.deleted_at.isnot(None), hidden_by_delete_job(Todos, owner_id))
+
+
+def delete_with_tombstones(*conditions, owner_id: int | None = None, change_seq=None):
+    # 削除した行のtombstoneを同じステートメントで書き込み、削除したidを返す
+    # owner_idを指定した場合は新しいchange_seqを振る。指定しない場合は
+    # 論理削除のときに振ったchange_seq(change_seqがあればその値)を使う
+    # (一覧の内容は変わらない)
+    deleted = (
+        delete(Todos)
+        .where(*conditions)
+        .returning(Todos.id, Todos.owner_id, Todos.change_seq)
+        .cte("deleted_todos")
+    )
+    if owner_id is not None:
+        change_seq = next_change_seq(owner_id, *conditions)
+    else:
+        change_seq = func.coalesce(change_seq, deleted.c.change_seq)
+    tombstones = (
+        insert(TodoTombstone)
+        .from_select(
+            ["todo_id", "owner_id", "change_seq"],
+            select(deleted.c.id, deleted.c.owner_id, change_seq),
+        )
+        .cte("todo_tombstones")
+    )
+    return select(deleted.c.id).add_cte(tombstones)
+
+
+def todo_page_query(
+    model,
+    owner_id: int,
+    after_id: int | None = None,
+    is_starred: bool | None = None,
+    is_completed: bool | None = None,
+):
+    # todos / todos_archive からTODO_COLUMNSと同じ列を読む一覧のクエリ
+    query = select(*(getattr(model, column.name) for column in TODO_COLUMNS)).where(
+        model.owner_id == owner_id
+    )
+    if after_id is not None:
+        query = query.where(model.id > after_id)
+    if is_starred is not None:
+        query = query.where(model.is_starred == is_starred)
+    if is_completed is not None:
+        query = query.where(model.is_completed == is_completed)
+    return query
+
+
+def archive_todos_query(older_than: timedelta, batch_size: int):
+    # 完了してからolder_than以上更新のないTodoを古い順にbatch_size件、
+    # 1ステートメントでtodos_archiveに移し、ユーザごとの移動件数を返す
+    # リクエストが書き込み中の行はSKIP LOCKEDで飛ばして待たない
+    batch = (
+        select(Todos.id, Todos.owner_id)
+        .where(
+            Todos.is_completed.is_(True),
+            Todos.deleted_at.is_(None),
+            ~is_deleted(Todos.owner_id),
+            Todos.updated_at < func.now() - older_than,
+        )
+        .order_by(Todos.updated_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .cte("archive_batch")
+    )
+    archive_columns = [
+        column.name
+        for column in TodoArchive.__table__.columns
+        if column.name != "archived_at"
+    ]
+    moved = (
+        delete(Todos)
+        .where(Todos.id == batch.c.id, Todos.owner_id == batch.c.owner_id)
+        .returning(*(getattr(Todos, name) for name in archive_columns))
+        .cte("archived_todos")
+    )
+    archived = (
+        insert(TodoArchive)
+        .from_select(
+            archive_columns, select(*(moved.c[name] for name in archive_columns))
+        )
+        .cte("todos_archive")
+    )
+    # 一覧の内容が変わるため、ETagとキャッシュ用のtodos_versionを上げて通知する
+    # usersの行はリクエストの書き込みと逆の順でロックすることになるため、
+    # 待たずにエラーにする(デッドロックせず、このバッチは後で再実行する)
+    owners = (
+        select(Users.id)
+        .where(Users.id.in_(select(moved.c.owner_id)))
+        .with_for_update(nowait=True)
+    )
+    bump = bump_todos_version(owners).cte("bump_todos_version")
+    # 差分同期は既定の一覧(アーカイブ済みを含まない)と揃え、アーカイブは
+    # 上げた後のバージョンをchange_seqとしたtombstoneで削除として伝える
+    tombstones = (
+        insert(TodoTombstone)
+        .from_select(
+            ["todo_id", "owner_id", "change_seq"],
+            select(moved.c.id, moved.c.owner_id, bump.c.todos_version).join(
+                bump, bump.c.id == moved.c.owner_id
+            ),
+        )
+        .cte("todo_tombstones")
+    )
+    return (
+        select(moved.c.owner_id, func.count())
+        .group_by(moved.c.owner_id)
+        .add_cte(archived)
+        .add_cte(tombstones)
+    )
+
+
+def search_todos_query(
+    owner_id: int,
+    q: str,
+    limit: int | None = None,
+    after: tuple[float, int] | None = None,
+):
+    # 単語の前方一致は全文検索(GIN)、綴りの揺れはpg_trgmのword_similarity(GIN)で探し、
+    # 両方のスコアの合計で並べる。(score, id) のキーセットでページングする
+    terms = re.findall(r"[^\W_]+", q.lower())
+    tsquery = func.to_tsquery("simple", " & ".join(f"{term}:*" for term in terms))
+    score = func.ts_rank(Todos.search_vector, tsquery) + func.greatest(
+        func.word_similarity(q, Todos.title),
+        func.word_similarity(q, Todos.description),
+    )
+    query = select(*TODO_COLUMNS, score.label("score")).where(
+        Todos.owner_id == owner_id,
+        ~is_deleted(owner_id),
+        or_(
+            Todos.search_vector.op("@@")(tsquery),
+            Todos.title.op("%>")(q),
+            Todos.description.op("%>")(q),
+        ),
+    )
+    if after is not None:
+        query = query.where(tuple_(score, Todos.id) < tuple_(*after))
+    return query.order_by(score.desc(), Todos.id.desc()).limit(limit)
+
+
 class TodoRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def find_all(self, user: Users) -> list[Todos]:
-        todos = self.db.scalars(
-            select(Todos).filter(Todos.owner_id == user.id).order_by(Todos.id)
-        ).all()
-        return todos
+    async def find_all(
+        self,
+        user: Users,
+        limit: int | None = None,
+        after_id: int | None = None,
+        is_starred: bool | None = None,
+        is_completed: bool | None = None,
+        include_archived: bool = False,
+    ) -> tuple[list[dict], int]:
+        # (owner_id, id) の複合インデックスを使ったキーセットページネーション
+        # owner_idは値で渡し、計画時にユーザのパーティションだけに絞り込ませる
+        filters = (user.id, after_id, is_starred, is_completed)
+        page = (
+            todo_page_query(Todos, *filters)
+            .where(~is_deleted(user.id))
+            .order_by(Todos.id)
+            .limit(limit)
+        )
+        if include_archived:
+            # それぞれからlimit件ずつ読み、合わせてid順にlimit件にする
+            archived = (
+                todo_page_query(TodoArchive, *filters)
+                .order_by(TodoArchive.id)
+                .limit(limit)
+            )
+            page = union_all(page, archived).subquery("todos")
+            page = select(page).order_by(page.c.id).limit(limit)
+        page = page.lateral("page")
+        # ETag用のバージョンも同じクエリで取得する(Todoが0件でもユーザの1行は返る)
+        rows = await self.db.execute(
+            select(Users.todos_version, *page.c)
+            .select_from(Users)
+            .outerjoin(page, true())
+            .where(Users.id == user.id)
+            .order_by(page.c.id)
+        )
+        rows = rows.mappings().all()
+        version = rows[0]["todos_version"] if rows else 0
+        todos = [
+            {column.name: row[column.name] for column in TODO_COLUMNS}
+            for row in rows
+            if row["id"] is not None
+        ]
+        return todos, version
 
-    def find_one(self, user: Users, todo_id: int) -> Todos | None:
-        todo = self.db.scalars(
-            select(Todos).filter(Todos.id == todo_id, Todos.owner_id == user.id)
-        ).first()
-        return todo
+    async def find_todos_version(self, user: Users) -> int:
+        version = await self.db.scalar(
+            select(Users.todos_version).where(Users.id == user.id)
+        )
+        return version or 0
+
+    async def find_one(
+        self, user: Users, todo_id: int, include_archived: bool = False
+    ) -> dict | None:
+        query = select(*TODO_COLUMNS, Todos.version).filter(
+            Todos.id == todo_id,
+            Todos.owner_id == user.id,
+            ~is_deleted(user.id),
+        )
+        if include_archived:
+            query = union_all(
+                query,
+                todo_page_query(TodoArchive, user.id)
+                .add_columns(TodoArchive.version)
+                .where(TodoArchive.id == todo_id),
+            )
+        todo = await self.db.execute(query)
+        todo = todo.mappings().first()
+        return dict(todo) if todo else None
+
+    async def search(
+        self,
+        user: Users,
+        q: str,
+        limit: int | None = None,
+        after: tuple[float, int] | None = None,
+    ) -> list[dict]:
+        todos = await self.db.execute(search_todos_query(user.id, q, limit, after))
+        return [dict(todo) for todo in todos.mappings()]
+
+    async def stream_all(
+        self, user: Users, batch_size: int
+    ) -> AsyncIterator[list[dict]]:
+        # サーバサイドカーソルでbatch_size件ずつ取得し、全件をメモリに載せない
+        result = await self.db.stream(
+            select(*TODO_COLUMNS)
+            .filter(Todos.owner_id == user.id, ~is_deleted(user.id))
+            .order_by(Todos.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for partition in result.mappings().partitions():
+            yield [dict(todo) for todo in partition]
+
+    async def find_changes(
+        self,
+        user: Users,
+        after_seq: int,
+        after_id: int | None = None,
+        limit: int | None = None,
+    ) -> list[dict]:
+        # (change_seq, id) のキーセットで、after_seqより後に変更された行と
+        # 削除された行(論理削除とtombstone)をまとめて変更順に返す
+        def after(seq_column, id_column):
+            if after_id is None:
+                return seq_column > after_seq
+            return tuple_(seq_column, id_column) > tuple_(after_seq, after_id)
 
-    def create(self, user: Users, todo_request: CreateTodoRequest) -> Todos:
-        todo = Todos(**todo_request.model_dump(), owner_id=user.id)
-        self.db.add(todo)
-        self.db.commit()
-        self.db.refresh(todo)
+        todos = select(
+            *TODO_COLUMNS,
+            Todos.version,
+            Todos.change_seq,
+            Todos.deleted_at.isnot(None).label("deleted"),
+        ).where(
+            Todos.owner_id == user.id,
+            ~hidden_by_delete_job(Todos, user.id),
+            after(Todos.change_seq, Todos.id),
+        )
+        # 論理削除のジョブで隠したTodoは、受け付けたときのchange_seqで削除として返す
+        job_change_seq = soft_delete_job(TodoDeleteJob.change_seq, user.id)
+        hidden = select(
+            *TODO_COLUMNS,
+            Todos.version,
+            job_change_seq.label("change_seq"),
+            literal(True).label("deleted"),
+        ).where(
+            Todos.owner_id == user.id,
+            hidden_by_delete_job(Todos, user.id),
+            after(job_change_seq, Todos.id),
+        )
+        tombstones = select(
+            TodoTombstone.todo_id.label("id"),
+            null(),
+            null(),
+            null(),
+            null(),
+            TodoTombstone.owner_id,
+            null(),
+            TodoTombstone.change_seq,
+            literal(True).label("deleted"),
+        ).where(
+            TodoTombstone.owner_id == user.id,
+            after(TodoTombstone.change_seq, TodoTombstone.todo_id),
+        )
+        changes = union_all(todos, hidden, tombstones).subquery("changes")
+        rows = await self.db.execute(
+            select(changes).order_by(changes.c.change_seq, changes.c.id).limit(limit)
+        )
+        return [dict(row) for row in rows.mappings()]
+
+    # INSERT/UPDATE/DELETE ... RETURNING で1往復で書き込み後の行を取得する
+    async def create(self, user: Users, todo_request: CreateTodoRequest) -> Todos:
+        todo = await self.db.scalar(
+            insert(Todos)
+            .values(
+                **todo_request.model_dump(),
+                owner_id=user.id,
+                change_seq=next_change_seq(user.id),
+            )
+            .returning(Todos)
+        )
+        await self.db.commit()
         return todo
 
-    def update(
-        self, user: Users, todo_request: UpdateTodoRequest, todo: Todos
-    ) -> Todos:
-        self.db.execute(
+    # versionsを指定した場合はそのいずれかと一致する行だけを更新する(If-Match)
+    async def update(
+        self,
+        user: Users,
+        todo_id: int,
+        todo_request: UpdateTodoRequest,
+        versions: list[int] | None = None,
+    ) -> Todos | None:
+        conditions = [
+            Todos.id == todo_id,
+            Todos.owner_id == user.id,
+            ~is_deleted(user.id),
+        ]
+        if versions is not None:
+            conditions.append(Todos.version.in_(versions))
+        # 条件に他のテーブルの副問い合わせを含むため、セッションとの同期は行わない
+        todo = await self.db.scalar(
             update(Todos)
-            .where(Todos.id == todo.id, Todos.owner_id == user.id)
-            .values(**todo_request.model_dump())
+            .where(*conditions)
+            .values(
+                **todo_request.model_dump(),
+                version=Todos.version + 1,
+                change_seq=next_change_seq(user.id, *conditions),
+                updated_at=func.now(),
+            )
+            .returning(Todos)
+            .execution_options(synchronize_session=False)
         )
-        self.db.commit()
+        await self.db.commit()
         return todo
 
-    def delete(self, todo: Todos):
-        self.db.delete(todo)
-        self.db.commit()
+    async def delete(
+        self, user: Users, todo_id: int, versions: list[int] | None = None
+    ) -> int | None:
+        conditions = [
+            Todos.id == todo_id,
+            Todos.owner_id == user.id,
+            ~is_deleted(user.id),
+        ]
+        if versions is not None:
+            conditions.append(Todos.version.in_(versions))
+        deleted_id = await self.db.scalar(
+            delete_with_tombstones(*conditions, owner_id=user.id)
+        )
+        await self.db.commit()
+        return deleted_id
+
+    # 一括処理は1トランザクション・1ステートメントで実行する
+    async def create_many(
+        self, user: Users, todo_requests: list[CreateTodoRequest]
+    ) -> list[Todos]:
+        # ORMのバルクINSERTはCTEを付けられないため、複数行のVALUESで1文にする
+        change_seq = next_change_seq(user.id)
+        todos = await self.db.scalars(
+            insert(Todos)
+            .values(
+                [
+                    {
+                        **todo_request.model_dump(),
+                        "owner_id": user.id,
+                        "change_seq": change_seq,
+                    }
+                    for todo_request in todo_requests
+                ]
+            )
+            .returning(Todos)
+        )
+        # idはVALUESの順に採番されるため、id順にしてリクエストの順序に揃える
+        todos = sorted(todos.all(), key=lambda todo: todo.id)
+        await self.db.commit()
+        return todos
+
+    # COPY FROM STDIN でINSERTよりも高速に大量の行を書き込む
+    async def copy_many(
+        self, user: Users, todo_requests: list[CreateTodoRequest]
+    ) -> int:
+        # COPYにはCTEを付けられないため、先にバージョンを上げてchange_seqを決める
+        change_seq = await self.db.scalar(bump_todos_version(user.id))
+        connection = await self.db.connection()
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+        async with driver_connection.transaction():
+            await driver_connection.copy_records_to_table(
+                Todos.__tablename__,
+                columns=COPY_COLUMNS,
+                records=[
+                    (
+                        todo_request.title,
+                        todo_request.description,
+                        todo_request.is_starred,
+                        todo_request.is_completed,
+                        user.id,
+                        change_seq,
+                    )
+                    for todo_request in todo_requests
+                ],
+            )
+        await self.db.commit()
+        return len(todo_requests)
 
-    def bulk_delete(self, user: Users):
-        self.db.execute(delete(Todos).where(Todos.owner_id == user.id))
-        self.db.commit()
+    async def update_many(
+        self, user: Users, todo_requests: list[BatchUpdateTodoRequest]
+    ) -> list[Todos]:
+        # UPDATE ... FROM (VALUES ...) で複数行を1回で更新する
+        rows = values(
+            column("id", Integer),
+            column("title", String),
+            column("description", String),
+            column("is_starred", Boolean),
+            column("is_completed", Boolean),
+            name="v",
+        ).data(
+            [
+                (
+                    todo_request.id,
+                    todo_request.title,
+                    todo_request.description,
+                    todo_request.is_starred,
+                    todo_request.is_completed,
+                )
+                for todo_request in todo_requests
+            ]
+        )
+        conditions = [Todos.owner_id == user.id, ~is_deleted(user.id)]
+        todos = await self.db.scalars(
+            update(Todos)
+            .where(Todos.id == rows.c.id, *conditions)
+            .values(
+                title=rows.c.title,
+                description=rows.c.description,
+                is_starred=rows.c.is_starred,
+                is_completed=rows.c.is_completed,
+                version=Todos.version + 1,
+                change_seq=next_change_seq(
+                    user.id,
+                    Todos.id.in_([todo_request.id for todo_request in todo_requests]),
+                    *conditions,
+                ),
+                updated_at=func.now(),
+            )
+            .returning(Todos)
+            .execution_options(synchronize_session=False)
+        )
+        todos = todos.all()
+        await self.db.commit()
+        return todos
+
+    async def delete_many(self, user: Users, todo_ids: list[int]) -> list[int]:
+        deleted_ids = await self.db.scalars(
+            delete_with_tombstones(
+                Todos.id.in_(todo_ids),
+                Todos.owner_id == user.id,
+                ~is_deleted(user.id),
+                owner_id=user.id,
+            )
+        )
+        deleted_ids = deleted_ids.all()
+        await self.db.commit()
+        return deleted_ids
+
+    async def bulk_delete(self, user: Users, chunk_size: int) -> int:
+        # 1回のDELETEで全件を消すとロックとWALが長時間溜まるため、
+        # id順にchunk_size件ずつ削除してチャンクごとにコミットする
+        deleted = 0
+        while True:
+            count = await self.delete_chunk(user.id, chunk_size)
+            await self.db.commit()
+            deleted += count
+            if count < chunk_size:
+                return deleted
+
+    async def delete_chunk(
+        self, owner_id: int, chunk_size: int, soft_deleted_only: bool = False
+    ) -> int:
+        # コミットは呼び出し側で行う(ジョブの進捗と同じトランザクションにするため)
+        ids = (
+            select(Todos.id)
+            .where(Todos.owner_id == owner_id)
+            .order_by(Todos.id)
+            .limit(chunk_size)
+        )
+        if soft_deleted_only:
+            ids = ids.where(is_deleted(owner_id))
+        # 論理削除済みの行は既に一覧に出ないためバージョンは上げない
+        # ジョブで隠した行のtombstoneは、差分同期で削除として返していた
+        # ジョブのchange_seqで書く
+        # DELETE側にもowner_idを指定し、ユーザのパーティションだけを対象にする
+        deleted_ids = await self.db.scalars(
+            delete_with_tombstones(
+                Todos.id.in_(ids.scalar_subquery()),
+                Todos.owner_id == owner_id,
+                owner_id=None if soft_deleted_only else owner_id,
+                change_seq=soft_delete_job(TodoDeleteJob.change_seq, owner_id),
+            )
+        )
+        deleted = len(deleted_ids.all())
+        if deleted < chunk_size:
+            # todosが残っていなければアーカイブ済みのTodoも削除する
+            # (論理削除のジョブでは受付時点にあったTodoだけ)
+            archived_ids = (
+                select(TodoArchive.id)
+                .where(TodoArchive.owner_id == owner_id)
+                .order_by(TodoArchive.id)
+                .limit(chunk_size - deleted)
+            )
+            if soft_deleted_only:
+                archived_ids = archived_ids.where(
+                    hidden_by_delete_job(TodoArchive, owner_id)
+                )
+            # tombstoneはアーカイブしたときに書いているため、
+            # include_archivedの一覧のためにバージョンだけを上げる
+            conditions = [
+                TodoArchive.id.in_(archived_ids.scalar_subquery()),
+                TodoArchive.owner_id == owner_id,
+            ]
+            archived = (
+                delete(TodoArchive)
+                .where(*conditions)
+                .returning(TodoArchive.id)
+                .cte("deleted_archived_todos")
+            )
+            bump = bump_todos_version(owner_id, *conditions).cte("bump_todos_version")
+            archived_ids = await self.db.scalars(select(archived.c.id).add_cte(bump))
+            deleted += len(archived_ids.all())
+        return deleted
+
+    async def archive(self, older_than: timedelta, batch_size: int) -> dict[int, int]:
+        # コミットは呼び出し側で行う
+        rows = await self.db.execute(archive_todos_query(older_than, batch_size))
+        return dict(rows.all())
+
+    async def create_delete_job(self, user: Users, soft_delete: bool) -> TodoDeleteJob:
+        # 未完了のジョブはユーザごとに1つ(一意の部分インデックス)
+        # 同時に受け付けた場合も新しく作らず、未完了のジョブを返す
+        values = {"owner_id": user.id, "soft_delete": soft_delete, "status": "pending"}
+        if soft_delete:
+            # 行は書き換えず、この時点の最大id以下のTodoをジョブが終わるまで隠す
+            # (1回のUPDATEで全件に印を付けると長時間ロックを持つため)
+            # 一覧の内容が変わるため、バージョンも上げてchange_seqとして記録する
+            values["delete_through_id"] = (
+                select(func.max(Todos.id))
+                .where(Todos.owner_id == user.id)
+                .scalar_subquery()
+            )
+            values["change_seq"] = next_change_seq(user.id)
+        while True:
+            job = await self.db.scalar(
+                pg_insert(TodoDeleteJob)
+                .values(**values)
+                .on_conflict_do_nothing(
+                    index_elements=[TodoDeleteJob.owner_id],
+                    index_where=TodoDeleteJob.status.in_(ACTIVE_STATUSES),
+                )
+                .returning(TodoDeleteJob)
+            )
+            if job is not None:
+                break
+            # 作らなかった場合はバージョンの更新も取り消す
+            await self.db.rollback()
+            job = await self.db.scalar(
+                select(TodoDeleteJob).where(
+                    TodoDeleteJob.owner_id == user.id,
+                    TodoDeleteJob.status.in_(ACTIVE_STATUSES),
+                )
+            )
+            # 競合したジョブがその間に終わっていれば作り直す
+            if job is not None:
+                return job
+        await self.db.commit()
+        return job
+
+    async def find_delete_job(self, user: Users, job_id: int) -> TodoDeleteJob | None:
+        return await self.db.scalar(
+            select(TodoDeleteJob).where(
+                TodoDeleteJob.id == job_id, TodoDeleteJob.owner_id == user.id
+            )
+        )
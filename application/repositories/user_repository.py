@@ -1,31 +1,44 @@
-from models import Users
+from models import EmailOutbox, Users
 from schemas.requests.auth_request_schema import CreateUserRequest
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
 class UserRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def find_by_username(self, username: str) -> Users:
+    async def find_by_username(self, username: str) -> Users:
         try:
-            user = self.db.execute(
+            user = await self.db.execute(
                 select(Users).where(Users.username == username)
-            ).scalar_one_or_none()
-            return user
+            )
+            return user.scalar_one_or_none()
         except Exception:
             None
 
-    def create(self, hashed_password: str, user_model: CreateUserRequest) -> Users:
+    async def create(
+        self,
+        hashed_password: str,
+        user_model: CreateUserRequest,
+        outbox: list[EmailOutbox] | None = None,
+    ) -> Users:
         try:
             user_data = user_model.model_dump()
             user_data["password"] = hashed_password
             user = Users(**user_data)
             self.db.add(user)
-            self.db.commit()
+            # 送信するメールはユーザと同じトランザクションでoutboxに書き込む
+            self.db.add_all(outbox or [])
+            await self.db.commit()
             return user
         except IntegrityError:
-            self.db.rollback()
+            await self.db.rollback()
             return None
+
+    async def update_password(self, user: Users, hashed_password: str):
+        await self.db.execute(
+            update(Users).where(Users.id == user.id).values(password=hashed_password)
+        )
+        await self.db.commit()
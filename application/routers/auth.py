@@ -1,13 +1,21 @@
 from datetime import timedelta
 from typing import Annotated
 
-from config.dependency import get_user_usecase
+from config.dependency import get_read_user_usecase, get_user_usecase
 from config.env import app_settings
-from config.jwt import check_password, create_jwt_token, decode_jwt_token, hash_password
+from config.token_cache import token_cache
+from config.jwt import (
+    PasswordHasherBusyError,
+    check_password_async,
+    create_jwt_token,
+    decode_jwt_token,
+    hash_password_async,
+    password_needs_rehash,
+)
 from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from infrastructure.emails.email import send_email
+from fastapi.security.utils import get_authorization_scheme_param
 from jose import JWTError
 from schemas.requests.auth_request_schema import CreateUserRequest
 from usecases.user_usecase import UserUsecase
@@ -23,37 +31,50 @@ def get_csrf_token(request: Request) -> JSONResponse:
     )
 
 
+def _password_hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, please retry later",
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post("/sign-up", status_code=status.HTTP_201_CREATED)
 async def create_user(
     create_user_request: CreateUserRequest,
     user_usecase: UserUsecase = Depends(get_user_usecase),
 ):
-    hashed_password = hash_password(create_user_request.password)
-    user = user_usecase.create_user(hashed_password, create_user_request)
+    try:
+        hashed_password = await hash_password_async(create_user_request.password)
+    except PasswordHasherBusyError:
+        raise _password_hasher_busy()
+    user = await user_usecase.create_user(hashed_password, create_user_request)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User with this email or username already exists",
         )
-    context = {"name": user.username}
-    try:
-        await send_email(
-            user.email, "welcome_email.html", subject="ようこそ", context=context
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Cannot send email: {e}",
-        )
+    # ウェルカムメールはoutbox経由でバックグラウンド送信する
     return {"msg": "user created"}
 
 
-def _authenticate_user(username: str, password: str, user_usecase: UserUsecase):
-    user = user_usecase.get_user_by_username(username)
+async def _authenticate_user(username: str, password: str, user_usecase: UserUsecase):
+    user = await user_usecase.get_user_by_username(username)
     if not user:
         return False
-    if not check_password(password, user.password):
-        return False
+    try:
+        if not await check_password_async(password, user.password):
+            return False
+    except PasswordHasherBusyError:
+        raise _password_hasher_busy()
+    # コスト設定が変わっていればログイン時に再ハッシュする
+    if password_needs_rehash(user.password):
+        try:
+            await user_usecase.update_password(
+                user, await hash_password_async(password)
+            )
+        except PasswordHasherBusyError:
+            pass
     return user
 
 
@@ -64,7 +85,9 @@ async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     user_usecase: UserUsecase = Depends(get_user_usecase),
 ) -> Response:
-    user = _authenticate_user(form_data.username, form_data.password, user_usecase)
+    user = await _authenticate_user(
+        form_data.username, form_data.password, user_usecase
+    )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -103,7 +126,13 @@ async def login_for_access_token(
 
 
 @router.post("/logout")
-def logout(response: Response):
+def logout(request: Request, response: Response):
+    # 検証済みトークンのキャッシュも破棄する
+    _, access_token = get_authorization_scheme_param(
+        request.cookies.get("access_token")
+    )
+    if access_token:
+        token_cache.invalidate(access_token)
     response.delete_cookie(key="access_token")
     response.delete_cookie(key="refresh_token")
     response.delete_cookie(key="csrftoken")
@@ -114,7 +143,7 @@ def logout(response: Response):
 async def refresh_token(
     request: Request,
     response: Response,
-    user_usecase: UserUsecase = Depends(get_user_usecase),
+    user_usecase: UserUsecase = Depends(get_read_user_usecase),
 ) -> Response:
     try:
         decoded_token = decode_jwt_token(
@@ -126,7 +155,7 @@ async def refresh_token(
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
             )
-        user = user_usecase.get_user_by_username(username)
+        user = await user_usecase.get_user_by_username(username)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found"
@@ -1,41 +1,313 @@
-from typing import List
+from typing import Annotated, List, Literal, Optional
 
-from config.dependency import get_todo_usecase, user_dependency
-from fastapi import APIRouter, Depends, HTTPException, status
-from schemas.requests.todo_request_schema import CreateTodoRequest, UpdateTodoRequest
-from schemas.responses.todo_response_schema import TodoResponse
+from config.dependency import (
+    get_read_todo_usecase,
+    get_todo_event_broker,
+    get_todo_usecase,
+    get_todo_usecase_scope,
+    user_dependency,
+)
+from config.env import app_settings
+from config.etag import etag_matches, if_match_versions, make_etag
+from config.pagination import (
+    decode_change_cursor,
+    decode_cursor,
+    decode_search_cursor,
+    encode_change_cursor,
+    encode_cursor,
+    encode_search_cursor,
+)
+from config.responses import FastJSONResponse, accepts_gzip, gzip_stream, sse_event
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from infrastructure.todo_events import TodoEventBroker
+from schemas.requests.todo_request_schema import (
+    BatchUpdateTodoRequest,
+    CreateTodoRequest,
+    UpdateTodoRequest,
+)
+from schemas.responses.todo_response_schema import (
+    BatchTodoResult,
+    TodoChangesResponse,
+    TodoDeleteJobResponse,
+    TodoImportResponse,
+    TodoListResponse,
+    TodoResponse,
+)
+from usecases.todo_export import encode_csv, encode_ndjson
+from usecases.todo_import import validate_csv, validate_ndjson
 from usecases.todo_usecase import TodoUsecase
 
 router = APIRouter(prefix="/api/todos", tags=["todos"])
 
+BATCH_MAX_SIZE = 1000
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FORMATS = {
+    "ndjson": (encode_ndjson, "application/x-ndjson"),
+    "csv": (encode_csv, "text/csv; charset=utf-8"),
+}
+IMPORT_CHUNK_SIZE = 5000
+IMPORT_MAX_ERRORS = 1000
+IMPORT_FORMATS = {"ndjson": validate_ndjson, "csv": validate_csv}
+STREAM_BATCH_SIZE = 200
 
-@router.get("", response_model=List[TodoResponse])
+
+@router.get("", response_model=TodoListResponse)
 async def read_todos(
-    user: user_dependency, todo_usecase: TodoUsecase = Depends(get_todo_usecase)
+    user: user_dependency,
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    is_starred: Optional[bool] = None,
+    is_completed: Optional[bool] = None,
+    # trueの場合はアーカイブ済み(todos_archive)のTodoも含める
+    include_archived: bool = False,
+    if_none_match: Optional[str] = Header(default=None),
+    todo_usecase: TodoUsecase = Depends(get_read_todo_usecase),
+):
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed"
+        )
+    try:
+        after_id = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+    # 変更がなければユーザのバージョンだけを読んで304を返す
+    todos_version = None
+    if if_none_match is not None:
+        todos_version = await todo_usecase.get_todos_version(user)
+        etag = make_etag(user.id, todos_version)
+        if etag_matches(if_none_match, etag):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+            )
+    # 一覧のETagも304の判定と同じバージョンから作る
+    todos, last_id, version = await todo_usecase.get_all_todos(
+        user,
+        limit,
+        after_id,
+        is_starred,
+        is_completed,
+        include_archived,
+        todos_version,
+    )
+    return FastJSONResponse(
+        {
+            "items": todos,
+            "next_cursor": encode_cursor(last_id) if last_id is not None else None,
+        },
+        headers={"ETag": make_etag(user.id, version)},
+    )
+
+
+# タイトル・説明の検索(関連度の高い順)
+@router.get("/search", response_model=TodoListResponse)
+async def search_todos(
+    user: user_dependency,
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    todo_usecase: TodoUsecase = Depends(get_read_todo_usecase),
+):
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed"
+        )
+    try:
+        after = decode_search_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+    todos, next_position = await todo_usecase.search_todos(user, q, limit, after)
+    return FastJSONResponse(
+        {
+            "items": todos,
+            "next_cursor": encode_search_cursor(*next_position)
+            if next_position is not None
+            else None,
+        }
+    )
+
+
+# オフライン対応クライアント向けの差分同期
+# sinceより後の変更だけを返す。next_cursorがなくなるまで取得したら、
+# last_seqを次回のsinceとして保存する(sinceを省略すると全件)
+@router.get("/changes", response_model=TodoChangesResponse)
+async def read_todo_changes(
+    user: user_dependency,
+    since: Optional[int] = Query(default=None, ge=0),
+    limit: int = Query(default=200, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    todo_usecase: TodoUsecase = Depends(get_read_todo_usecase),
 ):
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed"
         )
-    return todo_usecase.get_all_todos(user)
+    after_id = None
+    try:
+        if cursor:
+            since, after_id = decode_change_cursor(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+    upserts, deleted_ids, next_position, last_seq = await todo_usecase.get_changes(
+        user, since, limit, after_id
+    )
+    return FastJSONResponse(
+        {
+            "upserts": upserts,
+            "deleted_ids": deleted_ids,
+            "next_cursor": encode_change_cursor(*next_position)
+            if next_position is not None
+            else None,
+            "last_seq": last_seq,
+        }
+    )
+
+
+# 一覧のポーリングの代わりに、Todoの変更をServer-Sent Eventsで送る
+# イベントのidは差分同期のカーソルで、再接続時のLast-Event-IDから続きを送る
+@router.get("/stream")
+async def stream_todo_events(
+    user: user_dependency,
+    since: Optional[int] = Query(default=None, ge=0),
+    last_event_id: Optional[str] = Header(default=None),
+    todo_usecase_scope=Depends(get_todo_usecase_scope),
+    broker: TodoEventBroker | None = Depends(get_todo_event_broker),
+):
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed"
+        )
+    if broker is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Todo events are disabled",
+        )
+    try:
+        position = decode_change_cursor(last_event_id) if last_event_id else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Last-Event-ID"
+        )
+    if position is None and since is not None:
+        position = (since, None)
+
+    async def content():
+        nonlocal position
+        # 開始位置を読む前に購読し、その間の変更を取りこぼさないようにする
+        subscription = broker.subscribe(user.id)
+        try:
+            if position is None:
+                async with todo_usecase_scope() as todo_usecase:
+                    position = (await todo_usecase.get_todos_version(user), None)
+            yield b": connected\n\n"
+            notified = True
+            while True:
+                while notified:
+                    # 接続を持ったまま送信を待たないよう、読み終えてから送る
+                    async with todo_usecase_scope() as todo_usecase:
+                        events = await todo_usecase.get_change_events(
+                            user, *position, STREAM_BATCH_SIZE
+                        )
+                    for event in events:
+                        position = (event["change_seq"], event["id"])
+                        yield sse_event(
+                            event["event"],
+                            event["data"],
+                            encode_change_cursor(*position),
+                        )
+                    notified = len(events) == STREAM_BATCH_SIZE
+                try:
+                    notified = await subscription.wait(
+                        app_settings.TODO_EVENTS_HEARTBEAT
+                    )
+                except EOFError:
+                    # 読み出しが遅く切断された場合やシャットダウン時
+                    return
+                if not notified:
+                    yield b": keepalive\n\n"
+        finally:
+            broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        content(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/export")
+async def export_todos(
+    request: Request,
+    user: user_dependency,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    todo_usecase_scope=Depends(get_todo_usecase_scope),
+):
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed"
+        )
+    encode, media_type = EXPORT_FORMATS[format]
+
+    # get_dbのセッションはレスポンス送信前に閉じられるため、
+    # ストリーミングが終わるまで専用のセッションを開いておく
+    async def content():
+        async with todo_usecase_scope() as todo_usecase:
+            async for chunk in encode(
+                todo_usecase.stream_todos(user, EXPORT_BATCH_SIZE)
+            ):
+                yield chunk
+
+    headers = {
+        "Content-Disposition": f'attachment; filename="todos.{format}"',
+        "Vary": "Accept-Encoding",
+    }
+    body = content()
+    if accepts_gzip(request):
+        headers["Content-Encoding"] = "gzip"
+        body = gzip_stream(body)
+    return StreamingResponse(body, media_type=media_type, headers=headers)
 
 
 @router.get("/{todo_id}", response_model=TodoResponse)
 async def read_todo(
     user: user_dependency,
     todo_id: int,
-    todo_usecase: TodoUsecase = Depends(get_todo_usecase),
+    include_archived: bool = False,
+    if_none_match: Optional[str] = Header(default=None),
+    todo_usecase: TodoUsecase = Depends(get_read_todo_usecase),
 ):
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed"
         )
-    todo = todo_usecase.read_todo(user, todo_id)
+    todo = await todo_usecase.read_todo(user, todo_id, include_archived)
     if not todo:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found"
         )
-    return todo
+    etag = make_etag(todo_id, todo.pop("version"))
+    if etag_matches(if_none_match, etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+        )
+    return FastJSONResponse(todo, headers={"ETag": etag})
 
 
 @router.post("", response_model=TodoResponse, status_code=status.HTTP_201_CREATED)
@@ -48,7 +320,104 @@ async def create_todo(
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed"
         )
-    return todo_usecase.create_todo(user, todo_model)
+    return await todo_usecase.create_todo(user, todo_model)
+
+
+# オフライン復帰時などにまとめて送られる操作を1トランザクションで処理する
+@router.post(
+    "/batch",
+    response_model=List[BatchTodoResult],
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_todos(
+    user: user_dependency,
+    todo_models: Annotated[
+        List[CreateTodoRequest], Body(min_length=1, max_length=BATCH_MAX_SIZE)
+    ],
+    todo_usecase: TodoUsecase = Depends(get_todo_usecase),
+):
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed"
+        )
+    todos = await todo_usecase.create_todos(user, todo_models)
+    return [
+        {"id": todo.id, "status": status.HTTP_201_CREATED, "todo": todo}
+        for todo in todos
+    ]
+
+
+@router.post("/import", response_model=TodoImportResponse)
+async def import_todos(
+    request: Request,
+    user: user_dependency,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    todo_usecase: TodoUsecase = Depends(get_todo_usecase),
+):
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed"
+        )
+    # 本文はrequest.stream()で受け取りながら1行ずつ検証する
+    validate = IMPORT_FORMATS[format]
+    return await todo_usecase.import_todos(
+        user,
+        validate(request.stream(), app_settings.IMPORT_MAX_LINE_BYTES),
+        IMPORT_CHUNK_SIZE,
+        IMPORT_MAX_ERRORS,
+    )
+
+
+@router.put("/batch", response_model=List[BatchTodoResult])
+async def update_todos(
+    user: user_dependency,
+    todo_models: Annotated[
+        List[BatchUpdateTodoRequest], Body(min_length=1, max_length=BATCH_MAX_SIZE)
+    ],
+    todo_usecase: TodoUsecase = Depends(get_todo_usecase),
+):
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed"
+        )
+    todo_ids = [todo_model.id for todo_model in todo_models]
+    if len(set(todo_ids)) != len(todo_ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Duplicate todo ids"
+        )
+    updated = {
+        todo.id: todo for todo in await todo_usecase.update_todos(user, todo_models)
+    }
+    return [
+        {"id": todo_id, "status": status.HTTP_200_OK, "todo": updated[todo_id]}
+        if todo_id in updated
+        else {"id": todo_id, "status": status.HTTP_404_NOT_FOUND}
+        for todo_id in todo_ids
+    ]
+
+
+@router.delete("/batch", response_model=List[BatchTodoResult])
+async def delete_todos(
+    user: user_dependency,
+    ids: Annotated[
+        List[int], Body(embed=True, min_length=1, max_length=BATCH_MAX_SIZE)
+    ],
+    todo_usecase: TodoUsecase = Depends(get_todo_usecase),
+):
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed"
+        )
+    deleted_ids = set(await todo_usecase.delete_todos(user, ids))
+    return [
+        {
+            "id": todo_id,
+            "status": status.HTTP_204_NO_CONTENT
+            if todo_id in deleted_ids
+            else status.HTTP_404_NOT_FOUND,
+        }
+        for todo_id in ids
+    ]
 
 
 @router.put("/{todo_id}", response_model=TodoResponse)
@@ -56,18 +425,23 @@ async def update_todo(
     user: user_dependency,
     todo_model: UpdateTodoRequest,
     todo_id: int,
+    response: Response,
+    if_match: Optional[str] = Header(default=None),
     todo_usecase: TodoUsecase = Depends(get_todo_usecase),
 ):
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed"
         )
-    todo = todo_usecase.read_todo(user, todo_id)
+    # If-Matchのバージョンを更新条件に含め、事前の読み取りなしで競合を検出する
+    versions = if_match_versions(if_match, todo_id)
+    todo = await todo_usecase.update_todo(user, todo_id, todo_model, versions)
     if not todo:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found"
+        await _raise_not_found_or_precondition_failed(
+            user, todo_id, versions, todo_usecase
         )
-    return todo_usecase.update_todo(user, todo_model, todo)
+    response.headers["ETag"] = make_etag(todo.id, todo.version)
+    return todo
 
 
 @router.delete("/bulk_delete", status_code=status.HTTP_204_NO_CONTENT)
@@ -79,25 +453,74 @@ async def bulk_delete_todo(
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed"
         )
-    todo_usecase.bulk_delete_todo(user)
+    await todo_usecase.bulk_delete_todo(user, app_settings.TODO_DELETE_CHUNK_SIZE)
+
+
+# 件数が多い場合はジョブとして受け付け、バックグラウンドで削除する
+@router.post(
+    "/bulk_delete/jobs",
+    response_model=TodoDeleteJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def start_bulk_delete_job(
+    user: user_dependency,
+    soft_delete: bool = False,
+    todo_usecase: TodoUsecase = Depends(get_todo_usecase),
+):
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed"
+        )
+    return await todo_usecase.start_bulk_delete_job(user, soft_delete)
+
+
+@router.get("/bulk_delete/jobs/{job_id}", response_model=TodoDeleteJobResponse)
+async def read_bulk_delete_job(
+    user: user_dependency,
+    job_id: int,
+    todo_usecase: TodoUsecase = Depends(get_todo_usecase),
+):
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed"
+        )
+    job = await todo_usecase.get_bulk_delete_job(user, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
+        )
+    return job
 
 
 @router.delete("/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_todo(
     user: user_dependency,
     todo_id: int,
+    if_match: Optional[str] = Header(default=None),
     todo_usecase: TodoUsecase = Depends(get_todo_usecase),
 ):
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed"
         )
-    todo = todo_usecase.read_todo(user, todo_id)
-    if not todo:
+    versions = if_match_versions(if_match, todo_id)
+    deleted_id = await todo_usecase.delete_todo(user, todo_id, versions)
+    if not deleted_id:
+        await _raise_not_found_or_precondition_failed(
+            user, todo_id, versions, todo_usecase
+        )
+
+
+async def _raise_not_found_or_precondition_failed(
+    user, todo_id: int, versions: list[int] | None, todo_usecase: TodoUsecase
+):
+    # 失敗した場合だけ、存在しないのかバージョンが違うのかを確認する
+    if versions is not None and await todo_usecase.read_todo(user, todo_id):
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found"
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Todo has been modified",
         )
-    todo_usecase.delete_todo(todo)
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found")
 
 
 # ファイルアップロード機能
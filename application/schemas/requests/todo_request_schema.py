@@ -13,3 +13,7 @@ class CreateTodoRequest(BaseModel):
     description: str = Field(min_length=3, max_length=100)
     is_starred: bool = False
     is_completed: bool = False
+
+
+class BatchUpdateTodoRequest(UpdateTodoRequest):
+    id: int
@@ -1,3 +1,6 @@
+from datetime import datetime
+from typing import List, Optional
+
 from pydantic import BaseModel, Field
 
 
@@ -8,3 +11,46 @@ class TodoResponse(BaseModel):
     is_starred: bool
     is_completed: bool
     owner_id: int
+
+
+class TodoListResponse(BaseModel):
+    items: List[TodoResponse]
+    next_cursor: Optional[str] = None
+
+
+class TodoChangeResponse(TodoResponse):
+    version: int
+
+
+class TodoChangesResponse(BaseModel):
+    upserts: List[TodoChangeResponse]
+    deleted_ids: List[int]
+    next_cursor: Optional[str] = None
+    last_seq: int
+
+
+class BatchTodoResult(BaseModel):
+    id: int
+    status: int
+    todo: Optional[TodoResponse] = None
+
+
+class TodoImportError(BaseModel):
+    line: int
+    errors: List[dict]
+
+
+class TodoImportResponse(BaseModel):
+    imported: int
+    error_count: int
+    errors: List[TodoImportError]
+
+
+class TodoDeleteJobResponse(BaseModel):
+    id: int
+    status: str
+    soft_delete: bool
+    deleted_count: int
+    last_error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
@@ -4,11 +4,13 @@ import pytest
 from config.dependency import get_current_user_from_cookie
 from config.jwt import create_jwt_token, hash_password
 from fastapi.testclient import TestClient
-from infrastructure.database import get_db
+from infrastructure.database import get_db, get_read_router, get_session_factory
+from infrastructure.read_replica import ReadReplicaRouter
 from main import app
 from models import Todos, Users
 from sqlalchemy import text
 from tests.utils import (
+    TestingAsyncSessionLocal,
     TestingSessionLocal,
     override_get_current_user,
     override_get_db,
@@ -19,6 +21,11 @@ from tests.utils import (
 @pytest.fixture
 def client():
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: TestingAsyncSessionLocal
+    # レプリカなし(読み取りもテスト用のデータベースから)
+    app.dependency_overrides[get_read_router] = lambda: ReadReplicaRouter(
+        TestingAsyncSessionLocal, []
+    )
     app.dependency_overrides[get_current_user_from_cookie] = override_get_current_user
     client = TestClient(app)
     yield client
@@ -79,10 +86,19 @@ def test_todo_one():
     )
     db.add(todo)
     db.commit()
+    # idを指定して作成したため、API経由の作成でidが衝突しないようシーケンスを進める
+    db.execute(text("SELECT setval('todos_id_seq', (SELECT max(id) FROM todos))"))
+    db.commit()
     yield todo
     with test_engine.connect() as connection:
         connection.execute(text("DELETE FROM todos;"))
         connection.commit()
+        connection.execute(text("DELETE FROM todos_archive;"))
+        connection.commit()
+        connection.execute(text("DELETE FROM todo_tombstones;"))
+        connection.commit()
+        connection.execute(text("DELETE FROM todo_delete_jobs;"))
+        connection.commit()
         connection.execute(text("DELETE FROM users;"))
         connection.commit()
 
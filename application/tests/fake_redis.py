@@ -0,0 +1,32 @@
+import time
+
+
+class FakeRedis:
+    # redis.asyncio.Redis の get/set(px=)/delete だけを持つメモリ上の代替
+    def __init__(self):
+        self.store: dict[str, tuple[float | None, bytes]] = {}
+        self.available = True
+
+    def _check(self):
+        if not self.available:
+            raise ConnectionError("redis unavailable")
+
+    async def get(self, key: str) -> bytes | None:
+        self._check()
+        entry = self.store.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.store[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: bytes, px: int | None = None):
+        self._check()
+        expires_at = time.monotonic() + px / 1000 if px is not None else None
+        self.store[key] = (expires_at, value)
+
+    async def delete(self, key: str):
+        self._check()
+        self.store.pop(key, None)
@@ -1,8 +1,24 @@
+import asyncio
+import threading
+import time
 from datetime import timedelta
 
+import bcrypt
+import pytest
 from fastapi import status
-from config.jwt import create_jwt_token, decode_jwt_token
+import config.jwt
+from config.jwt import (
+    PasswordHasherBusyError,
+    _run_password_task,
+    check_password_async,
+    create_jwt_token,
+    decode_jwt_token,
+    hash_password_async,
+    password_needs_rehash,
+)
 from config.env import app_settings
+from config.dependency import get_current_user_from_cookie
+from config.token_cache import token_cache
 
 
 def test_create_jwt_token():
@@ -18,6 +34,49 @@ def test_create_jwt_token():
     assert decoded_token["iss"] == user_id
 
 
+def test_hash_password_async():
+    hashed_password = asyncio.run(hash_password_async("test"))
+    assert asyncio.run(check_password_async("test", hashed_password))
+    assert not password_needs_rehash(hashed_password)
+
+
+def test_password_needs_rehash():
+    rounds = app_settings.BCRYPT_ROUNDS + 1
+    hashed_password = bcrypt.hashpw(b"test", bcrypt.gensalt(rounds=rounds)).decode()
+    assert password_needs_rehash(hashed_password)
+
+
+def test_hash_password_async_busy(mocker):
+    mocker.patch("config.jwt._password_pending", 10**6)
+    with pytest.raises(PasswordHasherBusyError):
+        asyncio.run(hash_password_async("test"))
+
+
+def test_cancelled_password_task_is_counted_until_done():
+    started, release = threading.Event(), threading.Event()
+
+    def slow_hash(password):
+        started.set()
+        release.wait(5)
+        return password
+
+    async def run():
+        task = asyncio.create_task(_run_password_task(slow_hash, "test"))
+        await asyncio.to_thread(started.wait, 5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # キャンセルされてもスレッドで実行中の間は数えたまま
+        return config.jwt._password_pending
+
+    assert asyncio.run(run()) == 1
+    release.set()
+    deadline = time.monotonic() + 5
+    while config.jwt._password_pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert config.jwt._password_pending == 0
+
+
 def test_create_user(client, test_admin_user_data):
     response = client.post("/api/auth", json=test_admin_user_data)
     assert response.status_code == status.HTTP_201_CREATED
@@ -29,7 +88,28 @@ def test_create_user_duplicate(client):
 
 
 def test_get_current_user():
-    pass
+    token_cache.clear()
+    token = create_jwt_token("test_user_01", 1, timedelta(minutes=30))
+
+    user = asyncio.run(get_current_user_from_cookie(token))
+    cached_user = asyncio.run(get_current_user_from_cookie(token))
+
+    assert user.username == "test_user_01"
+    assert cached_user == user
+    assert token_cache.stats()["hits"] == 1
+    assert token_cache.stats()["misses"] == 1
+
+
+def test_logout_invalidates_token_cache(client):
+    token_cache.clear()
+    token = create_jwt_token("test_user_01", 1, timedelta(minutes=30))
+    asyncio.run(get_current_user_from_cookie(token))
+
+    client.cookies.set("access_token", f"Bearer {token}")
+    response = client.post("/api/auth/logout")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert token_cache.stats()["size"] == 0
 
 
 def test_get_current_user_invalid_username():
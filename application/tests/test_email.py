@@ -0,0 +1,50 @@
+import asyncio
+
+from infrastructure.emails import email
+from infrastructure.emails.email import (
+    _render_groups,
+    precompile_templates,
+    render_template,
+    send_emails,
+)
+
+
+def test_precompile_templates():
+    precompile_templates()
+    assert "welcome_email.html" in email._templates
+
+
+def test_render_template():
+    html = render_template("welcome_email.html", {"name": "test_user_01"})
+    assert "test_user_01" in html
+
+
+def test_render_groups_renders_once_per_context(mocker):
+    render = mocker.spy(email, "render_template")
+    groups = _render_groups(
+        "welcome_email.html",
+        [
+            ("a@example.com", {"name": "same"}),
+            ("b@example.com", {"name": "same"}),
+            ("c@example.com", {"name": "other"}),
+        ],
+    )
+    assert render.call_count == 2
+    assert [emails for _, emails in groups] == [
+        ["a@example.com", "b@example.com"],
+        ["c@example.com"],
+    ]
+
+
+def test_send_emails_uses_one_bulk_send(mocker):
+    mocker.patch.object(email.app_settings, "DEBUG", True)
+    send_bulk = mocker.patch.object(email, "_send_smtp_bulk")
+    asyncio.run(
+        send_emails(
+            "welcome_email.html",
+            "ようこそ",
+            [("a@example.com", {"name": "a"}), ("b@example.com", {"name": "b"})],
+        )
+    )
+    send_bulk.assert_called_once()
+    assert len(send_bulk.call_args.args[1]) == 2
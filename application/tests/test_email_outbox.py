@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+from infrastructure.emails.outbox_worker import EmailOutboxWorker
+from models import EmailOutbox
+from sqlalchemy import text
+from tests.utils import TestingAsyncSessionLocal, TestingSessionLocal, test_engine
+
+
+@pytest.fixture
+def outbox_message():
+    db = TestingSessionLocal()
+    message = EmailOutbox(
+        recipient="test_user_01@example.com",
+        template_name="welcome_email.html",
+        subject="ようこそ",
+        context={"name": "test_user_01"},
+    )
+    db.add(message)
+    db.commit()
+    db.refresh(message)
+    yield message
+    with test_engine.connect() as connection:
+        connection.execute(text("DELETE FROM email_outbox;"))
+        connection.commit()
+
+
+def _reload(message: EmailOutbox) -> EmailOutbox:
+    db = TestingSessionLocal()
+    return db.get(EmailOutbox, message.id)
+
+
+def test_process_batch_sends_pending_email(outbox_message):
+    sent = []
+
+    async def send(email, template_name, subject, context):
+        sent.append((email, template_name, subject, context))
+
+    worker = EmailOutboxWorker(session_factory=TestingAsyncSessionLocal, send=send)
+    assert asyncio.run(worker.process_batch()) == 1
+    assert sent == [
+        (
+            "test_user_01@example.com",
+            "welcome_email.html",
+            "ようこそ",
+            {"name": "test_user_01"},
+        )
+    ]
+    message = _reload(outbox_message)
+    assert message.status == "sent"
+    assert message.sent_at is not None
+
+
+def test_process_batch_retries_with_backoff(outbox_message):
+    async def send(email, template_name, subject, context):
+        raise ConnectionError("mail server down")
+
+    worker = EmailOutboxWorker(session_factory=TestingAsyncSessionLocal, send=send)
+    asyncio.run(worker.process_batch())
+    message = _reload(outbox_message)
+    assert message.status == "pending"
+    assert message.attempts == 1
+    assert message.last_error == "mail server down"
+    # 次回送信時刻が未来なので再取得されない
+    assert asyncio.run(worker.process_batch()) == 0
+
+
+def test_process_batch_gives_up_after_max_attempts(outbox_message):
+    async def send(email, template_name, subject, context):
+        raise ConnectionError("mail server down")
+
+    worker = EmailOutboxWorker(
+        session_factory=TestingAsyncSessionLocal, send=send, max_attempts=1
+    )
+    asyncio.run(worker.process_batch())
+    assert _reload(outbox_message).status == "failed"
+
+
+def test_process_batch_sends_outside_transaction(outbox_message):
+    statuses = []
+
+    async def send(email, template_name, subject, context):
+        # 送信中は行ロックを持たず、sendingとしてコミット済み
+        with test_engine.connect() as connection:
+            statuses.append(
+                connection.scalar(
+                    text(
+                        "SELECT status FROM email_outbox WHERE id = :id FOR UPDATE NOWAIT"
+                    ),
+                    {"id": outbox_message.id},
+                )
+            )
+            connection.rollback()
+
+    worker = EmailOutboxWorker(session_factory=TestingAsyncSessionLocal, send=send)
+    assert asyncio.run(worker.process_batch()) == 1
+    assert statuses == ["sending"]
+    assert _reload(outbox_message).status == "sent"
+
+
+def test_process_batch_times_out_hung_send(outbox_message):
+    async def send(email, template_name, subject, context):
+        await asyncio.sleep(10)
+
+    worker = EmailOutboxWorker(
+        session_factory=TestingAsyncSessionLocal, send=send, send_timeout=0.05
+    )
+    asyncio.run(worker.process_batch())
+    message = _reload(outbox_message)
+    assert message.status == "pending"
+    assert message.last_error == "timed out after 0.05s"
+
+
+def test_process_batch_reclaims_expired_lease(outbox_message):
+    # 送信中にワーカーが落ち、リースが切れたメール
+    with test_engine.connect() as connection:
+        connection.execute(
+            text(
+                "UPDATE email_outbox SET status = 'sending', attempts = 1, "
+                "next_attempt_at = now() - interval '1 second'"
+            )
+        )
+        connection.commit()
+
+    async def send(email, template_name, subject, context):
+        pass
+
+    worker = EmailOutboxWorker(session_factory=TestingAsyncSessionLocal, send=send)
+    assert asyncio.run(worker.process_batch()) == 1
+    message = _reload(outbox_message)
+    assert message.status == "sent"
+    assert message.attempts == 2
@@ -1,7 +1,69 @@
+import asyncio
+
+import pytest
 from fastapi import status
+from infrastructure import database
+from infrastructure.database import to_async_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from tests.utils import TEST_SQLALCHEMY_DATABASE_URL
 
 
 def test_health_check(client):
     response = client.get("/api/health")
     assert response.status_code == status.HTTP_200_OK
     assert response.json() == {"msg": "pass"}
+
+
+def test_db_pool_status(client):
+    response = client.get("/api/health/db-pool")
+    assert response.status_code == status.HTTP_200_OK
+    assert {"size", "checked_out", "overflow", "timeouts"} <= response.json().keys()
+
+
+def test_server_timing_header(client):
+    response = client.get("/api/health")
+    assert response.headers["server-timing"].startswith("app;dur=")
+
+
+def test_latency_summary(client):
+    client.get("/api/health")
+    response = client.get("/api/health/latency")
+    assert response.status_code == status.HTTP_200_OK
+    routes = {(row["method"], row["route"]) for row in response.json()}
+    assert ("GET", "/api/health") in routes
+
+
+def test_metrics(client):
+    client.get("/api/health")
+    response = client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    sample = 'http_requests_total{method="GET",route="/api/health",status="200"}'
+    assert sample in response.text
+
+
+def test_warm_up_pool_returns_connections_on_failure(monkeypatch):
+    engine = create_async_engine(to_async_url(TEST_SQLALCHEMY_DATABASE_URL))
+    calls = []
+
+    async def refuse():
+        raise OSError("connection refused")
+
+    class FlakyEngine:
+        # 2本目の接続だけ失敗するエンジン
+        def connect(self):
+            calls.append(None)
+            return refuse() if len(calls) == 2 else engine.connect()
+
+    monkeypatch.setattr(database, "async_engine", FlakyEngine())
+
+    async def run():
+        try:
+            with pytest.raises(OSError):
+                await database.warm_up_pool(3)
+            # 確立できた接続はプールに返っている
+            return engine.pool.checkedout()
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(run()) == 0
+    assert len(calls) == 3
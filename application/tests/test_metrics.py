@@ -0,0 +1,18 @@
+import pytest
+from infrastructure.metrics import instrument_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import QueuePool
+
+
+def test_failed_statement_does_not_leave_start_time():
+    engine = create_engine("sqlite://", poolclass=QueuePool)
+    instrument_engine(engine)
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        with pytest.raises(OperationalError):
+            connection.execute(text("SELECT * FROM missing"))
+        assert connection.info["query_started_at"] == []
+        connection.execute(text("SELECT 1"))
+        assert connection.info["query_started_at"] == []
+    engine.dispose()
@@ -0,0 +1,64 @@
+import logging
+
+import pytest
+from infrastructure import query_stats
+from infrastructure.query_stats import (
+    parameters_shape,
+    track_engine_queries,
+    track_queries,
+)
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    track_engine_queries(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_track_queries_counts_statements(engine):
+    with track_queries() as stats:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            connection.execute(text("SELECT 2"))
+    assert stats.count == 2
+    assert stats.duration > 0
+
+
+def test_track_queries_flags_repeated_statements(engine, mocker, caplog):
+    mocker.patch.object(query_stats.app_settings, "N_PLUS_ONE_THRESHOLD", 3)
+    with caplog.at_level(logging.WARNING, logger="uvicorn"):
+        with track_queries({"method": "GET", "path": "/api/todos"}):
+            with engine.connect() as connection:
+                for todo_id in range(3):
+                    connection.execute(text("SELECT :id"), {"id": todo_id})
+    assert "N+1" in caplog.text
+    assert "GET /api/todos" in caplog.text
+
+
+def test_slow_query_logged(engine, mocker, caplog):
+    mocker.patch.object(query_stats.app_settings, "SLOW_QUERY_THRESHOLD_MS", 0)
+    with caplog.at_level(logging.WARNING, logger="uvicorn"):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT :id"), {"id": 1})
+    assert "Slow query" in caplog.text
+    assert "params=(int)" in caplog.text
+
+
+def test_failed_statement_does_not_skew_timing(engine):
+    with engine.connect() as connection:
+        with pytest.raises(OperationalError):
+            connection.execute(text("SELECT * FROM missing"))
+        assert connection.info["query_stats_started_at"] == []
+        with track_queries() as stats:
+            connection.execute(text("SELECT 1"))
+        assert connection.info["query_stats_started_at"] == []
+    assert stats.count == 1
+
+
+def test_parameters_shape():
+    assert parameters_shape({"id": 1, "title": "a"}) == "{id: int, title: str}"
+    assert parameters_shape([{"id": 1}, {"id": 2}]) == "2 x {id: int}"
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+from infrastructure.slack import SlackNotifier
+from tests.fake_webhook import FakeWebhookServer
+
+
+@pytest.fixture
+def webhook():
+    with FakeWebhookServer() as server:
+        yield server
+
+
+def test_notify_groups_identical_messages(webhook):
+    async def run():
+        notifier = SlackNotifier(webhook.url)
+        await notifier.start()
+        for _ in range(3):
+            notifier.notify("Traceback: ZeroDivisionError")
+        notifier.notify("Traceback: KeyError")
+        await notifier.stop()
+
+    asyncio.run(run())
+    assert webhook.texts() == [
+        ":rotating_light:(x3) Traceback: ZeroDivisionError",
+        ":rotating_light:Traceback: KeyError",
+    ]
+
+
+def test_stop_finishes_batch_in_flight():
+    async def run(webhook):
+        notifier = SlackNotifier(webhook.url, flush_interval=0.01)
+        await notifier.start()
+        notifier.notify("error 1")
+        notifier.notify("error 2")
+        # 1通目の送信中(2通目はキューから取り出し済み)に停止する
+        await asyncio.to_thread(webhook.received.wait, 5)
+        await notifier.stop()
+
+    with FakeWebhookServer(delay=0.2) as webhook:
+        asyncio.run(run(webhook))
+        assert webhook.texts() == [
+            ":rotating_light:error 1",
+            ":rotating_light:error 2",
+        ]
+
+
+def test_notify_rate_limited(webhook):
+    async def run():
+        notifier = SlackNotifier(webhook.url, max_messages_per_window=2)
+        for i in range(5):
+            notifier.notify(f"error {i}")
+        await notifier.flush()
+        return notifier
+
+    notifier = asyncio.run(run())
+    assert len(webhook.payloads) == 2
+    assert notifier.suppressed == 3
+
+
+def test_notify_drops_when_queue_full(webhook):
+    notifier = SlackNotifier(webhook.url, queue_size=2)
+    assert notifier.notify("error 1")
+    assert notifier.notify("error 2")
+    assert not notifier.notify("error 3")
+    assert notifier.dropped == 1
+
+
+def test_notify_without_webhook_url():
+    notifier = SlackNotifier("")
+    assert not notifier.notify("error")
@@ -2,6 +2,7 @@ import pytest
 from config.dependency import get_current_user_from_cookie
 from fastapi import status
 from main import app
+from tests.utils import assert_max_queries
 
 
 @pytest.fixture
@@ -24,19 +25,50 @@ def update_data():
 
 
 def test_list_todos(client, headers, test_todo_one):
-    response = client.get("/api/todos", headers=headers)
+    with assert_max_queries(1):
+        response = client.get("/api/todos", headers=headers)
     assert response.status_code == status.HTTP_200_OK
-    assert isinstance(response.json(), list)
-    assert response.json() == [
-        {
-            "id": test_todo_one.id,
-            "title": test_todo_one.title,
-            "description": test_todo_one.description,
-            "is_starred": test_todo_one.is_starred,
-            "is_completed": test_todo_one.is_completed,
-            "owner_id": test_todo_one.owner_id,
-        }
-    ]
+    assert isinstance(response.json()["items"], list)
+    assert response.json() == {
+        "items": [
+            {
+                "id": test_todo_one.id,
+                "title": test_todo_one.title,
+                "description": test_todo_one.description,
+                "is_starred": test_todo_one.is_starred,
+                "is_completed": test_todo_one.is_completed,
+                "owner_id": test_todo_one.owner_id,
+            }
+        ],
+        "next_cursor": None,
+    }
+
+
+def test_list_todos_paginated(client, headers, create_data, test_todo_one):
+    created = client.post("/api/todos", json=create_data, headers=headers).json()
+    response = client.get("/api/todos", params={"limit": 1}, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert [todo["id"] for todo in response.json()["items"]] == [test_todo_one.id]
+    next_cursor = response.json()["next_cursor"]
+    assert next_cursor
+
+    response = client.get(
+        "/api/todos", params={"limit": 1, "cursor": next_cursor}, headers=headers
+    )
+    assert [todo["id"] for todo in response.json()["items"]] == [created["id"]]
+    assert response.json()["next_cursor"] is None
+
+
+def test_list_todos_filtered(client, headers, test_todo_one):
+    response = client.get("/api/todos", params={"is_starred": True}, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["items"] == []
+
+
+def test_list_todos_invalid_cursor(client, headers, test_todo_one):
+    response = client.get("/api/todos", params={"cursor": "@@@"}, headers=headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json() == {"detail": "Invalid cursor"}
 
 
 def test_list_todos_unauthorized(client):
@@ -46,7 +78,8 @@ def test_list_todos_unauthorized(client):
 
 
 def test_read_todo(client, headers, test_todo_one):
-    response = client.get(f"/api/todos/{test_todo_one.id}", headers=headers)
+    with assert_max_queries(1):
+        response = client.get(f"/api/todos/{test_todo_one.id}", headers=headers)
     assert response.status_code == status.HTTP_200_OK
     assert response.json() == {
         "id": test_todo_one.id,
@@ -71,7 +104,8 @@ def test_read_todos_unauthorized(client, test_todo_one):
 
 
 def test_create_todo(client, headers, create_data, test_todo_one):
-    response = client.post("/api/todos", json=create_data, headers=headers)
+    with assert_max_queries(1):
+        response = client.post("/api/todos", json=create_data, headers=headers)
     assert response.status_code == status.HTTP_201_CREATED
     assert response.json()["title"] == create_data["title"]
     assert response.json()["description"] == create_data["description"]
@@ -85,9 +119,10 @@ def test_create_todos_unauthorized(client, create_data):
 
 
 def test_update_todo(client, headers, update_data, test_todo_one):
-    response = client.put(
-        f"/api/todos/{test_todo_one.id}", json=update_data, headers=headers
-    )
+    with assert_max_queries(1):
+        response = client.put(
+            f"/api/todos/{test_todo_one.id}", json=update_data, headers=headers
+        )
     assert response.status_code == status.HTTP_200_OK
     assert response.json()["title"] == update_data["title"]
     assert response.json()["description"] == update_data["description"]
@@ -109,7 +144,8 @@ def test_update_todos_unauthorized(client, update_data, test_todo_one):
 
 
 def test_delete_todo(client, headers, test_todo_one):
-    response = client.delete(f"/api/todos/{test_todo_one.id}", headers=headers)
+    with assert_max_queries(1):
+        response = client.delete(f"/api/todos/{test_todo_one.id}", headers=headers)
     assert response.status_code == status.HTTP_204_NO_CONTENT
 
 
@@ -123,3 +159,127 @@ def test_delete_todo_unauthorized(client, test_todo_one):
     app.dependency_overrides.pop(get_current_user_from_cookie, None)
     response = client.delete(f"/api/todos/{test_todo_one.id}")
     assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_create_todos_batch(client, headers, create_data, test_todo_one):
+    with assert_max_queries(1):
+        response = client.post(
+            "/api/todos/batch", json=[create_data, create_data], headers=headers
+        )
+    assert response.status_code == status.HTTP_201_CREATED
+    assert [result["status"] for result in response.json()] == [
+        status.HTTP_201_CREATED,
+        status.HTTP_201_CREATED,
+    ]
+    assert response.json()[0]["todo"]["title"] == create_data["title"]
+
+
+def test_update_todos_batch(
+    client, headers, update_data, test_todo_one, non_existing_user
+):
+    response = client.put(
+        "/api/todos/batch",
+        json=[
+            {**update_data, "id": test_todo_one.id},
+            {**update_data, "id": int(non_existing_user)},
+        ],
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()[0]["status"] == status.HTTP_200_OK
+    assert response.json()[0]["todo"]["title"] == update_data["title"]
+    assert response.json()[1] == {
+        "id": int(non_existing_user),
+        "status": status.HTTP_404_NOT_FOUND,
+        "todo": None,
+    }
+
+
+def test_delete_todos_batch(client, headers, test_todo_one, non_existing_user):
+    response = client.request(
+        "DELETE",
+        "/api/todos/batch",
+        json={"ids": [test_todo_one.id, int(non_existing_user)]},
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert [result["status"] for result in response.json()] == [
+        status.HTTP_204_NO_CONTENT,
+        status.HTTP_404_NOT_FOUND,
+    ]
+
+
+def test_list_todos_not_modified(client, headers, create_data, test_todo_one):
+    response = client.get("/api/todos", headers=headers)
+    etag = response.headers["etag"]
+    with assert_max_queries(1):
+        response = client.get("/api/todos", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+
+    client.post("/api/todos", json=create_data, headers=headers)
+    response = client.get("/api/todos", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["etag"] != etag
+    assert len(response.json()["items"]) == 2
+
+
+def test_failed_writes_keep_list_not_modified(client, headers, test_todo_one):
+    etag = client.get("/api/todos", headers=headers).headers["etag"]
+    # 404・412になった書き込みではバージョンを上げない
+    response = client.delete("/api/todos/999999", headers=headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = client.delete(
+        f"/api/todos/{test_todo_one.id}",
+        headers={**headers, "If-Match": f'"{test_todo_one.id}-9"'},
+    )
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    response = client.request(
+        "DELETE", "/api/todos/batch", json={"ids": [999999]}, headers=headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    response = client.get("/api/todos", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+def test_read_todo_not_modified(client, headers, test_todo_one):
+    response = client.get(f"/api/todos/{test_todo_one.id}", headers=headers)
+    assert response.headers["etag"] == f'"{test_todo_one.id}-1"'
+    assert "version" not in response.json()
+    response = client.get(
+        f"/api/todos/{test_todo_one.id}",
+        headers={**headers, "If-None-Match": response.headers["etag"]},
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+def test_update_todo_if_match(client, headers, update_data, test_todo_one):
+    etag = client.get(f"/api/todos/{test_todo_one.id}", headers=headers).headers["etag"]
+    with assert_max_queries(1):
+        response = client.put(
+            f"/api/todos/{test_todo_one.id}",
+            json=update_data,
+            headers={**headers, "If-Match": etag},
+        )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["etag"] == f'"{test_todo_one.id}-2"'
+
+    # 古いETagでの更新・削除は412になる
+    response = client.put(
+        f"/api/todos/{test_todo_one.id}",
+        json=update_data,
+        headers={**headers, "If-Match": etag},
+    )
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    response = client.delete(
+        f"/api/todos/{test_todo_one.id}", headers={**headers, "If-Match": etag}
+    )
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+
+
+def test_delete_todo_if_match_not_found(client, headers, non_existing_user):
+    response = client.delete(
+        f"/api/todos/{non_existing_user}",
+        headers={**headers, "If-Match": f'"{non_existing_user}-1"'},
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,130 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from fastapi import status
+from infrastructure.todo_archive_worker import TodoArchiveWorker
+from repositories.todo_repository import TodoRepository
+from sqlalchemy import text
+from tests.utils import (
+    TestingAsyncSessionLocal,
+    override_get_current_user,
+    test_engine,
+)
+
+
+@pytest.fixture
+def old_todos(test_todo_one):
+    # 101-105: 完了して40日経過(アーカイブ対象) / 106: 完了したばかり /
+    # 107: 未完了で40日経過 / 108: 完了して40日経過したが論理削除済み
+    with test_engine.connect() as connection:
+        connection.execute(
+            text(
+                "INSERT INTO todos (id, title, description, is_starred, is_completed, "
+                "  owner_id, updated_at, deleted_at) "
+                "SELECT i, 'task ' || i, 'description of task ' || i, false, "
+                "  i <> 107, :owner_id, "
+                "  CASE WHEN i = 106 THEN now() ELSE now() - interval '40 days' END, "
+                "  CASE WHEN i = 108 THEN now() END "
+                "FROM generate_series(101, 108) AS i"
+            ),
+            {"owner_id": test_todo_one.owner_id},
+        )
+        connection.commit()
+
+
+def _worker(**kwargs) -> TodoArchiveWorker:
+    options = {
+        "session_factory": TestingAsyncSessionLocal,
+        "older_than": timedelta(days=30),
+        "batch_size": 2,
+        "batch_interval": 0,
+        "cache": None,
+    }
+    return TodoArchiveWorker(**{**options, **kwargs})
+
+
+def _ids(table: str) -> list[int]:
+    with test_engine.connect() as connection:
+        return connection.scalars(text(f"SELECT id FROM {table} ORDER BY id")).all()
+
+
+def test_archive_completed_todos(client, headers, old_todos):
+    etag = client.get("/api/todos", headers=headers).headers["ETag"]
+
+    # batch_size件ずつ、対象がなくなるまで移す
+    assert asyncio.run(_worker().archive_all()) == 5
+    assert _ids("todos_archive") == [101, 102, 103, 104, 105]
+    assert _ids("todos") == [1, 106, 107, 108]
+    # 対象がなければ何もしない(途中で止めても残りから再開できる)
+    assert asyncio.run(_worker().archive_batch()) == 0
+
+    # 一覧の内容が変わるため、以前のETagでは304にならない
+    response = client.get("/api/todos", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert [todo["id"] for todo in response.json()["items"]] == [1, 106, 107]
+
+    response = client.get("/api/todos?include_archived=true&limit=4", headers=headers)
+    assert [todo["id"] for todo in response.json()["items"]] == [1, 101, 102, 103]
+    response = client.get(
+        "/api/todos?include_archived=true&limit=4"
+        f"&cursor={response.json()['next_cursor']}",
+        headers=headers,
+    )
+    assert [todo["id"] for todo in response.json()["items"]] == [104, 105, 106, 107]
+    assert response.json()["next_cursor"] is None
+
+    assert client.get("/api/todos/101", headers=headers).status_code == 404
+    response = client.get("/api/todos/101?include_archived=true", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["title"] == "task 101"
+    assert response.json()["is_completed"] is True
+
+
+def test_archive_does_not_wait_for_requests(old_todos):
+    # リクエストがユーザの行をロックしている間は待たずに後回しにする
+    with test_engine.connect() as connection:
+        connection.execute(
+            text("SELECT id FROM users WHERE id = :id FOR UPDATE"),
+            {"id": override_get_current_user().id},
+        )
+        assert asyncio.run(_worker().archive_batch()) is None
+        connection.rollback()
+    assert _ids("todos_archive") == []
+    assert asyncio.run(_worker().archive_batch()) == 2
+
+
+def test_bulk_delete_deletes_archived_todos(old_todos):
+    asyncio.run(_worker().archive_all())
+
+    async def bulk_delete():
+        async with TestingAsyncSessionLocal() as db:
+            return await TodoRepository(db).bulk_delete(
+                override_get_current_user(), chunk_size=3
+            )
+
+    assert asyncio.run(bulk_delete()) == 9
+    assert _ids("todos") == []
+    assert _ids("todos_archive") == []
+    # アーカイブしたときのtombstoneだけが残る
+    with test_engine.connect() as connection:
+        assert (
+            connection.scalar(
+                text(
+                    "SELECT count(*) FROM todo_tombstones WHERE todo_id BETWEEN 101 AND 105"
+                )
+            )
+            == 5
+        )
+
+
+def test_archive_is_synced_as_delete(client, headers, old_todos):
+    since = client.get("/api/todos/changes", headers=headers).json()["last_seq"]
+    asyncio.run(_worker().archive_all())
+    # 差分同期は既定の一覧と同じく、アーカイブしたTodoを削除として返す
+    response = client.get(
+        "/api/todos/changes", params={"since": since}, headers=headers
+    )
+    assert response.json()["upserts"] == []
+    assert sorted(response.json()["deleted_ids"]) == [101, 102, 103, 104, 105]
+    assert response.json()["last_seq"] > since
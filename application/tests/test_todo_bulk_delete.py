@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+from fastapi import status
+from infrastructure.todo_delete_worker import TodoDeleteWorker
+from repositories.todo_repository import TodoRepository
+from sqlalchemy import text
+from tests.utils import (
+    TestingAsyncSessionLocal,
+    override_get_current_user,
+    test_engine,
+)
+
+
+@pytest.fixture
+def many_todos(test_todo_one):
+    with test_engine.connect() as connection:
+        connection.execute(
+            text(
+                "INSERT INTO todos (id, title, description, is_starred, is_completed, owner_id) "
+                "SELECT i, 'task ' || i, 'description of task ' || i, false, false, :owner_id "
+                "FROM generate_series(1001, 3500) AS i"
+            ),
+            {"owner_id": test_todo_one.owner_id},
+        )
+        connection.commit()
+    yield
+    with test_engine.connect() as connection:
+        connection.execute(text("DELETE FROM todo_delete_jobs;"))
+        connection.commit()
+
+
+def _count_todos(deleted: bool | None = None) -> int:
+    condition = {
+        None: "",
+        True: " WHERE deleted_at IS NOT NULL",
+        False: " WHERE deleted_at IS NULL",
+    }[deleted]
+    with test_engine.connect() as connection:
+        return connection.execute(
+            text("SELECT count(*) FROM todos" + condition)
+        ).scalar()
+
+
+def test_bulk_delete_in_chunks(many_todos):
+    async def bulk_delete():
+        async with TestingAsyncSessionLocal() as db:
+            return await TodoRepository(db).bulk_delete(
+                override_get_current_user(), chunk_size=1000
+            )
+
+    assert asyncio.run(bulk_delete()) == 2501
+    assert _count_todos() == 0
+
+
+def test_bulk_delete_todo(client, headers, many_todos):
+    response = client.delete("/api/todos/bulk_delete", headers=headers)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert _count_todos() == 0
+
+
+def test_bulk_delete_job(client, headers, many_todos):
+    response = client.post("/api/todos/bulk_delete/jobs", headers=headers)
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    job = response.json()
+    assert job["status"] == "pending"
+    # 実行中のジョブがある間は同じジョブを返す
+    response = client.post("/api/todos/bulk_delete/jobs", headers=headers)
+    assert response.json()["id"] == job["id"]
+
+    worker = TodoDeleteWorker(session_factory=TestingAsyncSessionLocal, chunk_size=1000)
+    assert asyncio.run(worker.process_job()) is True
+    assert asyncio.run(worker.process_job()) is False
+
+    response = client.get(f"/api/todos/bulk_delete/jobs/{job['id']}", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["status"] == "completed"
+    assert response.json()["deleted_count"] == 2501
+    assert response.json()["finished_at"] is not None
+    assert _count_todos() == 0
+
+
+def test_bulk_delete_job_soft_delete(client, headers, many_todos):
+    response = client.post(
+        "/api/todos/bulk_delete/jobs?soft_delete=true", headers=headers
+    )
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    # 行は書き換えずに、ジョブの完了を待たずに見えなくなる
+    assert client.get("/api/todos", headers=headers).json()["items"] == []
+    assert client.get("/api/todos/1001", headers=headers).status_code == 404
+    assert client.delete("/api/todos/1001", headers=headers).status_code == 404
+    assert _count_todos(deleted=False) == 2501
+
+    worker = TodoDeleteWorker(session_factory=TestingAsyncSessionLocal, chunk_size=1000)
+    asyncio.run(worker.process_job())
+    assert _count_todos() == 0
+
+
+def test_bulk_delete_job_soft_delete_keeps_new_todos(client, headers, many_todos):
+    client.post("/api/todos/bulk_delete/jobs?soft_delete=true", headers=headers)
+    # 論理削除の後に作成されたTodoは物理削除の対象にならない
+    with test_engine.connect() as connection:
+        connection.execute(
+            text(
+                "INSERT INTO todos (id, title, description, is_starred, is_completed, owner_id) "
+                "VALUES (5000, 'new task', 'description of new task', false, false, :owner_id)"
+            ),
+            {"owner_id": override_get_current_user().id},
+        )
+        connection.commit()
+    worker = TodoDeleteWorker(session_factory=TestingAsyncSessionLocal, chunk_size=1000)
+    asyncio.run(worker.process_job())
+    assert _count_todos() == 1
+    assert [
+        todo["id"] for todo in client.get("/api/todos", headers=headers).json()["items"]
+    ] == [5000]
+
+
+def test_concurrent_delete_jobs_share_one_job(many_todos):
+    user = override_get_current_user()
+
+    async def create_job():
+        async with TestingAsyncSessionLocal() as db:
+            job = await TodoRepository(db).create_delete_job(user, soft_delete=True)
+            return job.id
+
+    async def create_jobs():
+        return await asyncio.gather(*(create_job() for _ in range(5)))
+
+    assert len(set(asyncio.run(create_jobs()))) == 1
+    with test_engine.connect() as connection:
+        assert (
+            connection.execute(text("SELECT count(*) FROM todo_delete_jobs")).scalar()
+            == 1
+        )
+
+
+def test_read_bulk_delete_job_not_found(client, headers, non_existing_user):
+    response = client.get(
+        f"/api/todos/bulk_delete/jobs/{non_existing_user}", headers=headers
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+from config.dependency import get_todo_cache
+from fastapi import status
+from infrastructure.todo_cache import MemoryCacheBackend, RedisCacheBackend, TodoCache
+from main import app
+from tests.fake_redis import FakeRedis
+from sqlalchemy import text
+from tests.utils import TestingSessionLocal, assert_max_queries
+
+
+@pytest.fixture
+def todo_cache():
+    cache = TodoCache(MemoryCacheBackend(max_bytes=1024 * 1024), ttl=60)
+    app.dependency_overrides[get_todo_cache] = lambda: cache
+    yield cache
+    app.dependency_overrides.pop(get_todo_cache, None)
+
+
+def test_memory_backend_expires_entries():
+    backend = MemoryCacheBackend(max_bytes=1024)
+
+    async def run():
+        await backend.set("key", b"value", ttl=0.01)
+        assert await backend.get("key") == b"value"
+        await asyncio.sleep(0.02)
+        return await backend.get("key")
+
+    assert asyncio.run(run()) is None
+    assert backend.size == 0
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryCacheBackend(max_bytes=20)
+
+    async def run():
+        await backend.set("a", b"x" * 8, ttl=60)
+        await backend.set("b", b"x" * 8, ttl=60)
+        await backend.get("a")
+        await backend.set("c", b"x" * 8, ttl=60)
+        return [await backend.get(key) for key in ("a", "b", "c")]
+
+    assert asyncio.run(run()) == [b"x" * 8, None, b"x" * 8]
+    assert backend.size <= 20
+
+
+def test_invalidate_drops_only_that_users_entries():
+    cache = TodoCache(RedisCacheBackend(FakeRedis()), ttl=60)
+
+    async def run():
+        for user_id, todo_id in ((1, 10), (2, 20)):
+            _, version = await cache.get(user_id, "one", todo_id)
+            await cache.set(
+                user_id, "one", todo_id, value={"id": todo_id}, version=version
+            )
+        await cache.invalidate(1)
+        return (await cache.get(1, "one", 10))[0], (await cache.get(2, "one", 20))[0]
+
+    assert asyncio.run(run()) == (None, {"id": 20})
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 3
+
+
+def test_value_read_before_invalidation_is_not_cached():
+    cache = TodoCache(MemoryCacheBackend(max_bytes=1024 * 1024), ttl=60)
+
+    async def run():
+        # 読み込みの途中で書き込みがあった場合、書き込み前の値は新しいバージョンに入らない
+        _, version = await cache.get(1, "one", 10)
+        await cache.invalidate(1)
+        await cache.set(1, "one", 10, value={"title": "stale"}, version=version)
+        return await cache.get(1, "one", 10)
+
+    value, version = asyncio.run(run())
+    assert value is None
+    assert version is not None
+
+
+def test_backend_errors_are_treated_as_misses():
+    redis = FakeRedis()
+    redis.available = False
+    cache = TodoCache(RedisCacheBackend(redis), ttl=60)
+
+    async def run():
+        await cache.set(1, "one", 10, value={"id": 10}, version="1")
+        return await cache.get(1, "one", 10)
+
+    assert asyncio.run(run()) == (None, None)
+    assert cache.stats()["errors"] == 2
+
+
+def test_read_todo_is_served_from_cache(client, headers, test_todo_one, todo_cache):
+    client.get(f"/api/todos/{test_todo_one.id}", headers=headers)
+    with assert_max_queries(0):
+        response = client.get(f"/api/todos/{test_todo_one.id}", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["title"] == test_todo_one.title
+    assert todo_cache.stats()["hits"] == 1
+
+
+def test_update_todo_invalidates_cache(client, headers, test_todo_one, todo_cache):
+    client.get("/api/todos", headers=headers)
+    client.get(f"/api/todos/{test_todo_one.id}", headers=headers)
+    client.put(
+        f"/api/todos/{test_todo_one.id}",
+        json={
+            "title": "Updated Todo",
+            "description": "Updated test",
+            "is_starred": True,
+            "is_completed": True,
+        },
+        headers=headers,
+    )
+    response = client.get(f"/api/todos/{test_todo_one.id}", headers=headers)
+    assert response.json()["title"] == "Updated Todo"
+    response = client.get("/api/todos", headers=headers)
+    assert response.json()["items"][0]["title"] == "Updated Todo"
+
+
+def test_delete_todo_invalidates_cache(client, headers, test_todo_one, todo_cache):
+    client.get("/api/todos", headers=headers)
+    client.delete(f"/api/todos/{test_todo_one.id}", headers=headers)
+    assert client.get("/api/todos", headers=headers).json()["items"] == []
+    response = client.get(f"/api/todos/{test_todo_one.id}", headers=headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_stale_cached_list_is_revalidated(client, headers, test_todo_one, todo_cache):
+    etag = client.get("/api/todos", headers=headers).headers["etag"]
+    # 別のプロセスでの書き込みなど、無効化が届かずにバージョンだけが上がった場合
+    with TestingSessionLocal() as db:
+        db.execute(text("UPDATE users SET todos_version = todos_version + 1"))
+        db.commit()
+    response = client.get("/api/todos", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["etag"] != etag
+    response = client.get(
+        "/api/todos", headers={**headers, "If-None-Match": response.headers["etag"]}
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
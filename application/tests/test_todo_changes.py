@@ -0,0 +1,101 @@
+from fastapi import status
+from tests.utils import assert_max_queries
+
+
+def _sync(client, headers, since=None, limit=200):
+    # next_cursorがなくなるまで取得し、全ページの変更とlast_seqを返す
+    upserts, deleted_ids = [], []
+    params = {"limit": limit}
+    if since is not None:
+        params["since"] = since
+    while True:
+        response = client.get("/api/todos/changes", params=params, headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        body = response.json()
+        upserts += body["upserts"]
+        deleted_ids += body["deleted_ids"]
+        if body["next_cursor"] is None:
+            return upserts, deleted_ids, body["last_seq"]
+        params = {"limit": limit, "cursor": body["next_cursor"]}
+
+
+def test_changes_full_sync(client, headers, test_todo_one):
+    with assert_max_queries(1):
+        upserts, deleted_ids, last_seq = _sync(client, headers)
+    assert [todo["id"] for todo in upserts] == [test_todo_one.id]
+    assert upserts[0]["version"] == 1
+    assert deleted_ids == []
+    assert last_seq == 0
+
+    # 変更がなければ空で、last_seqはそのまま
+    assert _sync(client, headers, since=last_seq) == ([], [], last_seq)
+
+
+def test_changes_since_returns_only_changed(client, headers, test_todo_one):
+    _, _, since = _sync(client, headers)
+    created = client.post(
+        "/api/todos",
+        json={"title": "Created Todo", "description": "Created test"},
+        headers=headers,
+    ).json()
+    client.put(
+        f"/api/todos/{created['id']}",
+        json={
+            "title": "Updated Todo",
+            "description": "Updated test",
+            "is_starred": True,
+            "is_completed": False,
+        },
+        headers=headers,
+    )
+    client.delete(f"/api/todos/{test_todo_one.id}", headers=headers)
+
+    upserts, deleted_ids, last_seq = _sync(client, headers, since=since)
+    assert [(todo["id"], todo["title"]) for todo in upserts] == [
+        (created["id"], "Updated Todo")
+    ]
+    assert deleted_ids == [test_todo_one.id]
+    assert last_seq == 3
+    assert _sync(client, headers, since=last_seq) == ([], [], last_seq)
+
+
+def test_changes_paginated(client, headers, test_todo_one):
+    _, _, since = _sync(client, headers)
+    # 同じchange_seqの行がページをまたいでも取りこぼさない
+    response = client.post(
+        "/api/todos/batch",
+        json=[
+            {"title": f"task {i:02}", "description": f"description {i:02}"}
+            for i in range(7)
+        ],
+        headers=headers,
+    )
+    created_ids = [result["id"] for result in response.json()]
+    client.request(
+        "DELETE", "/api/todos/batch", json={"ids": created_ids[:2]}, headers=headers
+    )
+
+    upserts, deleted_ids, last_seq = _sync(client, headers, since=since, limit=2)
+    assert [todo["id"] for todo in upserts] == created_ids[2:]
+    assert deleted_ids == created_ids[:2]
+    assert last_seq == 2
+
+
+def test_changes_soft_and_hard_deletes(client, headers, test_todo_one):
+    _, _, since = _sync(client, headers)
+    response = client.post(
+        "/api/todos/bulk_delete/jobs", params={"soft_delete": True}, headers=headers
+    )
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert _sync(client, headers, since=since)[1] == [test_todo_one.id]
+
+    # 物理削除済みのTodoはtombstoneから返される
+    client.delete("/api/todos/bulk_delete", headers=headers)
+    assert _sync(client, headers, since=since)[1] == [test_todo_one.id]
+
+
+def test_changes_invalid_cursor(client, headers, test_todo_one):
+    response = client.get(
+        "/api/todos/changes", params={"cursor": "invalid"}, headers=headers
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
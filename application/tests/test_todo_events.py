@@ -0,0 +1,195 @@
+import asyncio
+import json
+
+import pytest
+from config.dependency import get_todo_event_broker
+from infrastructure.todo_events import TodoEventBroker, to_asyncpg_dsn
+from main import app
+from models import Todos
+from repositories.todo_repository import TodoRepository, next_change_seq
+from schemas.requests.todo_request_schema import (
+    CreateTodoRequest,
+    UpdateTodoRequest,
+)
+from sqlalchemy import insert
+from tests.utils import (
+    TEST_SQLALCHEMY_DATABASE_URL,
+    TestingAsyncSessionLocal,
+    override_get_current_user,
+)
+
+TEST_DSN = to_asyncpg_dsn(TEST_SQLALCHEMY_DATABASE_URL)
+
+
+def test_subscription_coalesces_notifications():
+    async def run():
+        broker = TodoEventBroker("unused", queue_size=10)
+        subscription = broker.subscribe(1)
+        other = broker.subscribe(2)
+        for change_seq in range(1, 6):
+            broker.publish(1, change_seq)
+        assert await subscription.wait(heartbeat=0.1) is True
+        # 溜まっていた通知は1回のwaitでまとめて読まれる
+        assert await subscription.wait(heartbeat=0.01) is False
+        assert await other.wait(heartbeat=0.01) is False
+
+    asyncio.run(run())
+
+
+def test_slow_consumer_is_disconnected():
+    async def run():
+        broker = TodoEventBroker("unused", queue_size=3)
+        subscription = broker.subscribe(1)
+        for change_seq in range(1, 5):
+            broker.publish(1, change_seq)
+        assert subscription.closed
+        assert broker.subscription_count() == 0
+        with pytest.raises(EOFError):
+            await subscription.wait(heartbeat=0.1)
+
+    asyncio.run(run())
+
+
+def test_notify_is_sent_on_commit_only(test_todo_one):
+    user = override_get_current_user()
+
+    async def run():
+        broker = TodoEventBroker(TEST_DSN)
+        await broker.start()
+        subscription = broker.subscribe(user.id)
+        try:
+            # ロールバックした書き込みは通知されない
+            async with TestingAsyncSessionLocal() as db:
+                await db.execute(
+                    insert(Todos).values(
+                        title="rolled back",
+                        description="rolled back",
+                        owner_id=user.id,
+                        change_seq=next_change_seq(user.id),
+                    )
+                )
+                await db.rollback()
+            assert await subscription.wait(heartbeat=0.3) is False
+
+            async with TestingAsyncSessionLocal() as db:
+                await TodoRepository(db).create(
+                    user, CreateTodoRequest(title="created", description="created")
+                )
+            assert await subscription.wait(heartbeat=2) is True
+        finally:
+            await broker.stop()
+
+    asyncio.run(run())
+
+
+async def _open_stream(path: str, headers: list[tuple[bytes, bytes]] = ()):
+    # 無限に続くレスポンスを受け取りながら読むため、ASGIアプリを直接呼ぶ
+    chunks: asyncio.Queue[bytes] = asyncio.Queue()
+    disconnected = asyncio.Event()
+
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200
+        elif message["type"] == "http.response.body":
+            await chunks.put(message.get("body", b""))
+
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": list(headers),
+        "client": ("testclient", 50000),
+        "server": ("testserver", 80),
+    }
+    task = asyncio.create_task(app(scope, receive, send))
+    return task, chunks
+
+
+async def _read_events(chunks: asyncio.Queue, count: int) -> list[dict]:
+    events = []
+    buffer = b""
+    while len(events) < count:
+        buffer += await asyncio.wait_for(chunks.get(), timeout=5)
+        while b"\n\n" in buffer:
+            block, buffer = buffer.split(b"\n\n", 1)
+            fields = dict(
+                line.split(": ", 1)
+                for line in block.decode().splitlines()
+                if not line.startswith(":")
+            )
+            if fields:
+                fields["data"] = json.loads(fields["data"])
+                events.append(fields)
+    return events
+
+
+def test_stream_todo_events(client, test_todo_one):
+    user = override_get_current_user()
+
+    async def run():
+        broker = TodoEventBroker(TEST_DSN)
+        await broker.start()
+        app.dependency_overrides[get_todo_event_broker] = lambda: broker
+        try:
+            task, chunks = await _open_stream("/api/todos/stream")
+            assert await chunks.get() == b": connected\n\n"
+
+            events = []
+            async with TestingAsyncSessionLocal() as db:
+                repository = TodoRepository(db)
+                todo = await repository.create(
+                    user, CreateTodoRequest(title="created", description="created")
+                )
+                events += await _read_events(chunks, 1)
+                await repository.update(
+                    user,
+                    todo.id,
+                    UpdateTodoRequest(
+                        title="updated",
+                        description="updated",
+                        is_starred=True,
+                        is_completed=False,
+                    ),
+                )
+                events += await _read_events(chunks, 1)
+                await repository.delete(user, test_todo_one.id)
+                events += await _read_events(chunks, 1)
+
+            # Last-Event-IDから再接続すると、その後の変更だけが送られる
+            resumed, resumed_chunks = await _open_stream(
+                "/api/todos/stream",
+                [(b"last-event-id", events[0]["id"].encode())],
+            )
+            assert await resumed_chunks.get() == b": connected\n\n"
+            resumed_events = await _read_events(resumed_chunks, 2)
+
+            # 停止すると購読が閉じられ、ストリームが終わる
+            await broker.stop()
+            await asyncio.wait_for(asyncio.gather(task, resumed), timeout=5)
+            return todo, events, resumed_events
+        finally:
+            await broker.stop()
+            app.dependency_overrides.pop(get_todo_event_broker, None)
+
+    todo, events, resumed_events = asyncio.run(run())
+    assert [(event["event"], event["data"]["id"]) for event in events] == [
+        ("create", todo.id),
+        ("update", todo.id),
+        ("delete", test_todo_one.id),
+    ]
+    assert events[1]["data"]["title"] == "updated"
+    assert events[2]["data"] == {"id": test_todo_one.id}
+    assert [event["id"] for event in resumed_events] == [
+        event["id"] for event in events[1:]
+    ]
@@ -0,0 +1,100 @@
+import asyncio
+import gzip
+import json
+import resource
+
+import pytest
+from fastapi import status
+from repositories.todo_repository import TodoRepository
+from sqlalchemy import text
+from tests.utils import (
+    TestingAsyncSessionLocal,
+    override_get_current_user,
+    test_engine,
+)
+from usecases.todo_export import encode_csv, encode_ndjson
+
+EXPORT_ROWS = 1_000_000
+
+
+@pytest.fixture
+def many_todos(test_todo_one):
+    # ORMを経由せずDB側で行を生成する
+    with test_engine.connect() as connection:
+        connection.execute(
+            text(
+                "INSERT INTO todos (id, title, description, is_starred, is_completed, owner_id) "
+                "SELECT i, 'task ' || i, 'description of task ' || i, false, false, :owner_id "
+                "FROM generate_series(1000001, 1000000 + :rows) AS i"
+            ),
+            {"owner_id": test_todo_one.owner_id, "rows": EXPORT_ROWS},
+        )
+        connection.commit()
+    yield
+
+
+def test_export_todos_ndjson(client, headers, test_todo_one):
+    response = client.get("/api/todos/export?format=ndjson", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows == [
+        {
+            "id": test_todo_one.id,
+            "title": test_todo_one.title,
+            "description": test_todo_one.description,
+            "is_starred": False,
+            "is_completed": False,
+            "owner_id": test_todo_one.owner_id,
+        }
+    ]
+
+
+def test_export_todos_csv(client, headers, test_todo_one):
+    response = client.get("/api/todos/export?format=csv", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "text/csv; charset=utf-8"
+    assert response.text.splitlines() == [
+        "id,title,description,is_starred,is_completed,owner_id",
+        f"{test_todo_one.id},test task 01,description of test task 01,False,False,{test_todo_one.owner_id}",
+    ]
+
+
+def test_export_todos_gzip(client, headers, test_todo_one):
+    # TestClient(httpx)が自動で展開しないよう、生のバイト列で確認する
+    with client.stream(
+        "GET", "/api/todos/export", headers={**headers, "Accept-Encoding": "gzip"}
+    ) as response:
+        body = b"".join(response.iter_raw())
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-encoding"] == "gzip"
+    assert json.loads(gzip.decompress(body))["id"] == test_todo_one.id
+
+
+def test_export_todos_invalid_format(client, headers):
+    response = client.get("/api/todos/export?format=xml", headers=headers)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_export_todos_memory_is_bounded(many_todos):
+    # TestClientはレスポンスをまとめて読み込むため、エンコーダを直接消費する
+    async def export(encode) -> tuple[int, int]:
+        size = lines = 0
+        async with TestingAsyncSessionLocal() as db:
+            batches = TodoRepository(db).stream_all(
+                override_get_current_user(), batch_size=1000
+            )
+            async for chunk in encode(batches):
+                size += len(chunk)
+                lines += chunk.count(b"\n")
+        return size, lines
+
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    sizes = {}
+    for encode, header_lines in ((encode_ndjson, 0), (encode_csv, 1)):
+        sizes[encode], lines = asyncio.run(export(encode))
+        assert lines == EXPORT_ROWS + 1 + header_lines
+    # ru_maxrssはKB単位。出力全体(100MB以上)よりも十分小さい増加に収まること
+    growth_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before) / 1024
+    assert sizes[encode_ndjson] > 100 * 1024 * 1024
+    assert growth_mb < 64, growth_mb
@@ -0,0 +1,152 @@
+import asyncio
+import json
+
+import pytest
+from config.dependency import get_current_user_from_cookie
+from fastapi import status
+from main import app
+from schemas.requests.todo_request_schema import CreateTodoRequest
+from usecases.todo_import import (
+    LineTooLongError,
+    iter_lines,
+    validate_csv,
+    validate_ndjson,
+)
+
+
+async def _chunks(body: bytes, size: int):
+    for start in range(0, len(body), size):
+        yield body[start : start + size]
+
+
+def _collect(rows) -> list:
+    async def collect():
+        return [row async for row in rows]
+
+    return asyncio.run(collect())
+
+
+def test_iter_lines_across_chunk_boundaries():
+    body = b"first\r\nsecond\n\nthird"
+    assert _collect(iter_lines(_chunks(body, 3))) == [
+        (1, b"first"),
+        (2, b"second"),
+        (3, b""),
+        (4, b"third"),
+    ]
+
+
+def test_iter_lines_stops_at_long_line():
+    read = []
+
+    async def chunks():
+        # 改行のない本文
+        for _ in range(100):
+            read.append(None)
+            yield b"x" * 10
+
+    async def collect():
+        return [line async for line in iter_lines(chunks(), max_line_bytes=25)]
+
+    with pytest.raises(LineTooLongError) as e:
+        asyncio.run(collect())
+    assert e.value.line_no == 1
+    # 上限を超えた時点で残りのチャンクは読まない
+    assert len(read) == 3
+
+
+def test_validate_rejects_long_lines():
+    body = b'{"title": "task 01", "description": "description 01"}\n' + b"x" * 100
+    rows = _collect(validate_ndjson(_chunks(body, 7), max_line_bytes=64))
+    assert rows[0][0] == 1
+    assert rows[1][0] == 2
+    assert rows[1][1][0]["type"] == "line_too_long"
+
+    # 閉じられない引用符で複数行にまたがるレコードも上限で打ち切る
+    body = b'title,description\ntask 01,"open\n' + b"x" * 20 + b"\n" * 10
+    rows = _collect(validate_csv(_chunks(body, 5), max_line_bytes=32))
+    assert [line_no for line_no, _ in rows] == [2]
+    assert rows[0][1][0]["type"] == "line_too_long"
+
+
+def test_validate_ndjson_reports_line_errors():
+    body = (
+        b'{"title": "task 01", "description": "description 01"}\n'
+        b"\n"
+        b'{"title": "x", "description": "description 02"}\n'
+        b"not json\n"
+    )
+    rows = _collect(validate_ndjson(_chunks(body, 7)))
+    assert [line_no for line_no, _ in rows] == [1, 3, 4]
+    assert rows[0][1] == CreateTodoRequest(
+        title="task 01", description="description 01"
+    )
+    assert rows[1][1][0]["loc"] == ("title",)
+    assert rows[2][1][0]["type"] == "json_invalid"
+
+
+def test_validate_csv_handles_quoted_newlines():
+    body = (
+        b"title,description,is_starred\n"
+        b'task 01,"multi\nline",true\n'
+        b"task 02,description 02,\n"
+        b"task 03\n"
+    )
+    rows = _collect(validate_csv(_chunks(body, 5)))
+    assert rows[0] == (
+        2,
+        CreateTodoRequest(title="task 01", description="multi\nline", is_starred=True),
+    )
+    assert rows[1] == (
+        4,
+        CreateTodoRequest(title="task 02", description="description 02"),
+    )
+    assert rows[2][0] == 5
+    assert rows[2][1][0]["type"] == "column_count"
+
+
+def test_import_todos_ndjson(client, headers, test_todo_one):
+    lines = [
+        {"title": f"imported {i}", "description": f"description {i}"} for i in range(3)
+    ] + [{"title": "x", "description": "invalid"}]
+    response = client.post(
+        "/api/todos/import?format=ndjson",
+        content="\n".join(json.dumps(line) for line in lines).encode(),
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["imported"] == 3
+    assert response.json()["error_count"] == 1
+    assert response.json()["errors"][0]["line"] == 4
+    todos = client.get("/api/todos", headers=headers).json()["items"]
+    assert [todo["title"] for todo in todos[1:]] == [f"imported {i}" for i in range(3)]
+
+
+def test_import_todos_long_line(client, headers, test_todo_one, mocker):
+    mocker.patch("routers.todos.app_settings.IMPORT_MAX_LINE_BYTES", 100)
+    body = b'{"title": "imported", "description": "description"}\n' + b"x" * 1000
+    response = client.post(
+        "/api/todos/import?format=ndjson", content=body, headers=headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["imported"] == 1
+    assert response.json()["errors"][0]["line"] == 2
+    assert response.json()["errors"][0]["errors"][0]["type"] == "line_too_long"
+
+
+def test_import_todos_csv(client, headers, test_todo_one):
+    # エクスポートしたCSVをそのまま取り込める
+    exported = client.get("/api/todos/export?format=csv", headers=headers).content
+    response = client.post(
+        "/api/todos/import?format=csv", content=exported, headers=headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"imported": 1, "error_count": 0, "errors": []}
+    todos = client.get("/api/todos", headers=headers).json()["items"]
+    assert [todo["title"] for todo in todos] == [test_todo_one.title] * 2
+
+
+def test_import_todos_unauthorized(client, test_todo_one):
+    app.dependency_overrides.pop(get_current_user_from_cookie, None)
+    response = client.post("/api/todos/import", content=b"")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+from models.todo import TODO_PARTITION_COUNT
+from repositories.todo_repository import TodoRepository
+from schemas.requests.todo_request_schema import UpdateTodoRequest
+from sqlalchemy import event, text
+from tests.utils import (
+    TEST_SQLALCHEMY_DATABASE_URL,
+    TestingAsyncSessionLocal,
+    override_get_current_user,
+    test_async_engine,
+    test_engine,
+)
+
+APPLICATION_DIR = Path(__file__).resolve().parent.parent
+MIGRATION_SCHEMA = "partition_migration_test"
+BEFORE_PARTITIONING = "f7a0b5c4d2e6"
+
+
+def _partitions(plan: dict) -> set[str]:
+    names = set()
+    if re.fullmatch(r"todos_p\d+", plan.get("Relation Name", "")):
+        names.add(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        names |= _partitions(child)
+    return names
+
+
+def test_user_operations_touch_one_partition(test_todo_one):
+    user = override_get_current_user()
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if re.search(r"\btodos\b", statement):
+            statements.append((statement, parameters))
+
+    async def run():
+        async with TestingAsyncSessionLocal() as db:
+            partition = await db.scalar(
+                text("SELECT tableoid::regclass::text FROM todos WHERE id = :id"),
+                {"id": test_todo_one.id},
+            )
+            repository = TodoRepository(db)
+            engine = test_async_engine.sync_engine
+            event.listen(engine, "before_cursor_execute", capture)
+            try:
+                await repository.find_all(user, limit=10)
+                await repository.find_one(user, test_todo_one.id)
+                await repository.search(user, "test")
+                await repository.update(
+                    user,
+                    test_todo_one.id,
+                    UpdateTodoRequest(
+                        title="updated",
+                        description="updated",
+                        is_starred=False,
+                        is_completed=True,
+                    ),
+                )
+                await repository.bulk_delete(user, chunk_size=10)
+            finally:
+                event.remove(engine, "before_cursor_execute", capture)
+
+        # 実行したときと同じパラメータで実行計画を取り、触れるパーティションを調べる
+        plans = []
+        async with test_async_engine.connect() as connection:
+            for statement, parameters in statements:
+                result = await connection.exec_driver_sql(
+                    f"EXPLAIN (FORMAT JSON) {statement}", parameters
+                )
+                plans.append((statement, result.scalar()))
+        return partition, plans
+
+    partition, plans = asyncio.run(run())
+    assert len(plans) == 5
+    for statement, plan in plans:
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        assert _partitions(plan[0]["Plan"]) == {partition}, statement
+
+
+def _alembic(*args: str):
+    # マイグレーションは別スキーマに適用し、テスト用のテーブルと混ざらないようにする
+    subprocess.run(
+        [sys.executable, "-m", "alembic", *args],
+        cwd=APPLICATION_DIR,
+        env={
+            **os.environ,
+            "SQLALCHEMY_DATABASE_URL": TEST_SQLALCHEMY_DATABASE_URL,
+            "PGOPTIONS": f"-c search_path={MIGRATION_SCHEMA},public",
+        },
+        check=True,
+        capture_output=True,
+    )
+
+
+def _todos(connection) -> list[tuple]:
+    return connection.execute(
+        text(
+            f"SELECT id, title, owner_id, deleted_at IS NOT NULL, version, "
+            f"change_seq, search_vector FROM {MIGRATION_SCHEMA}.todos ORDER BY id"
+        )
+    ).all()
+
+
+def _relkind(connection) -> str:
+    return connection.scalar(
+        text("SELECT relkind FROM pg_class WHERE oid = CAST(:name AS regclass)"),
+        {"name": f"{MIGRATION_SCHEMA}.todos"},
+    )
+
+
+def test_partition_migration_preserves_todos():
+    with test_engine.begin() as connection:
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {MIGRATION_SCHEMA} CASCADE"))
+        connection.execute(text(f"CREATE SCHEMA {MIGRATION_SCHEMA}"))
+    try:
+        _alembic("upgrade", BEFORE_PARTITIONING)
+        with test_engine.begin() as connection:
+            connection.execute(
+                text(
+                    f"INSERT INTO {MIGRATION_SCHEMA}.users (username, email) "
+                    "SELECT 'user' || i, 'user' || i || '@example.com' "
+                    "FROM generate_series(1, 20) AS i"
+                )
+            )
+            connection.execute(
+                text(
+                    f"INSERT INTO {MIGRATION_SCHEMA}.todos "
+                    "(title, description, owner_id, deleted_at, version, change_seq) "
+                    "SELECT 'todo ' || i, 'description ' || i, users.id, "
+                    "  CASE WHEN i % 10 = 0 THEN now() END, i % 3 + 1, i "
+                    f"FROM {MIGRATION_SCHEMA}.users, generate_series(1, 50) AS i"
+                )
+            )
+            before = _todos(connection)
+
+        _alembic("upgrade", "head")
+        with test_engine.begin() as connection:
+            assert _relkind(connection) == "p"
+            assert _todos(connection) == before
+            partitions = connection.scalars(
+                text(
+                    f"SELECT DISTINCT tableoid::regclass::text "
+                    f"FROM {MIGRATION_SCHEMA}.todos"
+                )
+            ).all()
+            assert 1 < len(partitions) <= TODO_PARTITION_COUNT
+            # シーケンスは引き継がれ、既存のidと重複しない
+            new_id = connection.scalar(
+                text(
+                    f"INSERT INTO {MIGRATION_SCHEMA}.todos (title, owner_id) "
+                    f"SELECT 'new', min(id) FROM {MIGRATION_SCHEMA}.users "
+                    "RETURNING id"
+                )
+            )
+            assert new_id > before[-1][0]
+            after = _todos(connection)
+
+        _alembic("downgrade", BEFORE_PARTITIONING)
+        with test_engine.begin() as connection:
+            assert _relkind(connection) == "r"
+            assert _todos(connection) == after
+    finally:
+        with test_engine.begin() as connection:
+            connection.execute(
+                text(f"DROP SCHEMA IF EXISTS {MIGRATION_SCHEMA} CASCADE")
+            )
@@ -0,0 +1,96 @@
+import pytest
+from fastapi import status
+from sqlalchemy import text
+from tests.utils import assert_max_queries, test_engine
+
+
+@pytest.fixture
+def search_todos(client, headers, test_todo_one):
+    response = client.post(
+        "/api/todos/batch",
+        json=[
+            {"title": "Buy groceries", "description": "milk and eggs"},
+            {"title": "Call the plumber", "description": "kitchen sink leaks"},
+            {"title": "Weekly review", "description": "plan groceries budget"},
+            {"title": "Grocery list", "description": "for the party"},
+        ],
+        headers=headers,
+    )
+    todo_ids = [result["id"] for result in response.json()]
+    # 他のユーザのTodoは検索されない
+    with test_engine.connect() as connection:
+        connection.execute(
+            text(
+                "INSERT INTO users (id, email, username) "
+                "VALUES (124, 'other@example.com', 'other_user')"
+            )
+        )
+        connection.execute(
+            text(
+                "INSERT INTO todos (title, description, owner_id) "
+                "VALUES ('Buy groceries', 'other user', 124)"
+            )
+        )
+        connection.commit()
+    return todo_ids
+
+
+def _search(client, headers, q, **params):
+    response = client.get(
+        "/api/todos/search", params={"q": q, **params}, headers=headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    return response.json()
+
+
+def test_search_ranks_title_matches_first(client, headers, search_todos):
+    with assert_max_queries(1):
+        body = _search(client, headers, "groceries")
+    # タイトルに含む > 説明に含む > 綴りが近いだけ の順に並ぶ
+    assert [todo["id"] for todo in body["items"]] == [
+        search_todos[0],
+        search_todos[2],
+        search_todos[3],
+    ]
+    assert body["next_cursor"] is None
+
+
+def test_search_prefix_and_fuzzy(client, headers, search_todos):
+    assert [todo["id"] for todo in _search(client, headers, "plumb")["items"]] == [
+        search_todos[1]
+    ]
+    # 綴りの誤りもトライグラムの類似度で見つかる
+    ids = [todo["id"] for todo in _search(client, headers, "grocerys")["items"]]
+    assert search_todos[0] in ids and search_todos[3] in ids
+    assert _search(client, headers, "nothing matches")["items"] == []
+
+
+def test_search_paginated(client, headers, search_todos):
+    expected = [todo["id"] for todo in _search(client, headers, "grocer")["items"]]
+    assert len(expected) == 3
+
+    ids, cursor = [], None
+    while True:
+        params = {"limit": 1}
+        if cursor:
+            params["cursor"] = cursor
+        body = _search(client, headers, "grocer", **params)
+        ids += [todo["id"] for todo in body["items"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert ids == expected
+
+
+def test_search_excludes_deleted(client, headers, search_todos):
+    client.delete(f"/api/todos/{search_todos[1]}", headers=headers)
+    assert _search(client, headers, "plumber")["items"] == []
+
+
+def test_search_validation(client, headers, test_todo_one):
+    response = client.get("/api/todos/search", params={"q": ""}, headers=headers)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    response = client.get(
+        "/api/todos/search", params={"q": "task", "cursor": "invalid"}, headers=headers
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
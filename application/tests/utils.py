@@ -1,9 +1,13 @@
+import asyncio
+from contextlib import contextmanager
+
 from config.jwt import hash_password
-from infrastructure.database import Base
+from infrastructure.database import Base, to_async_url
 from models import Users
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 
 TEST_SQLALCHEMY_DATABASE_URL = "postgresql://test_user:password@db:5432/test_db"
 
@@ -13,13 +17,48 @@ TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_
 
 Base.metadata.create_all(bind=test_engine)
 
+# TestClientはリクエストごとにイベントループが変わるため接続を使い回さない
+test_async_engine = create_async_engine(
+    to_async_url(TEST_SQLALCHEMY_DATABASE_URL), poolclass=NullPool
+)
+
+TestingAsyncSessionLocal = async_sessionmaker(
+    bind=test_async_engine, autoflush=False, expire_on_commit=False
+)
+
+
+async def _initialize_test_async_engine():
+    async with test_async_engine.connect():
+        pass
+
+
+# 初回接続時の方言の初期化クエリがクエリ数に含まれないよう先に接続しておく
+asyncio.run(_initialize_test_async_engine())
+
 
-def override_get_db():
-    db = TestingSessionLocal()
+@contextmanager
+def assert_max_queries(max_queries: int):
+    # ブロック内でAPIが発行したSQLの件数が上限以下であることを確認する
+    statements = []
+
+    def count_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = test_async_engine.sync_engine
+    event.listen(engine, "after_cursor_execute", count_statement)
     try:
-        yield db
+        yield statements
     finally:
-        db.close()
+        event.remove(engine, "after_cursor_execute", count_statement)
+    assert len(statements) <= max_queries, (
+        f"{len(statements)} queries executed, expected at most {max_queries}:\n"
+        + "\n".join(statements)
+    )
+
+
+async def override_get_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
 
 
 def override_get_current_user():
@@ -0,0 +1,32 @@
+import csv
+import io
+from typing import AsyncIterator
+
+from pydantic_core import to_json
+
+EXPORT_COLUMNS = [
+    "id",
+    "title",
+    "description",
+    "is_starred",
+    "is_completed",
+    "owner_id",
+]
+
+
+async def encode_ndjson(batches: AsyncIterator[list[dict]]) -> AsyncIterator[bytes]:
+    async for batch in batches:
+        yield b"".join(to_json(todo) + b"\n" for todo in batch)
+
+
+async def encode_csv(batches: AsyncIterator[list[dict]]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    async for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
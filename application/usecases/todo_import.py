@@ -0,0 +1,141 @@
+import csv
+from typing import AsyncIterator
+
+from pydantic import ValidationError
+from schemas.requests.todo_request_schema import CreateTodoRequest
+
+# 1行ごとに (行番号, 検証済みのリクエスト or エラーのリスト) を返す
+ImportRow = tuple[int, CreateTodoRequest | list[dict]]
+
+
+class LineTooLongError(Exception):
+    def __init__(self, line_no: int):
+        self.line_no = line_no
+
+
+def _validation_errors(e: ValidationError) -> list[dict]:
+    return e.errors(include_url=False, include_input=False, include_context=False)
+
+
+def _line_too_long(max_line_bytes: int) -> list[dict]:
+    return [
+        {
+            "type": "line_too_long",
+            "loc": (),
+            "msg": f"Line exceeds {max_line_bytes} bytes",
+        }
+    ]
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes], max_line_bytes: int | None = None
+) -> AsyncIterator[tuple[int, bytes]]:
+    # 受信したチャンクを行に分割する(本文全体はメモリに載せない)
+    # max_line_bytesを超える行はLineTooLongErrorを送出し、残りの本文は読まない
+    # (改行のない本文が丸ごとバッファに溜まらないようにする)
+    buffer = bytearray()
+    line_no = 0
+    async for chunk in chunks:
+        buffer += chunk
+        start = 0
+        while (end := buffer.find(b"\n", start)) != -1:
+            line_no += 1
+            if max_line_bytes is not None and end - start > max_line_bytes:
+                raise LineTooLongError(line_no)
+            yield line_no, bytes(buffer[start:end]).rstrip(b"\r")
+            start = end + 1
+        del buffer[:start]
+        if max_line_bytes is not None and len(buffer) > max_line_bytes:
+            raise LineTooLongError(line_no + 1)
+    if buffer:
+        yield line_no + 1, bytes(buffer).rstrip(b"\r")
+
+
+async def validate_ndjson(
+    chunks: AsyncIterator[bytes], max_line_bytes: int | None = None
+) -> AsyncIterator[ImportRow]:
+    try:
+        async for line_no, line in iter_lines(chunks, max_line_bytes):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, CreateTodoRequest.model_validate_json(line)
+            except ValidationError as e:
+                yield line_no, _validation_errors(e)
+    except LineTooLongError as e:
+        yield e.line_no, _line_too_long(max_line_bytes)
+
+
+async def validate_csv(
+    chunks: AsyncIterator[bytes], max_line_bytes: int | None = None
+) -> AsyncIterator[ImportRow]:
+    # 引用符内の改行で複数行にまたがるレコードも、合計でmax_line_bytesまでにする
+    try:
+        async for row in _validate_csv(chunks, max_line_bytes):
+            yield row
+    except LineTooLongError as e:
+        yield e.line_no, _line_too_long(max_line_bytes)
+
+
+async def _validate_csv(
+    chunks: AsyncIterator[bytes], max_line_bytes: int | None
+) -> AsyncIterator[ImportRow]:
+    header = None
+    record: list[str] = []
+    record_line_no = 0
+    record_bytes = 0
+    async for line_no, line in iter_lines(chunks, max_line_bytes):
+        try:
+            text = line.decode("utf-8-sig" if line_no == 1 else "utf-8")
+        except UnicodeDecodeError:
+            yield (
+                line_no,
+                [{"type": "unicode_error", "loc": (), "msg": "Invalid UTF-8"}],
+            )
+            continue
+        if not record:
+            if not text.strip():
+                continue
+            record_line_no = line_no
+            record_bytes = 0
+        record.append(text)
+        record_bytes += len(line) + 1
+        if max_line_bytes is not None and record_bytes > max_line_bytes:
+            raise LineTooLongError(record_line_no)
+        # 引用符で囲まれた値に改行が含まれる場合は次の行と結合する
+        if sum(part.count('"') for part in record) % 2:
+            continue
+        values = next(csv.reader(["\n".join(record)]))
+        record = []
+        if header is None:
+            header = values
+            continue
+        if len(values) != len(header):
+            yield (
+                record_line_no,
+                [
+                    {
+                        "type": "column_count",
+                        "loc": (),
+                        "msg": f"Expected {len(header)} columns, got {len(values)}",
+                    }
+                ],
+            )
+            continue
+        # 空欄は未指定として扱い、デフォルト値を使う
+        row = {key: value for key, value in zip(header, values) if value != ""}
+        try:
+            yield record_line_no, CreateTodoRequest.model_validate(row)
+        except ValidationError as e:
+            yield record_line_no, _validation_errors(e)
+    if record:
+        yield (
+            record_line_no,
+            [
+                {
+                    "type": "unterminated_quote",
+                    "loc": (),
+                    "msg": "Unterminated quoted value",
+                }
+            ],
+        )
@@ -1,28 +1,252 @@
-from models import Todos, Users
+from typing import AsyncIterator
+
+from models import TodoDeleteJob, Todos, Users
+from infrastructure.todo_cache import TodoCache
 from repositories.todo_repository import TodoRepository
-from schemas.requests.todo_request_schema import CreateTodoRequest, UpdateTodoRequest
+from schemas.requests.todo_request_schema import (
+    BatchUpdateTodoRequest,
+    CreateTodoRequest,
+    UpdateTodoRequest,
+)
+from usecases.todo_import import ImportRow
 
 
 class TodoUsecase:
-    def __init__(self, todo_repository: TodoRepository):
+    def __init__(
+        self,
+        todo_repository: TodoRepository,
+        todo_cache: TodoCache | None = None,
+        cache_writable: bool = True,
+    ):
         self.todo_repository = todo_repository
+        self.todo_cache = todo_cache
+        # レプリカから読んだ値は反映が遅れている場合があるため、
+        # キャッシュからは読むが書き込まない
+        self.cache_writable = cache_writable
+
+    async def _invalidate(self, user: Users):
+        # 書き込みのコミット後にそのユーザのキャッシュを無効化する
+        if self.todo_cache is not None:
+            await self.todo_cache.invalidate(user.id)
+
+    async def get_all_todos(
+        self,
+        user: Users,
+        limit: int,
+        after_id: int | None = None,
+        is_starred: bool | None = None,
+        is_completed: bool | None = None,
+        include_archived: bool = False,
+        todos_version: int | None = None,
+    ) -> tuple[list[dict], int | None, int]:
+        # 1件多く取得して次ページの有無を判定する
+        key = ("list", limit + 1, after_id, is_starred, is_completed, include_archived)
+        cached, cache_version = await self._cached(user, key)
+        # todos_version(304の判定で読んだDBの値)と異なるキャッシュは使わない
+        # (無効化が届かなかったエントリのETagで304にならなくなるのを防ぐ)
+        if cached is not None and todos_version not in (None, cached[1]):
+            cached = None
+        if cached is None:
+            cached = await self.todo_repository.find_all(
+                user, limit + 1, after_id, is_starred, is_completed, include_archived
+            )
+            await self._store(user, key, cached, cache_version)
+        todos, version = cached
+        if len(todos) > limit:
+            return todos[:limit], todos[limit - 1]["id"], version
+        return todos, None, version
+
+    async def search_todos(
+        self,
+        user: Users,
+        q: str,
+        limit: int,
+        after: tuple[float, int] | None = None,
+    ) -> tuple[list[dict], tuple[float, int] | None]:
+        todos = await self.todo_repository.search(user, q, limit + 1, after)
+        next_position = None
+        if len(todos) > limit:
+            todos = todos[:limit]
+            next_position = (todos[-1]["score"], todos[-1]["id"])
+        for todo in todos:
+            del todo["score"]
+        return todos, next_position
+
+    async def get_todos_version(self, user: Users) -> int:
+        return await self.todo_repository.find_todos_version(user)
+
+    async def read_todo(
+        self, user: Users, todo_id: int, include_archived: bool = False
+    ) -> dict | None:
+        key = ("one", todo_id, include_archived)
+        todo, cache_version = await self._cached(user, key)
+        if todo is None:
+            todo = await self.todo_repository.find_one(user, todo_id, include_archived)
+            if todo is not None:
+                await self._store(user, key, todo, cache_version)
+        return todo
+
+    async def get_changes(
+        self,
+        user: Users,
+        since: int | None,
+        limit: int,
+        after_id: int | None = None,
+    ) -> tuple[list[dict], list[int], tuple[int, int] | None, int]:
+        # 変更量に比例した件数だけを読むため、キャッシュは使わない
+        # sinceがない場合はマイグレーション前からある行(change_seq=0)も含めて全件
+        changes = await self.todo_repository.find_changes(
+            user, -1 if since is None else since, after_id, limit + 1
+        )
+        next_position = None
+        if len(changes) > limit:
+            changes = changes[:limit]
+            next_position = (changes[-1]["change_seq"], changes[-1]["id"])
+        # 次回のsinceには最後に返した変更のchange_seqを使う
+        last_seq = changes[-1]["change_seq"] if changes else since or 0
+        upserts = []
+        deleted_ids = []
+        for change in changes:
+            if change.pop("deleted"):
+                deleted_ids.append(change["id"])
+            else:
+                del change["change_seq"]
+                upserts.append(change)
+        return upserts, deleted_ids, next_position, last_seq
+
+    async def get_change_events(
+        self,
+        user: Users,
+        after_seq: int,
+        after_id: int | None,
+        limit: int,
+    ) -> list[dict]:
+        # 差分同期と同じクエリで、(change_seq, id)より後の変更を変更順のイベントにする
+        # versionは作成時に1で更新のたびに増えるため、1ならcreateとみなす
+        events = []
+        for change in await self.todo_repository.find_changes(
+            user, after_seq, after_id, limit
+        ):
+            change_seq = change.pop("change_seq")
+            if change.pop("deleted"):
+                event, data = "delete", {"id": change["id"]}
+            else:
+                event = "create" if change["version"] == 1 else "update"
+                data = change
+            events.append(
+                {
+                    "event": event,
+                    "change_seq": change_seq,
+                    "id": change["id"],
+                    "data": data,
+                }
+            )
+        return events
+
+    async def _cached(self, user: Users, key: tuple) -> tuple[object, str | None]:
+        # 値と、_storeに渡すキャッシュのバージョン
+        if self.todo_cache is None:
+            return None, None
+        return await self.todo_cache.get(user.id, *key)
+
+    async def _store(self, user: Users, key: tuple, value, version: str | None):
+        if self.todo_cache is not None and self.cache_writable:
+            await self.todo_cache.set(user.id, *key, value=value, version=version)
+
+    def stream_todos(self, user: Users, batch_size: int) -> AsyncIterator[list[dict]]:
+        return self.todo_repository.stream_all(user, batch_size)
+
+    async def create_todo(self, user: Users, todo_request: CreateTodoRequest) -> Todos:
+        todo = await self.todo_repository.create(user, todo_request)
+        await self._invalidate(user)
+        return todo
+
+    async def update_todo(
+        self,
+        user: Users,
+        todo_id: int,
+        todo_request: UpdateTodoRequest,
+        versions: list[int] | None = None,
+    ) -> Todos | None:
+        todo = await self.todo_repository.update(user, todo_id, todo_request, versions)
+        if todo is not None:
+            await self._invalidate(user)
+        return todo
+
+    async def delete_todo(
+        self, user: Users, todo_id: int, versions: list[int] | None = None
+    ) -> int | None:
+        deleted_id = await self.todo_repository.delete(user, todo_id, versions)
+        if deleted_id is not None:
+            await self._invalidate(user)
+        return deleted_id
+
+    async def create_todos(
+        self, user: Users, todo_requests: list[CreateTodoRequest]
+    ) -> list[Todos]:
+        todos = await self.todo_repository.create_many(user, todo_requests)
+        await self._invalidate(user)
+        return todos
 
-    def get_all_todos(self, user: Users) -> list[Todos]:
-        return self.todo_repository.find_all(user)
+    async def import_todos(
+        self,
+        user: Users,
+        rows: AsyncIterator[ImportRow],
+        chunk_size: int,
+        max_errors: int,
+    ) -> dict:
+        # 検証を通った行だけをchunk_size件ずつCOPYで書き込む
+        imported = 0
+        error_count = 0
+        errors = []
+        chunk = []
+        try:
+            async for line_no, row in rows:
+                if isinstance(row, CreateTodoRequest):
+                    chunk.append(row)
+                    if len(chunk) >= chunk_size:
+                        imported += await self.todo_repository.copy_many(user, chunk)
+                        chunk = []
+                    continue
+                error_count += 1
+                if len(errors) < max_errors:
+                    errors.append({"line": line_no, "errors": row})
+            if chunk:
+                imported += await self.todo_repository.copy_many(user, chunk)
+        finally:
+            # 途中で失敗してもコミット済みのチャンクがあるため必ず無効化する
+            if imported:
+                await self._invalidate(user)
+        return {"imported": imported, "error_count": error_count, "errors": errors}
 
-    def read_todo(self, user: Users, todo_id: int) -> Todos | None:
-        return self.todo_repository.find_one(user, todo_id)
+    async def update_todos(
+        self, user: Users, todo_requests: list[BatchUpdateTodoRequest]
+    ) -> list[Todos]:
+        todos = await self.todo_repository.update_many(user, todo_requests)
+        if todos:
+            await self._invalidate(user)
+        return todos
 
-    def create_todo(self, user: Users, todo_request: CreateTodoRequest) -> Todos:
-        return self.todo_repository.create(user, todo_request)
+    async def delete_todos(self, user: Users, todo_ids: list[int]) -> list[int]:
+        deleted_ids = await self.todo_repository.delete_many(user, todo_ids)
+        if deleted_ids:
+            await self._invalidate(user)
+        return deleted_ids
 
-    def update_todo(
-        self, user: Users, todo_request: UpdateTodoRequest, todo: Todos
-    ) -> Todos:
-        return self.todo_repository.update(user, todo_request, todo)
+    async def bulk_delete_todo(self, user: Users, chunk_size: int) -> int:
+        try:
+            return await self.todo_repository.bulk_delete(user, chunk_size)
+        finally:
+            await self._invalidate(user)
 
-    def delete_todo(self, todo_id: Todos):
-        return self.todo_repository.delete(todo_id)
+    async def start_bulk_delete_job(
+        self, user: Users, soft_delete: bool
+    ) -> TodoDeleteJob:
+        job = await self.todo_repository.create_delete_job(user, soft_delete)
+        await self._invalidate(user)
+        return job
 
-    def bulk_delete_todo(self, user: Users):
-        return self.todo_repository.bulk_delete(user)
+    async def get_bulk_delete_job(
+        self, user: Users, job_id: int
+    ) -> TodoDeleteJob | None:
+        return await self.todo_repository.find_delete_job(user, job_id)
@@ -1,4 +1,4 @@
-from models import Users
+from models import EmailOutbox, Users
 from repositories.user_repository import UserRepository
 from schemas.requests.auth_request_schema import CreateUserRequest
 
@@ -7,10 +7,21 @@ class UserUsecase:
     def __init__(self, user_repository: UserRepository):
         self.user_repository = user_repository
 
-    def get_user_by_username(self, username: str) -> Users | None:
-        return self.user_repository.find_by_username(username)
+    async def get_user_by_username(self, username: str) -> Users | None:
+        return await self.user_repository.find_by_username(username)
 
-    def create_user(
+    async def create_user(
         self, hashed_password: str, user_model: CreateUserRequest
     ) -> Users | None:
-        return self.user_repository.create(hashed_password, user_model)
+        welcome_email = EmailOutbox(
+            recipient=user_model.email,
+            template_name="welcome_email.html",
+            subject="ようこそ",
+            context={"name": user_model.username},
+        )
+        return await self.user_repository.create(
+            hashed_password, user_model, outbox=[welcome_email]
+        )
+
+    async def update_password(self, user: Users, hashed_password: str):
+        return await self.user_repository.update_password(user, hashed_password)
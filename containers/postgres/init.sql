@@ -7,6 +7,10 @@ CREATE DATABASE test_db;
 CREATE USER test_user WITH PASSWORD 'password';
 GRANT ALL PRIVILEGES ON DATABASE test_db TO test_user;
 
+-- 読み取りレプリカの代わりに使うテスト用データベース
+CREATE DATABASE test_replica_db;
+ALTER DATABASE test_replica_db OWNER TO test_user;
+
 -- dev_user にスキーマ変更権限を付与
 ALTER DATABASE dev_db OWNER TO dev_user;
 GRANT ALL PRIVILEGES ON SCHEMA public TO dev_user;